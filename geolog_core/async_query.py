@@ -0,0 +1,206 @@
+# Async Query
+#
+# Author: Tobias Grubenmann
+# Email: grubenmann@cs.uni-bonn.de
+# Copyright: (C) 2020 Tobias Grubenmann
+
+import ctypes
+import threading
+
+import pyswip
+import pyswip.core
+import pyswip.prolog
+
+# asyncio is only available in Python 3, so it is imported when an async query is created (which raises a
+# NotImplementedError in Python 2). The module is written without async/await, so that it can still be imported
+# (e.g. by the plugin discovery) in Python 2.
+
+# the Prolog-only signal that cancels a query and its handler (which must not be garbage collected)
+_cancel_signal = None
+_cancel_handler = None
+_signal_lock = threading.Lock()
+
+
+def _raise_cancelled(signal):
+    """Handles the cancel signal in the engine thread of the query by throwing geolog_cancelled."""
+    term = pyswip.core.PL_new_term_ref()
+    pyswip.core.PL_put_atom_chars(term, "geolog_cancelled")
+    pyswip.core.PL_raise_exception(term)
+
+
+def _get_cancel_signal():
+    """The signal that cancels a query, allocated on first use. None if SWI-Prolog has no PL_sigaction."""
+    global _cancel_signal, _cancel_handler
+    with _signal_lock:
+        if _cancel_signal is None and pyswip.core.PL_sigaction is not None:
+            handler = pyswip.core.PL_signal_handler_t(_raise_cancelled)
+            action = pyswip.core.pl_sigaction_t(handler, None, pyswip.core.PL_SIGSYNC)
+            # signal 0 allocates a free Prolog-only signal
+            signal = pyswip.core.PL_sigaction(0, ctypes.byref(action), None)
+            if signal >= pyswip.core.SIG_PROLOG_OFFSET:
+                _cancel_handler = handler
+                _cancel_signal = signal
+    return _cancel_signal
+
+
+def _cancel_thread(thread_id):
+    """Cancels the query of a thread with thread_signal/2, for SWI-Prolog versions without PL_sigaction."""
+    pyswip.Prolog._init_prolog_thread()
+    try:
+        list(pyswip.Prolog.query("geolog_query:cancel_thread({0})".format(thread_id)))
+    finally:
+        pyswip.core.PL_thread_destroy_engine()
+
+
+class _End(object):
+    """Marks the end of the solutions."""
+    pass
+
+
+class _Failure(object):
+    """Passes an exception of the query to the event loop."""
+
+    def __init__(self, exception):
+        self.exception = exception
+
+
+class AsyncQuery(object):
+    """Runs a Prolog query on a dedicated engine thread and passes the solutions to an asyncio event loop.
+       Used as asynchronous iterator, at most max_buffer solutions are computed ahead of the consumer.
+       Cancelling the consumer cuts the Prolog query. Requires Python 3."""
+
+    def __init__(self, interpreter, query, max_buffer=100, collect=False, **query_kwargs):
+        try:
+            import asyncio
+        except ImportError:
+            raise NotImplementedError("Asynchronous queries require asyncio (Python 3.4 or later).")
+
+        self.interpreter = interpreter
+        self.query = query
+        self.collect = collect
+        self.query_kwargs = query_kwargs
+        self.loop = asyncio.get_event_loop()
+        self._queue = asyncio.Queue(maxsize=max_buffer)
+        self._result = self.loop.create_future()
+        self._result.add_done_callback(self._on_done)
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._thread_id = None
+        self._signal = None
+        self._finished = False
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        pyswip.Prolog._init_prolog_thread()
+        signal = _get_cancel_signal()
+        with self._lock:
+            self._thread_id = pyswip.core.PL_thread_self()
+            self._signal = signal
+        try:
+            if self.collect:
+                result = self.interpreter.query(self.query, **self.query_kwargs)
+                self.loop.call_soon_threadsafe(self._set_result, result)
+            else:
+                solutions = self.interpreter.iter_query(self.query, **self.query_kwargs)
+                try:
+                    for solution in solutions:
+                        if self._cancelled.is_set():
+                            break
+                        self._put(solution)
+                finally:
+                    # cuts the query
+                    solutions.close()
+                self._put(_End())
+        except Exception as e:
+            if not self._cancelled.is_set():
+                if self.collect:
+                    self.loop.call_soon_threadsafe(self._set_exception, e)
+                else:
+                    self._put(_Failure(e))
+        finally:
+            with self._lock:
+                self._finished = True
+            pyswip.core.PL_thread_destroy_engine()
+
+    def _put(self, item):
+        """Passes an item to the event loop. Blocks while the buffer is full."""
+        import asyncio
+
+        if not self._cancelled.is_set():
+            asyncio.run_coroutine_threadsafe(self._queue.put(item), self.loop).result()
+
+    def _set_result(self, result):
+        if not self._result.done():
+            self._result.set_result(result)
+
+    def _set_exception(self, exception):
+        if not self._result.done():
+            self._result.set_exception(exception)
+
+    def _on_done(self, future):
+        if future.cancelled():
+            self.cancel()
+
+    def cancel(self):
+        """Cuts the query. Must be called from the event loop, which is not blocked: the engine thread is interrupted
+           by a signal."""
+        self._cancelled.set()
+        # unblock the engine thread if it waits for space in the buffer
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        with self._lock:
+            if self._thread_id is not None and not self._finished:
+                if self._signal is not None:
+                    pyswip.core.PL_thread_raise(self._thread_id, self._signal)
+                else:
+                    thread = threading.Thread(target=_cancel_thread, args=(self._thread_id,))
+                    thread.daemon = True
+                    thread.start()
+
+    def result(self):
+        """The awaitable result of the query (if created with collect=True)."""
+        return self._result
+
+    def __aiter__(self):
+        return self
+
+    def __anext__(self):
+        import asyncio
+
+        next_solution = self.loop.create_future()
+        get = asyncio.ensure_future(self._queue.get())
+
+        def on_get(task):
+            if next_solution.done():
+                return
+            if task.cancelled():
+                next_solution.cancel()
+                return
+            item = task.result()
+            if isinstance(item, _End):
+                next_solution.set_exception(StopAsyncIteration())
+            elif isinstance(item, _Failure):
+                next_solution.set_exception(item.exception)
+            else:
+                next_solution.set_result(item)
+
+        def on_next_solution(future):
+            if future.cancelled():
+                get.cancel()
+                self.cancel()
+
+        get.add_done_callback(on_get)
+        next_solution.add_done_callback(on_next_solution)
+        return next_solution
+
+    def aclose(self):
+        """Cuts the query when the asynchronous iteration is stopped early."""
+        self.cancel()
+        future = self.loop.create_future()
+        future.set_result(None)
+        return future
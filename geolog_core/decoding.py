@@ -0,0 +1,178 @@
+# Decoding
+#
+# Author: Tobias Grubenmann
+# Email: grubenmann@cs.uni-bonn.de
+# Copyright: (C) 2020 Tobias Grubenmann
+
+from ctypes import byref, c_char_p, c_int
+
+import pyswip.core
+import pyswip.easy
+import pyswip.prolog
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+# Decoding modes of the solutions of a query:
+# normalized: atoms and compound terms are converted to strings (pyswip.prolog.normalize_values)
+# raw: the values are the pyswip terms (Atom, Functor, Variable, ...)
+# typed: atoms are Symbols, compound terms are tuples (Name, Arg1, ..., ArgN), unbound variables are None
+# lazy: the values are decoded (typed) when they are accessed
+NORMALIZED = "normalized"
+RAW = "raw"
+TYPED = "typed"
+LAZY = "lazy"
+
+
+class Symbol(str):
+    """A Prolog atom. Symbols are interned, i.e. there is only one Symbol per name."""
+    __slots__ = ()
+
+    def __repr__(self):
+        return "Symbol(" + str.__repr__(self) + ")"
+
+
+_symbols = {}
+
+
+def get_symbol(name):
+    symbol = _symbols.get(name)
+    if symbol is None:
+        symbol = _symbols[name] = Symbol(name)
+    return symbol
+
+
+def _to_text(chars):
+    if not isinstance(chars, str):
+        chars = chars.decode("utf-8")
+    return chars
+
+
+def _get_text(term, conversion):
+    chars = c_char_p()
+    pyswip.core.PL_get_chars(term, byref(chars), conversion | pyswip.core.REP_UTF8)
+    return _to_text(chars.value)
+
+
+def _iter_bindings(bindings):
+    """Yields (name, term reference of the value) for the binding list [Name=Value, ...] of a solution."""
+    tail = pyswip.core.PL_copy_term_ref(bindings)
+    head = pyswip.core.PL_new_term_ref()
+    name = pyswip.core.PL_new_term_ref()
+    while pyswip.core.PL_get_list(tail, head, tail):
+        value = pyswip.core.PL_new_term_ref()
+        pyswip.core.PL_get_arg(1, head, name)
+        pyswip.core.PL_get_arg(2, head, value)
+        yield _get_text(name, pyswip.core.CVT_ATOM), value
+
+
+def get_typed(term):
+    """Decodes a term without creating pyswip terms."""
+    with pyswip.core.PL_STRINGS_MARK():
+        return _get_typed(term)
+
+
+def _get_typed(term):
+    term_type = pyswip.core.PL_term_type(term)
+    if term_type == pyswip.core.PL_VARIABLE:
+        return None
+    if term_type == pyswip.core.PL_ATOM:
+        return get_symbol(_get_text(term, pyswip.core.CVT_ATOM))
+    if term_type == pyswip.core.PL_INTEGER:
+        return pyswip.easy.getInteger(term)
+    if term_type == pyswip.core.PL_FLOAT:
+        return pyswip.easy.getFloat(term)
+    if term_type == pyswip.core.PL_STRING:
+        return _get_text(term, pyswip.core.CVT_STRING)
+
+    if pyswip.core.PL_is_list(term):
+        tail = pyswip.core.PL_copy_term_ref(term)
+        head = pyswip.core.PL_new_term_ref()
+        result = []
+        while pyswip.core.PL_get_list(tail, head, tail):
+            result.append(_get_typed(head))
+        return result
+
+    name = pyswip.core.atom_t()
+    arity = c_int()
+    if not pyswip.core.PL_get_name_arity(term, byref(name), byref(arity)):
+        # e.g. blobs and dicts
+        return pyswip.easy.getTerm(term)
+    argument = pyswip.core.PL_new_term_ref()
+    result = [get_symbol(_to_text(pyswip.core.PL_atom_chars(name.value)))]
+    for index in range(1, arity.value + 1):
+        pyswip.core.PL_get_arg(index, term, argument)
+        result.append(_get_typed(argument))
+    return tuple(result)
+
+
+def decode_normalized(bindings):
+    """Decodes the values as pyswip.prolog.Prolog.query does without a decoder."""
+    values = {}
+    for binding in pyswip.easy.getTerm(bindings):
+        values.update(pyswip.prolog.normalize_values(binding.value))
+    return values
+
+
+def decode_raw(bindings):
+    return {name: pyswip.easy.getTerm(value) for name, value in _iter_bindings(bindings)}
+
+
+def decode_typed(bindings):
+    with pyswip.core.PL_STRINGS_MARK():
+        return {name: _get_typed(value) for name, value in _iter_bindings(bindings)}
+
+
+def decode_lazy(bindings):
+    return LazySolution({name: pyswip.core.PL_record(value) for name, value in _iter_bindings(bindings)})
+
+
+_decoders = {NORMALIZED: None, RAW: decode_raw, TYPED: decode_typed, LAZY: decode_lazy}
+
+
+def get_decoder(mode):
+    """The decoder for pyswip.prolog.Prolog.query of a decoding mode (None for the normalized mode)."""
+    try:
+        return _decoders[mode]
+    except KeyError:
+        raise ValueError("Unknown decoding mode: " + str(mode))
+
+
+class LazySolution(Mapping):
+    """A solution whose values are kept as copies in the recorded database of SWI-Prolog (which is much cheaper than
+       decoding them) and decoded (typed) when they are accessed for the first time."""
+
+    def __init__(self, records):
+        self._records = records
+        self._values = {}
+
+    def __getitem__(self, name):
+        if name not in self._values:
+            record = self._records[name]
+            frame = pyswip.core.PL_open_foreign_frame()
+            try:
+                term = pyswip.core.PL_new_term_ref()
+                pyswip.core.PL_recorded(record, term)
+                self._values[name] = get_typed(term)
+            finally:
+                pyswip.core.PL_discard_foreign_frame(frame)
+            pyswip.core.PL_erase(record)
+            self._records[name] = None
+        return self._values[name]
+
+    def __iter__(self):
+        return iter(self._records)
+
+    def __len__(self):
+        return len(self._records)
+
+    def __del__(self):
+        try:
+            for record in self._records.values():
+                if record is not None:
+                    pyswip.core.PL_erase(record)
+        except (AttributeError, TypeError):
+            # the modules are already torn down at exit
+            pass
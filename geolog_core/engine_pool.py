@@ -0,0 +1,88 @@
+# Engine Pool
+#
+# Author: Tobias Grubenmann
+# Email: grubenmann@cs.uni-bonn.de
+# Copyright: (C) 2020 Tobias Grubenmann
+
+import threading
+
+import pyswip
+import pyswip.core
+
+try:
+    import concurrent.futures
+except ImportError:
+    # Python 2 without the backport "futures"
+    concurrent = None
+
+
+class EnginePool(object):
+    """Runs Prolog queries concurrently on a pool of worker threads.
+       Every worker thread is attached to its own SWI-Prolog engine. Registered foreign predicates and
+       consulted code are shared by all engines, while open queries and bindings are per engine."""
+
+    def __init__(self, interpreter, workers=4):
+        if concurrent is None:
+            raise NotImplementedError("An EnginePool requires concurrent.futures, which is part of the standard "
+                                      "library since Python 3.2 (install the backport \"futures\" for Python 2)")
+
+        self.interpreter = interpreter
+        self.workers = workers
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+        # counts the worker threads that have not yet taken their task of destroying their engine
+        self._remaining_workers = 0
+        self._workers_condition = threading.Condition()
+        self._shut_down = False
+
+    @staticmethod
+    def _attach_engine():
+        """Attaches a Prolog engine to the current worker thread, if not already done."""
+        pyswip.Prolog._init_prolog_thread()
+
+    def _run(self, function, *args, **kwargs):
+        self._attach_engine()
+        return function(*args, **kwargs)
+
+    def submit(self, query, catch_errors=True, debug=False):
+        """Submits a query and returns a future for its result (see Interpreter.query)."""
+        return self._executor.submit(self._run, self.interpreter.query, query,
+                                     catch_errors=catch_errors, debug=debug)
+
+    def submit_prepared(self, prepared_query, parameters=None, catch_errors=True, debug=False):
+        """Submits the execution of a PreparedQuery and returns a future for its result."""
+        return self._executor.submit(self._run, prepared_query.query, parameters,
+                                     catch_errors=catch_errors, debug=debug)
+
+    def map(self, queries, catch_errors=True, debug=False):
+        """Runs the queries concurrently and returns their results in the same order."""
+        futures = [self.submit(query, catch_errors=catch_errors, debug=debug) for query in queries]
+        return [future.result() for future in futures]
+
+    def _destroy_engine(self):
+        """Destroys the Prolog engine of the current worker thread, if one is attached."""
+        with self._workers_condition:
+            self._remaining_workers -= 1
+            self._workers_condition.notify_all()
+            # every worker thread has to take one of these tasks, so none of them returns before all are taken
+            while self._remaining_workers > 0:
+                self._workers_condition.wait()
+        if pyswip.core.PL_thread_self() != -1:
+            pyswip.core.PL_thread_destroy_engine()
+
+    def shutdown(self, wait=True):
+        """Destroys the Prolog engines of the worker threads once the submitted queries are finished and stops the
+           threads. If wait is False, it returns without waiting for this."""
+        if not self._shut_down:
+            self._shut_down = True
+            with self._workers_condition:
+                self._remaining_workers = self.workers
+            for _ in range(self.workers):
+                self._executor.submit(self._destroy_engine)
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+        return False
@@ -0,0 +1,145 @@
+# Fork Server
+#
+# Author: Tobias Grubenmann
+# Email: grubenmann@cs.uni-bonn.de
+# Copyright: (C) 2020 Tobias Grubenmann
+
+import multiprocessing
+import os
+import pickle
+import random
+import threading
+
+import geolog_core.profiler
+import geolog_core.reference_manager
+import geolog_core.trace
+import pyswip.prolog
+
+
+class ForkError(Exception):
+    """Raised if the process cannot be forked safely or a forked task terminated without a result."""
+    pass
+
+
+def _query(interpreter, query, **kwargs):
+    return interpreter.query(query, **kwargs)
+
+
+class ForkedTask(object):
+    """A task that runs in a forked child process."""
+
+    def __init__(self, pid, read_fd):
+        self.pid = pid
+        self._read_fd = read_fd
+        self._done = False
+        self._result = None
+
+    def result(self):
+        """Waits for the child process and returns the result of the task (or raises its exception)."""
+        if not self._done:
+            # the result is read before waiting, so that the child does not block on a full pipe
+            with os.fdopen(self._read_fd, "rb") as result_file:
+                data = result_file.read()
+            _, status = os.waitpid(self.pid, 0)
+            self._done = True
+            if data:
+                self._result = pickle.loads(data)
+            else:
+                self._result = (False, ForkError("The task process terminated with status {0}.".format(status)))
+        success, value = self._result
+        if not success:
+            raise value
+        return value
+
+
+class ForkServer(object):
+    """Runs tasks in child processes that are forked from the process of a fully initialized Interpreter.
+       The children inherit the loaded SWI-Prolog engine, the registered predicates and the consulted files, so that
+       starting a task takes milliseconds instead of the seconds needed to create an Interpreter.
+
+       Rules for forking:
+       - The process must not run other threads (Python threads, Prolog threads, engine pools or async queries) and
+         no query may be open, since only the forking thread survives in the child.
+       - The garbage collector thread of SWI-Prolog is stopped before every fork (SWI-Prolog restarts it on demand).
+       - In the child, the per-thread engine state of pyswip is reset and tracing and profiling are stopped.
+       - The child inherits the objects in the ReferenceManager (cleared if reset_references is set). Objects that
+         the child stores are discarded with the child. Connections and cursors inherited from the parent must not
+         be used by the child.
+       Only available on systems with os.fork (not on Windows)."""
+
+    def __init__(self, interpreter, workers=None, reset_references=False):
+        if not hasattr(os, "fork"):
+            raise ForkError("The fork server requires os.fork, which is not available on this system.")
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+        self.interpreter = interpreter
+        self.workers = workers
+        self.reset_references = reset_references
+
+    def prepare(self):
+        """Checks that the process can be forked safely. Called before every fork."""
+        if threading.active_count() > 1:
+            raise ForkError("Cannot fork a process with more than one thread.")
+        if pyswip.prolog.Prolog._getEngineState().openQueries:
+            raise ForkError("Cannot fork while a query is open.")
+        # the garbage collector thread would not survive the fork (available since SWI-Prolog 7.7), other Prolog
+        # threads (e.g. created by thread_create/3) are not seen by threading.active_count
+        result = self.interpreter.query("catch(set_prolog_gc_thread(stop), _, true), "
+                                        "thread_self(Self), findall(Id, (thread_property(Id, status(running)), Id \\== Self), Ids), "
+                                        "term_to_atom(Ids, Threads)", catch_errors=False)
+        threads = result[0]["Threads"]
+        if threads != "[]":
+            raise ForkError("Cannot fork while Prolog threads are running: {0}".format(threads))
+
+    def _reinitialize(self):
+        """Reinitializes the state of the child process after the fork."""
+        pyswip.prolog.Prolog._engineState = threading.local()
+        geolog_core.trace.stop()
+        geolog_core.profiler.stop()
+        if self.reset_references:
+            geolog_core.reference_manager.ReferenceManager().reset()
+        # otherwise, all children would produce the same random numbers
+        random.seed()
+
+    def submit(self, function, *args, **kwargs):
+        """Forks a child process that calls function(interpreter, *args, **kwargs) and returns a ForkedTask.
+           The result of the function must be picklable."""
+        self.prepare()
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                os.close(read_fd)
+                self._reinitialize()
+                try:
+                    result = (True, function(self.interpreter, *args, **kwargs))
+                except Exception as e:
+                    result = (False, e)
+                try:
+                    data = pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+                except Exception as e:
+                    data = pickle.dumps((False, ForkError("Cannot return the result of the task: " + str(e))),
+                                        pickle.HIGHEST_PROTOCOL)
+                with os.fdopen(write_fd, "wb") as result_file:
+                    result_file.write(data)
+                status = 0
+            finally:
+                # the child must not return into the code of the parent
+                os._exit(status)
+        os.close(write_fd)
+        return ForkedTask(pid, read_fd)
+
+    def query(self, query, **kwargs):
+        """Executes a query in a forked child. Returns the same results as Interpreter.query."""
+        return self.submit(_query, query, **kwargs).result()
+
+    def map(self, function, items):
+        """Calls function(interpreter, item) for every item in a forked child. At most workers children run at the
+           same time. Returns the results in the same order as the items."""
+        items = list(items)
+        results = []
+        for start in range(0, len(items), self.workers):
+            tasks = [self.submit(function, item) for item in items[start:start + self.workers]]
+            results.extend(task.result() for task in tasks)
+        return results
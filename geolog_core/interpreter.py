@@ -10,14 +10,28 @@ import threading
 import geolog_core
 import pyswip
 import pyswip.core
+import pyswip.easy
+import pyswip.prolog
 
+import geolog_core.async_query
+import geolog_core.decoding
+import geolog_core.engine_pool
+import geolog_core.fork_server
+import geolog_core.memoization
+import geolog_core.plugin_index
 import geolog_core.predicate
+import geolog_core.prepared_query
+import geolog_core.profiler
+import geolog_core.qlf_cache
 import geolog_core.reference_manager
+import geolog_core.trace
+import geolog_core.util
 import geolog_plugins
 
 lock = threading.Lock()
 
-escape_dict = {"\\": "/", "{": "[{]", "}": "[}]", "[": "[[]", "]": "{]}", "$": "[$]"}
+# the statistics of the last query of every thread
+_last_statistics = threading.local()
 
 
 class Singleton(type):
@@ -31,21 +45,67 @@ class Singleton(type):
         return cls._instances[cls]
 
 
-class Interpreter(object):
-    """Interacts with the Prolog interpreter."""
+# base class of singletons, since the __metaclass__ attribute is ignored by Python 3
+SingletonBase = Singleton("SingletonBase", (object,), {})
+
+
+class ResourceLimitError(pyswip.prolog.PrologError):
+    """Raised if a query exceeds its time, inference or stack limit."""
+
 
-    __metaclass__ = Singleton
+class QueryStatistics(object):
+    """The resources used by a query."""
 
     def __init__(self):
+        self.solutions = 0
+        self.inferences = 0
+        self.cpu_time = 0.0
+        # sampled at every solution and when the query is finished
+        self.peak_global_stack = 0
+
+    def update(self, interpreter, key):
+        """Reads the statistics recorded by geolog_query:limited_call/5 under key."""
+        for solution in interpreter.prolog.query("geolog_query:query_statistics(" + key +
+                                                 ", Inferences, CpuTime, GlobalUsed)"):
+            self.inferences = solution["Inferences"]
+            self.cpu_time = solution["CpuTime"]
+            self.peak_global_stack = solution["GlobalUsed"]
+
+    def __str__(self):
+        return "Solutions: {0}, inferences: {1}, CPU time: {2:.3f}s, peak global stack: {3} bytes".format(
+            self.solutions, self.inferences, self.cpu_time, self.peak_global_stack)
+
+
+class Interpreter(SingletonBase):
+    """Interacts with the Prolog interpreter."""
+
+    def __init__(self, lazy_registration=False):
 
         self.trace = False
 
+        # if set, foreign predicates are only registered when they are called for the first time
+        self.lazy_registration = lazy_registration
+        self._unregistered_classes = {}
+        self._registration_lock = threading.Lock()
+
+        self._batch_query = None
+
+        # plugin Prolog files are loaded from precompiled .qlf files
+        self.use_qlf_cache = True
+        self.qlf_cache = geolog_core.qlf_cache.QlfCache(self)
+
         self.prolog = pyswip.Prolog()
+        # queries with limits or statistics are called through geolog_query:run_query/6, which must be loaded first
+        self.consult(os.path.join(os.path.dirname(__file__), "prolog", "geolog_query.pl"))
+
+        # called by the undefined_predicate hook in geolog_loader.pl
+        pyswip.registerForeign(self._register_on_first_call, name="register_predicate", arity=3, module="geolog")
 
         # load geolog_plugins
         self.plugins = [(geolog_plugins.__path__, "geolog_plugins"),
                         (geolog_core.__path__, "geolog_core")]
         self.classes = set()
+        self.predicates = {}
         self.load_plugins()
         self.load_prolog_files()
 
@@ -55,51 +115,314 @@ class Interpreter(object):
         # set gui tracer
         self.query("guitracer")
 
+    @property
+    def trace(self):
+        """True if foreign predicate calls are recorded in the trace sink (see geolog_core.trace)."""
+        return geolog_core.trace.active_sink is not None
+
+    @trace.setter
+    def trace(self, value):
+        if not value:
+            geolog_core.trace.stop()
+        elif geolog_core.trace.active_sink is None:
+            geolog_core.trace.start(geolog_core.trace.TraceSink())
+
     def add_plugin(self, path, package):
-        self.plugins.append(([path], package))
-        self.load_plugins()
-        self.load_prolog_files()
+        """Adds a plugin to a loaded interpreter. Only the predicates and Prolog files of the new plugin are loaded.
+           Returns the predicates of the plugin whose module and name are already registered by another class as a
+           list of (module, name, arity) tuples. Clashing predicates are not registered."""
+        plugin = ([path], package)
+        self.plugins.append(plugin)
+        clashes = self._load_plugins([plugin])
+        self._load_prolog_files([plugin])
+        return clashes
 
     def load_plugins(self):
+        """Registers the predicates of all plugins."""
         self.classes = set()
-        geolog_core.predicate.get_classes_from_paths(self.plugins, self.classes)
-        for cls in self.classes:
-            if cls.get_predicate_name():
-
-                for arity in range(cls.get_minimum_arity(), cls.get_maximum_arity() + 1):
-                    if cls.is_deterministic():
-                        pyswip.registerForeign(cls.execute, name=cls.get_predicate_name(), arity=arity,
-                                               module=cls.get_module_name())
-                    else:
-                        pyswip.registerForeign(cls.execute, name=cls.get_predicate_name(), arity=arity,
-                                               flags=pyswip.core.PL_FA_NONDETERMINISTIC, module=cls.get_module_name())
+        self.predicates = {}
+        self._load_plugins(self.plugins)
+
+    def _load_plugins(self, plugins):
+        """Registers the predicates of the given plugins and returns the clashes with registered predicates.
+           The predicates are read from the plugin index if it is up to date. Otherwise, all plugin modules are
+           searched for predicate classes and the index is rebuilt."""
+        plugin_index = geolog_core.plugin_index.PluginIndex(plugins)
+        predicates = plugin_index.load()
+        if predicates is None:
+            classes = set()
+            geolog_core.predicate.get_classes_from_paths(plugins, classes)
+            self.classes.update(classes)
+            predicates = [cls for cls in classes if cls.get_predicate_name()]
+            plugin_index.save(predicates)
+
+        clashes = []
+        for cls in predicates:
+            key = (self._get_module_key(cls), cls.get_predicate_name())
+            registered = self.predicates.get(key)
+            if registered is not None:
+                if self._get_definition(registered) != self._get_definition(cls):
+                    clashes.extend((key[0], key[1], arity)
+                                   for arity in range(cls.get_minimum_arity(), cls.get_maximum_arity() + 1))
+                continue
+
+            self.predicates[key] = cls
+            if self.lazy_registration:
+                with self._registration_lock:
+                    self._unregistered_classes[key] = cls
+            else:
+                self.register_predicate(cls)
+        return clashes
+
+    @staticmethod
+    def _get_definition(cls):
+        """The module and name of the class that defines a predicate."""
+        if isinstance(cls, geolog_core.plugin_index.IndexedPredicate):
+            return cls.python_module, cls.class_name
+        return cls.__module__, cls.__name__
+
+    @staticmethod
+    def _get_module_key(cls):
+        # predicates without module are registered in the user module
+        return cls.get_module_name() or "user"
+
+    def register_predicate(self, cls):
+        """Registers a predicate class (or an IndexedPredicate) as foreign predicate for all its arities."""
+        for arity in range(cls.get_minimum_arity(), cls.get_maximum_arity() + 1):
+            function = self._get_foreign_function(cls, arity)
+            if cls.is_deterministic():
+                pyswip.registerForeign(function, name=cls.get_predicate_name(), arity=arity,
+                                       module=cls.get_module_name())
+            else:
+                pyswip.registerForeign(function, name=cls.get_predicate_name(), arity=arity,
+                                       flags=pyswip.core.PL_FA_NONDETERMINISTIC, module=cls.get_module_name())
+
+    def _get_foreign_function(self, cls, arity):
+        """The function that is registered for a predicate. Records the call if tracing or profiling is on."""
+        key = (self._get_module_key(cls), cls.get_predicate_name(), arity)
+        execute = geolog_core.predicate.get_dispatcher(cls, arity)
+
+        def foreign_function(*args):
+            if geolog_core.trace.active_sink is None and geolog_core.profiler.active_profiler is None:
+                return execute(*args)
+            return geolog_core.trace.call(key, execute, args)
+
+        return foreign_function
+
+    def _register_on_first_call(self, module, name, arity):
+        """Registers a predicate that has not been registered yet (lazy registration).
+           Fails if there is no such predicate, so that the existence error is raised as usual."""
+        key = (module.value, name.value)
+        with self._registration_lock:
+            cls = self._unregistered_classes.get(key)
+            if cls is None or not cls.get_minimum_arity() <= arity <= cls.get_maximum_arity():
+                return False
+            del self._unregistered_classes[key]
+        self.register_predicate(cls)
+        return True
 
     def load_prolog_files(self):
-        for plugin_paths, _ in self.plugins:
+        self._load_prolog_files(self.plugins)
+
+    def _load_prolog_files(self, plugins):
+        for plugin_paths, _ in plugins:
             for plugin_path in plugin_paths:
                 for path, _, files in os.walk(plugin_path):
                     for name in files:
                         if name.endswith(".pl"):
-                            self.consult(os.path.join(path, name))
+                            self.load_prolog_file(os.path.join(path, name))
+
+    def load_prolog_file(self, file_name):
+        """Loads a Prolog file of a plugin, using the QLF cache if enabled."""
+        if self.use_qlf_cache:
+            self.qlf_cache.load(file_name)
+        else:
+            self.consult(file_name)
 
     def consult(self, file_name, catch_errors=True):
         """Consults a file and loads it into the Prolog instance."""
-        # Escape \ and wildcards
-        cleaned_file_name = ""
-        for char in file_name:
-            if char in escape_dict:
-                cleaned_file_name += escape_dict[char]
-            else:
-                cleaned_file_name += char
-
-        self.prolog.consult(cleaned_file_name, catcherrors=catch_errors)
+        self.prolog.consult(geolog_core.util.escape_file_name(file_name), catcherrors=catch_errors)
 
-    def query(self, query, catch_errors=True, debug=False):
-        """Executes a Prolog query."""
-        result = list(self.prolog.query(query, catcherrors=catch_errors, debug=debug))
+    def query(self, query, catch_errors=True, debug=False, time_limit=None, inference_limit=None, stack_limit=None,
+              statistics=None, decoding=geolog_core.decoding.NORMALIZED, keep_references=False):
+        """Executes a Prolog query.
+           See iter_query for the resource limits, statistics, decoding modes and references."""
+        result = list(self.iter_query(query, catch_errors=catch_errors, debug=debug, time_limit=time_limit,
+                                      inference_limit=inference_limit, stack_limit=stack_limit,
+                                      statistics=statistics, decoding=decoding, keep_references=keep_references))
         if not result:
             result = False
         elif result == [{}]:
             result = True
         return result
 
+    def query_batch(self, goals, debug=False):
+        """Executes a list of Prolog goals within a single query.
+           Returns one result per goal in the same form as Interpreter.query. If a goal raises an error, its
+           result is a PrologError and the remaining goals are still executed."""
+        if self._batch_query is None:
+            self._batch_query = self.prepare("geolog_query:run_batch(Goals, Results)")
+
+        goals = list(goals)
+        solution = list(self._batch_query.execute({"Goals": goals}, debug=debug))[0]
+
+        results = []
+        for goal, goal_result in zip(goals, solution["Results"]):
+            if goal_result[0] == "ok":
+                names, rows = goal_result[1], goal_result[2]
+                result = [dict(zip(names, row)) for row in rows]
+                if not result:
+                    result = False
+                elif result == [{}]:
+                    result = True
+            else:
+                result = pyswip.prolog.PrologError("".join(["Caused by: '", goal, "'. ",
+                                                            "Returned: '", str(goal_result[1]), "'."]))
+            results.append(result)
+        return results
+
+    def iter_query(self, query, limit=None, offset=0, catch_errors=True, debug=False, time_limit=None,
+                   inference_limit=None, stack_limit=None, statistics=None,
+                   decoding=geolog_core.decoding.NORMALIZED, keep_references=False):
+        """Executes a Prolog query and yields the solutions one at a time.
+           The first offset solutions are skipped and at most limit solutions are returned.
+           The query is cut as soon as the limit is reached or the generator is closed.
+           time_limit (wall time in seconds), inference_limit (inferences per solution) and stack_limit (bytes)
+           abort the query with a ResourceLimitError when exceeded. The time limit counts from the start of the
+           query, including the time the caller spends on a solution before it requests the next one.
+           If statistics (a QueryStatistics object) is passed or a limit is set, the resources used by the query
+           are recorded and returned by get_last_statistics when the query is closed. Otherwise the query is
+           called as it is, without the overhead of recording them.
+           decoding selects how the values are returned (see geolog_core.decoding): "normalized" (strings),
+           "raw" (pyswip terms), "typed" (Symbols and tuples) or "lazy" (typed, decoded when accessed).
+           The Python objects created during the query are released when it is closed, except those that are
+           returned in a solution or pinned (see ReferenceManager.pin), unless keep_references is True."""
+        decoder = geolog_core.decoding.get_decoder(decoding) or geolog_core.decoding.decode_normalized
+        if limit is not None and limit <= 0:
+            return
+
+        max_result = -1
+        if limit is not None:
+            max_result = offset + limit
+
+        limits = (time_limit, inference_limit, stack_limit)
+        limited = statistics is not None or any(value is not None for value in limits)
+        prolog_query = query
+        if limited:
+            if statistics is None:
+                statistics = QueryStatistics()
+            # the statistics are recorded under a key of their own, so that nested queries do not overwrite them
+            statistics_key = "geolog_statistics_" + geolog_core.util.get_new_uuid()
+            # the query is passed as text and parsed by run_query, so that it may end with a period or comment
+            prolog_query = "geolog_query:run_query(" + geolog_core.util.quote_atom(query) + ", " + \
+                           ", ".join("none" if value is None else str(value) for value in limits) + ", " + \
+                           statistics_key + ", Result)"
+
+        reference_manager = geolog_core.reference_manager.ReferenceManager()
+        scope = reference_manager.open_scope()
+        returned_names = set()
+        solution_names = set()
+
+        def decode(bindings):
+            if limited:
+                bindings = self._get_limited_bindings(query, bindings)
+            # the handles are read from the terms, the decoded values may not keep them apart (e.g. "f(a, b)")
+            solution_names.clear()
+            if not keep_references and scope:
+                geolog_core.reference_manager.get_term_names(bindings, solution_names)
+            return decoder(bindings)
+
+        solutions = self.prolog.query(prolog_query, maxresult=max_result, catcherrors=catch_errors, debug=debug,
+                                      decoder=decode)
+        try:
+            for index, solution in enumerate(solutions):
+                if limited:
+                    statistics.solutions += 1
+                if index >= offset:
+                    returned_names.update(solution_names)
+                    yield solution
+        finally:
+            # closing the generator cuts the open query
+            solutions.close()
+            reference_manager.close_scope(scope, returned_names, release=not keep_references)
+            if limited:
+                statistics.update(self, statistics_key)
+                _last_statistics.statistics = statistics
+
+    @staticmethod
+    def _get_limited_bindings(query, bindings):
+        """The bindings of a solution of geolog_query:run_query/6, from its binding list [Result = Bindings].
+           Raises a ResourceLimitError if Result is resource_limit(Error) instead."""
+        head = pyswip.core.PL_new_term_ref()
+        pyswip.core.PL_get_list(bindings, head, pyswip.core.PL_new_term_ref())
+        result = pyswip.core.PL_new_term_ref()
+        pyswip.core.PL_get_arg(2, head, result)
+        if not pyswip.core.PL_is_list(result):
+            error = pyswip.core.PL_new_term_ref()
+            pyswip.core.PL_get_arg(1, result, error)
+            raise ResourceLimitError("".join(["Caused by: '", query, "'. ",
+                                              "Returned: '", str(pyswip.easy.getTerm(error)), "'."]))
+        return result
+
+    def profile(self, query, catch_errors=True, debug=False):
+        """Finds all solutions of a query and returns a Profiler with the time spent in every predicate.
+           Prolog predicates are timed by the SWI-Prolog profiler, foreign predicates are timed in Python
+           (including the time of SQL queries)."""
+        profiler = geolog_core.profiler.Profiler()
+        geolog_core.profiler.start(profiler)
+        try:
+            result = self.query("geolog_query:profile_goal((" + query.strip().rstrip(".") + "), Solutions, Rows)",
+                                catch_errors=catch_errors, debug=debug)
+        finally:
+            geolog_core.profiler.stop()
+        profiler.solutions = result[0]["Solutions"]
+        profiler.add_prolog_rows(result[0]["Rows"])
+        return profiler
+
+    def invalidate_memoized(self, predicate=None, dataset=None, workspace=None):
+        """Invalidates the memoized calls of a predicate (a class or its name, all predicates if None) and/or only
+           the calls with a dataset as argument. A relative dataset name is resolved against workspace."""
+        geolog_core.memoization.invalidate(predicate, dataset, workspace)
+
+    def get_memoization_statistics(self):
+        """The hits, misses and number of entries of every memoized predicate, as list of dicts."""
+        return geolog_core.memoization.get_statistics()
+
+    @staticmethod
+    def get_last_statistics():
+        """The QueryStatistics of the last query with statistics or a limit that was closed in this thread, None if
+           there is none."""
+        return getattr(_last_statistics, "statistics", None)
+
+    def get_reference_statistics(self):
+        """The number of live Python objects referenced from Prolog and their (shallow) size in bytes by type name,
+           e.g. {"Cursor": {"count": 2, "bytes": 128}}."""
+        return geolog_core.reference_manager.ReferenceManager().get_statistics()
+
+    def prepare(self, template):
+        """Parses a Prolog goal once and returns a PreparedQuery.
+           The named variables of the goal can be bound to Python values on every execution (strings as atoms), e.g.:
+           interpreter.prepare("postgres:within_distance((R1,I1),(R2,I2),D)").query({"R1": "roads", "D": 100})"""
+        return geolog_core.prepared_query.PreparedQuery(template)
+
+    def create_engine_pool(self, workers=4):
+        """Returns an EnginePool that runs queries concurrently, each worker thread with its own Prolog engine.
+           Plugins and Prolog files must be loaded before the pool is used."""
+        return geolog_core.engine_pool.EnginePool(self, workers)
+
+    def create_fork_server(self, workers=None, reset_references=False):
+        """Returns a ForkServer that runs tasks in child processes forked from this process, which inherit the
+           loaded Interpreter. Plugins and Prolog files must be loaded before the first fork."""
+        return geolog_core.fork_server.ForkServer(self, workers, reset_references)
+
+    def aquery(self, query, **kwargs):
+        """Runs the query on a dedicated engine thread. Returns an asyncio future of the solutions (as returned by
+           query). Cancelling the future cuts the query. kwargs are passed to query.
+           Requires Python 3, raises a NotImplementedError in Python 2."""
+        return geolog_core.async_query.AsyncQuery(self, query, collect=True, **kwargs).start().result()
+
+    def aiter(self, query, max_buffer=100, **kwargs):
+        """Runs the query on a dedicated engine thread and returns an asynchronous iterator over its solutions.
+           At most max_buffer solutions are computed ahead of the consumer. Cancelling the consumer cuts the query.
+           kwargs are passed to iter_query."""
+        return geolog_core.async_query.AsyncQuery(self, query, max_buffer, **kwargs).start()
@@ -0,0 +1,34 @@
+# Lazy List
+#
+# Author: Tobias Grubenmann
+# Email: grubenmann@cs.uni-bonn.de
+# Copyright: (C) 2020 Tobias Grubenmann
+
+import pyswip.core
+
+DEFAULT_CHUNK_SIZE = 100
+
+
+class LazyList(object):
+    """Wraps a Python iterable (e.g. a generator or a cursor) that is unified as a lazy Prolog list instead of being
+       materialized: the items are fetched in chunks of chunk_size items as Prolog walks the list
+       (see geolog_lazy:iterator_list/3)."""
+
+    def __init__(self, iterable, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.iterable = iterable
+        self.chunk_size = chunk_size
+
+
+def unify(variable, lazy_list, reference_manager):
+    """Unifies a pyswip Variable with a lazy Prolog list of the items of lazy_list.
+       The iterator is referenced by reference_manager until it is exhausted."""
+    iterator_atom = reference_manager.create_atom()
+    reference_manager.put(iterator_atom, iter(lazy_list.iterable))
+
+    args = pyswip.core.PL_new_term_refs(3)
+    pyswip.core.PL_put_atom(args, iterator_atom.handle)
+    pyswip.core.PL_put_integer(args + 1, lazy_list.chunk_size)
+    pyswip.core.PL_put_term(args + 2, variable.handle)
+    predicate = pyswip.core.PL_predicate("iterator_list", 3, "geolog_lazy")
+    return pyswip.core.PL_call_predicate(None, pyswip.core.PL_Q_NODEBUG | pyswip.core.PL_Q_PASS_EXCEPTION,
+                                         predicate, args)
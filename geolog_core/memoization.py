@@ -0,0 +1,214 @@
+# Memoization
+#
+# Author: Tobias Grubenmann
+# Email: grubenmann@cs.uni-bonn.de
+# Copyright: (C) 2020 Tobias Grubenmann
+
+import collections
+import os.path
+import threading
+import timeit
+
+import geolog_core.reference_manager
+import geolog_core.util
+import pyswip
+import pyswip.core
+
+# the caches of the memoized predicate classes
+_caches = {}
+_caches_lock = threading.Lock()
+
+# stands for an output argument (an unbound variable) in a key
+_OUTPUT = object()
+
+
+class _Uncacheable(Exception):
+    """Raised if the arguments of a call cannot be used as key (e.g. compound terms or partial lists)."""
+    pass
+
+
+def _get_key_element(arg, nested=False):
+    if isinstance(arg, pyswip.Variable):
+        if nested:
+            raise _Uncacheable()
+        return _OUTPUT
+    if isinstance(arg, list):
+        return tuple(_get_key_element(element, True) for element in arg)
+    if isinstance(arg, (pyswip.Functor, pyswip.Term)):
+        # hashed by their term reference, not by their value
+        raise _Uncacheable()
+    return arg
+
+
+def get_key(args, workspace=None):
+    """The cache key of the arguments of a call: the workspace that relative dataset names are resolved against,
+       followed by the Prolog values of the arguments, outputs (unbound variables) replaced by a placeholder.
+       Referenced Python objects are keyed by their atom."""
+    key = (workspace,) + tuple(_get_key_element(arg) for arg in args)
+    try:
+        hash(key)
+    except TypeError:
+        raise _Uncacheable()
+    return key
+
+
+def normalize_dataset(dataset, workspace=None):
+    """The normalized path of a dataset name. Relative names are resolved against workspace (e.g.
+       arcpy.env.workspace), or against the working directory if workspace is None."""
+    if workspace:
+        dataset = os.path.join(workspace, dataset)
+    return os.path.normcase(os.path.abspath(dataset))
+
+
+def _get_datasets(element, workspace, datasets):
+    """Adds the normalized names of the string arguments of a key element (and of its list elements) to datasets."""
+    if isinstance(element, tuple):
+        for nested_element in element:
+            _get_datasets(nested_element, workspace, datasets)
+        return
+    if isinstance(element, pyswip.Atom):
+        element = element.value
+    if isinstance(element, geolog_core.util.string_types) and element:
+        datasets.add(normalize_dataset(element, workspace))
+
+
+class MemoCache(object):
+    """An LRU cache of the calls of a deterministic predicate with at most max_size entries, each valid for ttl
+       seconds (forever if ttl is None). The bindings of the outputs are kept in the recorded database of
+       SWI-Prolog, the objects they reference are kept (see ReferenceManager.keep) until the entry is removed."""
+
+    def __init__(self, predicate_class, max_size, ttl=None):
+        self.predicate_class = predicate_class
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # key -> (expiry time, return value, [(output index, record)], [kept handles], {normalized datasets})
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def call(self, dispatch, args):
+        """Calls dispatch with args, or replays the outputs of a previous call with equal arguments."""
+        workspace = self.predicate_class.get_workspace()
+        try:
+            key = get_key(args, workspace)
+        except _Uncacheable:
+            return dispatch(*args)
+
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None and entry[0] is not None and entry[0] < timeit.default_timer():
+                self._erase(entry)
+                entry = None
+            if entry is not None:
+                # most recently used entries are at the end
+                self._entries[key] = entry
+                self.hits += 1
+            else:
+                self.misses += 1
+        if entry is not None:
+            return self._replay(entry, args)
+
+        # the objects referenced by the outputs must outlive the query
+        reference_manager = geolog_core.reference_manager.ReferenceManager()
+        scope = reference_manager.open_scope()
+        try:
+            return_value = dispatch(*args)
+        finally:
+            reference_manager.close_scope(scope, release=False)
+        references = [handle for handle in scope if reference_manager.contains(handle)]
+        for reference in references:
+            reference_manager.keep(reference)
+        records = []
+        if return_value:
+            for index, arg in enumerate(args):
+                if isinstance(arg, pyswip.Variable):
+                    records.append((index, pyswip.core.PL_record(arg.handle)))
+        expiry = None if self.ttl is None else timeit.default_timer() + self.ttl
+        # the datasets are resolved against the workspace of the call, which may change before they are invalidated
+        datasets = set()
+        _get_datasets(key[1:], workspace, datasets)
+        with self._lock:
+            self._erase(self._entries.pop(key, None))
+            self._entries[key] = (expiry, return_value, records, references, frozenset(datasets))
+            while len(self._entries) > self.max_size:
+                self._erase(self._entries.popitem(last=False)[1])
+        return return_value
+
+    @staticmethod
+    def _replay(entry, args):
+        (_, return_value, records, _, _) = entry
+        for index, record in records:
+            term = pyswip.core.PL_new_term_ref()
+            pyswip.core.PL_recorded(record, term)
+            if not pyswip.core.PL_unify(args[index].handle, term):
+                return False
+        return return_value
+
+    @staticmethod
+    def _erase(entry):
+        if entry is not None:
+            for _, record in entry[2]:
+                pyswip.core.PL_erase(record)
+            for reference in entry[3]:
+                geolog_core.reference_manager.ReferenceManager().drop(reference)
+
+    def invalidate(self, dataset=None, workspace=None):
+        """Removes all entries, or only those of calls with dataset as argument (or element of a list argument).
+           Dataset names are compared as normalized paths (see normalize_dataset)."""
+        with self._lock:
+            if dataset is None:
+                keys = list(self._entries)
+            else:
+                dataset = normalize_dataset(dataset, workspace)
+                keys = [key for key, entry in self._entries.items() if dataset in entry[4]]
+            for key in keys:
+                self._erase(self._entries.pop(key))
+
+    def to_dict(self):
+        return {"predicate": "{0}:{1}".format(self.predicate_class.get_module_name(),
+                                              self.predicate_class.get_predicate_name()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries)}
+
+
+def get_cache(predicate_class):
+    """The cache of a memoized predicate class, created on first use."""
+    cache = _caches.get(predicate_class)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(predicate_class)
+            if cache is None:
+                cache = _caches[predicate_class] = MemoCache(predicate_class,
+                                                             predicate_class.get_memoization_size(),
+                                                             predicate_class.get_memoization_ttl())
+    return cache
+
+
+def memoize(predicate_class, dispatch):
+    """Wraps the dispatcher of a memoized predicate class."""
+    cache = get_cache(predicate_class)
+
+    def memoized_dispatch(*args):
+        return cache.call(dispatch, args)
+
+    return memoized_dispatch
+
+
+def invalidate(predicate=None, dataset=None, workspace=None):
+    """Invalidates the memoized calls of a predicate (a class or its name in Prolog, all predicates if None) and/or
+       only the calls with a dataset (e.g. a feature class or layer name) as argument. A relative dataset name is
+       resolved against workspace."""
+    for cache in list(_caches.values()):
+        if predicate is None or predicate is cache.predicate_class or \
+                predicate == cache.predicate_class.get_predicate_name():
+            cache.invalidate(dataset, workspace)
+
+
+def get_statistics():
+    """The hits, misses and number of entries of the caches of all memoized predicates."""
+    return [cache.to_dict() for cache in list(_caches.values())]
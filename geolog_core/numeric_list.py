@@ -0,0 +1,125 @@
+# Numeric List
+#
+# Author: Tobias Grubenmann
+# Email: grubenmann@cs.uni-bonn.de
+# Copyright: (C) 2020 Tobias Grubenmann
+
+import array
+import ctypes
+
+import pyswip
+import pyswip.core
+
+# Numeric buffers are transferred as a whole instead of element by element: bytes are put as a list of codes and
+# numbers are converted to (and parsed from) the text of a Prolog list, each with a single C call.
+
+_FLOAT_FORMATS = ("f", "d")
+# the typecodes of numbers, character arrays ("c" and "u") are not numeric buffers
+_NUMERIC_FORMATS = ("b", "B", "h", "H", "i", "I", "l", "L", "q", "Q") + _FLOAT_FORMATS
+
+
+def _get_numpy_array_type():
+    """The type of NumPy arrays, None if NumPy is not installed or not imported by the caller."""
+    import sys
+
+    numpy = sys.modules.get("numpy")
+    if numpy is None:
+        return None
+    return numpy.ndarray
+
+
+def is_numeric_buffer(value):
+    """True if value is transferred by the bulk path: array.array or memoryview of numbers, bytearray, bytes
+       (Python 3) or a one-dimensional NumPy array of numbers (not booleans)."""
+    if isinstance(value, (array.array, memoryview)):
+        return _get_format(value) in _NUMERIC_FORMATS
+    if isinstance(value, bytearray):
+        return True
+    if bytes is not str and isinstance(value, bytes):
+        return True
+    numpy_array_type = _get_numpy_array_type()
+    return numpy_array_type is not None and isinstance(value, numpy_array_type) and value.ndim == 1 and \
+        value.dtype.kind in "iuf"
+
+
+def _get_format(value):
+    """The format of the elements (array.array typecode, "B" for bytes)."""
+    if isinstance(value, array.array):
+        return value.typecode
+    if isinstance(value, memoryview):
+        return value.format
+    if isinstance(value, (bytes, bytearray)):
+        return "B"
+    # NumPy array
+    if value.dtype.kind == "f":
+        return "d"
+    if value.dtype.itemsize == 1 and value.dtype.kind == "u":
+        return "B"
+    return "l"
+
+
+def put_list(term, values):
+    """Puts a Prolog list of the numbers in values into term."""
+    value_format = _get_format(values)
+    if value_format == "B":
+        data = bytes(bytearray(values))
+        pyswip.core.PL_put_list_ncodes(term, len(data), data)
+        return
+
+    elements = values.tolist()
+    if value_format in _FLOAT_FORMATS:
+        text = "[" + ",".join(map(repr, elements)) + "]"
+        # nan and inf have no Prolog syntax that is portable between versions
+        if "n" in text:
+            pyswip.easy.putList(term, elements)
+            return
+    else:
+        text = "[" + ",".join(map(str, elements)) + "]"
+    if not pyswip.core.PL_chars_to_term(text.encode("ascii"), term):
+        raise ValueError("Cannot transfer the values as Prolog list.")
+
+
+def unify(variable, values):
+    """Unifies a pyswip Variable with a Prolog list of the numbers in values."""
+    term = pyswip.core.PL_new_term_ref()
+    put_list(term, values)
+    return pyswip.core.PL_unify(variable.handle, term)
+
+
+def get_array(term, typecode="d"):
+    """Decodes a Prolog list of numbers into an array.array with the given typecode.
+       Raises a TypeError if the term is not a list of numbers."""
+    length = ctypes.c_size_t()
+    chars = ctypes.c_char_p()
+    with pyswip.core.PL_STRINGS_MARK():
+        if typecode == "B":
+            if pyswip.core.PL_get_list_nchars(term, ctypes.byref(length), ctypes.byref(chars),
+                                              pyswip.core.CVT_LIST):
+                data = ctypes.string_at(ctypes.cast(chars, ctypes.c_void_p).value, length.value)
+                return array.array("B", bytearray(data))
+        elif pyswip.core.PL_is_list(term) and \
+                pyswip.core.PL_get_nchars(term, ctypes.byref(length), ctypes.byref(chars),
+                                          pyswip.core.CVT_WRITE | pyswip.core.REP_UTF8):
+            text = ctypes.string_at(ctypes.cast(chars, ctypes.c_void_p).value, length.value).decode("utf-8")
+            elements = text[1:-1]
+            if not elements:
+                return array.array(typecode)
+            convert = float if typecode in _FLOAT_FORMATS else int
+            try:
+                return array.array(typecode, map(convert, elements.split(",")))
+            except ValueError:
+                # e.g. special floats, decoded element by element below
+                pass
+
+    try:
+        return array.array(typecode, pyswip.easy.getList(term))
+    except TypeError:
+        raise TypeError("Not a list of numbers.")
+
+
+def get_numpy_array(term, dtype="d"):
+    """Decodes a Prolog list of numbers into a NumPy array (dtype is an array.array typecode)."""
+    import numpy
+
+    values = get_array(term, dtype)
+    return numpy.frombuffer(values, dtype=values.typecode).copy()
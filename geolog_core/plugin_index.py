@@ -0,0 +1,150 @@
+# Plugin Index
+#
+# Author: Tobias Grubenmann
+# Email: grubenmann@cs.uni-bonn.de
+# Copyright: (C) 2020 Tobias Grubenmann
+
+import hashlib
+import importlib
+import json
+import os.path
+import sys
+
+import geolog_core.predicate
+import geolog_core.util
+
+INDEX_VERSION = 2
+
+
+class IndexedPredicate(object):
+    """A predicate read from the plugin index.
+       The module that defines the predicate class is only imported when the predicate is executed."""
+
+    def __init__(self, predicate_name, module_name, minimum_arity, maximum_arity, deterministic,
+                 python_module, class_name):
+        self.predicate_name = predicate_name
+        self.module_name = module_name
+        self.minimum_arity = minimum_arity
+        self.maximum_arity = maximum_arity
+        self.deterministic = deterministic
+        self.python_module = python_module
+        self.class_name = class_name
+        self._cls = None
+
+    @classmethod
+    def from_class(cls, predicate_class):
+        return cls(predicate_class.get_predicate_name(), predicate_class.get_module_name(),
+                   predicate_class.get_minimum_arity(), predicate_class.get_maximum_arity(),
+                   predicate_class.is_deterministic(), predicate_class.__module__, predicate_class.__name__)
+
+    def get_predicate_name(self):
+        return self.predicate_name
+
+    def get_module_name(self):
+        return self.module_name
+
+    def get_minimum_arity(self):
+        return self.minimum_arity
+
+    def get_maximum_arity(self):
+        return self.maximum_arity
+
+    def is_deterministic(self):
+        return self.deterministic
+
+    def get_class(self):
+        """Imports the defining module and returns the predicate class."""
+        if self._cls is None:
+            self._cls = getattr(importlib.import_module(self.python_module), self.class_name)
+        return self._cls
+
+    def execute(self, *args):
+        return self.get_class().execute(*args)
+
+    def get_dispatcher(self, arity):
+        """The dispatcher of the predicate class, which is built on the first call."""
+        dispatchers = []
+
+        def dispatch(*args):
+            if not dispatchers:
+                dispatchers.append(geolog_core.predicate.get_dispatcher(self.get_class(), arity))
+            return dispatchers[0](*args)
+
+        return dispatch
+
+    def to_list(self):
+        return [self.predicate_name, self.module_name, self.minimum_arity, self.maximum_arity, self.deterministic,
+                self.python_module, self.class_name]
+
+
+class PluginIndex(object):
+    """Caches the predicates found in the plugins on disk.
+       The index is invalidated as soon as a Python source file of the plugins is added, removed or changed
+       (modification time or size), or the environment changes (the Python version or the version reported by the
+       get_plugin_version() function of a plugin package, e.g. the arcpy installation whose functions are mapped).
+       get_plugin_version() is called on every start and must be fast, i.e. must not import arcpy."""
+
+    def __init__(self, plugins, cache_directory=None):
+        self.plugins = [(list(paths), package) for paths, package in plugins]
+        if cache_directory is None:
+            cache_directory = geolog_core.util.get_cache_directory()
+        key = hashlib.md5(json.dumps(self.plugins, sort_keys=True).encode("utf-8")).hexdigest()
+        self.file_name = os.path.join(cache_directory, "plugin_index_" + key + ".json")
+
+    def get_source_files(self):
+        """Returns the modification time and size of every Python source file of the plugins."""
+        source_files = {}
+        for paths, _ in self.plugins:
+            for plugin_path in paths:
+                for path, directories, files in os.walk(plugin_path):
+                    # tests are not searched for predicates
+                    if "tests" in directories:
+                        directories.remove("tests")
+                    for name in files:
+                        if name.endswith(".py"):
+                            file_name = os.path.join(path, name)
+                            stat = os.stat(file_name)
+                            source_files[file_name] = [stat.st_mtime, stat.st_size]
+        return source_files
+
+    def get_environment(self):
+        """The Python version and the versions of the plugin packages that define get_plugin_version()."""
+        plugin_versions = {}
+        for _, package in self.plugins:
+            try:
+                get_plugin_version = getattr(importlib.import_module(package), "get_plugin_version", None)
+            except ImportError:
+                get_plugin_version = None
+            plugin_versions[package] = get_plugin_version() if get_plugin_version is not None else None
+        return {"python": sys.version, "plugins": plugin_versions}
+
+    def load(self):
+        """Returns the indexed predicates or None if there is no index or it is outdated."""
+        try:
+            with open(self.file_name) as index_file:
+                index = json.load(index_file)
+            if index["version"] != INDEX_VERSION or index["files"] != self.get_source_files() or \
+                    index["environment"] != self.get_environment():
+                return None
+            # ctypes needs str (not unicode) for the names in Python 2
+            return [IndexedPredicate(*[str(value) if isinstance(value, type(u"")) else value for value in entry])
+                    for entry in index["predicates"]]
+        except (IOError, OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def save(self, predicates):
+        """Writes the index for the given predicate classes."""
+        index = {"version": INDEX_VERSION,
+                 "environment": self.get_environment(),
+                 "files": self.get_source_files(),
+                 "predicates": [IndexedPredicate.from_class(predicate).to_list() for predicate in predicates]}
+        try:
+            with open(self.file_name, "w") as index_file:
+                json.dump(index, index_file)
+        except (IOError, OSError, ValueError, TypeError):
+            # the index is only a cache
+            pass
+
+    def clear(self):
+        if os.path.exists(self.file_name):
+            os.remove(self.file_name)
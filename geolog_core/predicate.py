@@ -5,15 +5,41 @@
 # Copyright: (C) 2020 Tobias Grubenmann
 
 import inspect
+import itertools
+import numbers
 import pkgutil
 import sys
 
 import pyswip.core
-import geolog_core.interpreter
+import geolog_core.lazy_list
+import geolog_core.memoization
+import geolog_core.numeric_list
 import geolog_core.reference_manager
 import geolog_core.util
 import pyswip
 
+# inspect.getargspec was removed in Python 3.11
+_getargspec = getattr(inspect, "getfullargspec", None) or inspect.getargspec
+
+# (minimum arity, maximum arity) of the predicate classes, introspected once per class
+_arities = {}
+
+# generators of the open calls of nondeterministic predicates by their foreign context address
+_generators = {}
+
+
+class ArgumentMismatch(Exception):
+    """Raised by an argument converter if an argument does not match its declared mode or type."""
+    pass
+
+
+def get_dispatcher(cls, arity):
+    """The function that is registered for a predicate class with arity arguments.
+       Falls back to execute for classes that do not derive from Predicate."""
+    if hasattr(cls, Predicate.get_dispatcher.__name__):
+        return cls.get_dispatcher(arity)
+    return cls.execute
+
 
 class Predicate(object):
     """A SWI-Prolog foreign predicate."""
@@ -42,37 +68,157 @@ class Predicate(object):
            This is the only method that needs to be implemented."""
         return lambda *args: False  # This predicate will always fail and shouldn't be used.
 
+    @classmethod
+    def _get_arities(cls):
+        """The minimum and maximum number of arguments of the predicate function."""
+        arities = _arities.get(cls)
+        if arities is None:
+            function = cls._get_predicate_function()
+            maximum_arity = 0
+            (args, _, _, defaults) = _getargspec(function)[:4]
+            if args:
+                maximum_arity = len(args)
+            if inspect.ismethod(function):  # subtract 1 for first argument in a method
+                maximum_arity -= 1
+            minimum_arity = maximum_arity
+            if defaults:
+                minimum_arity -= len(defaults)
+            arities = _arities[cls] = (minimum_arity, maximum_arity)
+        return arities
+
     @classmethod
     def get_minimum_arity(cls):
         """The minimum number of arguments for the predicate.
            The predicate will be registered with arguments between get_minimum_arity() and get_minimum_arity()."""
-        arity = 0
-        (args, _, _, defaults) = inspect.getargspec(cls._get_predicate_function())
-        if args:
-            arity = len(args)
-        if defaults:
-            arity -= len(defaults)
-        if inspect.ismethod(cls._get_predicate_function()):  # subtract 1 for first argument in a method
-            arity -= 1
-        return arity
+        return cls._get_arities()[0]
 
     @classmethod
     def get_maximum_arity(cls):
         """The maximum number of arguments for the predicate.
            The predicate will be registered with arguments between get_minimum_arity() and get_minimum_arity()."""
-        arity = 0
-        (args, _, _, _) = inspect.getargspec(cls._get_predicate_function())
-        if args:
-            arity = len(args)
-        if inspect.ismethod(cls._get_predicate_function()):  # subtract 1 for first argument in a method
-            arity -= 1
-        return arity
+        return cls._get_arities()[1]
 
     @classmethod
     def execute(cls, *args):
         """Executes a given function and handles management of atoms."""
         return cls._get_predicate_function()(*args)
 
+    @classmethod
+    def _overrides(cls, name, base):
+        """True if the class overrides the method name of base."""
+        return getattr(cls, name).__func__ is not getattr(base, name).__func__
+
+    @classmethod
+    def get_dispatcher(cls, arity):
+        """The function that is registered for the predicate with arity arguments.
+           Built once at registration, so that the predicate function is not resolved on every call.
+           Classes that override execute are called through execute."""
+        if cls._overrides(Predicate.execute.__name__, Predicate):
+            return cls.execute
+        return cls._get_predicate_function()
+
+    @classmethod
+    def get_argument_modes(cls):
+        """The modes and types of the arguments, e.g. ["+object", "+int", "-list", "?atom"], or None if they are not
+           declared (then every argument is dereferenced).
+           Modes: + (input), - (output, passed as it is) and ? (input or unbound variable).
+           Types: any (dereferenced as usual), object (referenced Python object), atom, string, int, float, number,
+           bool and list. The dispatcher converts only what the declaration requires and fails if an argument does
+           not match."""
+        return None
+
+    @classmethod
+    def _get_argument_converters(cls, arity):
+        """One converter per argument for the declared modes (None for arguments that are passed as they are).
+           Raises a ValueError if the number of modes is not the maximum arity."""
+        argument_modes = cls.get_argument_modes()
+        if len(argument_modes) != cls.get_maximum_arity():
+            raise ValueError("Predicate {0} declares {1} argument modes for {2} arguments.".format(
+                cls.get_predicate_name(), len(argument_modes), cls.get_maximum_arity()))
+        converters = []
+        for argument_mode in argument_modes[:arity]:
+            mode, argument_type = argument_mode[0], argument_mode[1:] or "any"
+            if mode == "-":
+                converters.append(None)
+                continue
+            converter = cls._get_type_converter(argument_type)
+            if mode == "?":
+                converter = cls._get_optional_converter(converter)
+            converters.append(converter)
+        return converters
+
+    @classmethod
+    def _get_type_converter(cls, argument_type):
+        reference_manager = cls.get_reference_manager()
+        dereference = cls._dereference
+        atom_type = pyswip.Atom
+
+        def convert_any(value):
+            if type(value) is pyswip.Variable:
+                raise ArgumentMismatch()
+            return dereference(value)
+
+        def convert_object(value):
+            if type(value) is not atom_type:
+                raise ArgumentMismatch()
+            try:
+                return reference_manager.get(value)
+            except KeyError:
+                raise ArgumentMismatch()
+
+        def convert_atom(value):
+            if type(value) is not atom_type:
+                raise ArgumentMismatch()
+            return value.value
+
+        def convert_string(value):
+            if type(value) is atom_type:
+                return value.value
+            if not isinstance(value, geolog_core.util.string_types):
+                raise ArgumentMismatch()
+            return value
+
+        def convert_int(value):
+            if not isinstance(value, numbers.Integral) or isinstance(value, bool):
+                raise ArgumentMismatch()
+            return value
+
+        def convert_float(value):
+            return float(convert_number(value))
+
+        def convert_number(value):
+            if not isinstance(value, numbers.Real) or isinstance(value, bool):
+                raise ArgumentMismatch()
+            return value
+
+        def convert_bool(value):
+            if type(value) is atom_type and value.value in ("true", "false"):
+                return value.value == "true"
+            raise ArgumentMismatch()
+
+        def convert_list(value):
+            if type(value) is not list:
+                raise ArgumentMismatch()
+            return dereference(value)
+
+        converters = {"any": convert_any, "object": convert_object, "atom": convert_atom, "string": convert_string,
+                      "int": convert_int, "float": convert_float, "number": convert_number, "bool": convert_bool,
+                      "list": convert_list}
+        try:
+            return converters[argument_type]
+        except KeyError:
+            raise ValueError("Unknown argument type '{0}' of predicate {1}.".format(argument_type,
+                                                                                   cls.get_predicate_name()))
+
+    @staticmethod
+    def _get_optional_converter(converter):
+        def convert_optional(value):
+            if type(value) is pyswip.Variable:
+                return value
+            return converter(value)
+
+        return convert_optional
+
     @classmethod
     def _dereference(cls, value):
         return_value = value
@@ -99,7 +245,13 @@ class Predicate(object):
                 cls.unify(arg[i], value[i])
         elif isinstance(arg, pyswip.Variable):
             # prepare variable for unification
-            if isinstance(value, (list, tuple)):
+            if geolog_core.numeric_list.is_numeric_buffer(value):
+                # numeric buffers are transferred in bulk instead of element by element
+                geolog_core.numeric_list.unify(arg, value)
+            elif isinstance(value, geolog_core.lazy_list.LazyList):
+                # iterables of unknown length are unified as lazy list, filled in chunks as Prolog walks it
+                geolog_core.lazy_list.unify(arg, value, cls.get_reference_manager())
+            elif isinstance(value, (list, tuple)):
                 # tuples need to be converted to lists
                 arg.value = cls._iterable_to_list(value)
             elif not isinstance(value, geolog_core.util.prolog_types):
@@ -115,7 +267,7 @@ class Predicate(object):
         result_list = []
         for i in range(len(iterable)):
             try:
-                if isinstance(iterable[i], (str, unicode)):
+                if isinstance(iterable[i], geolog_core.util.string_types):
                     # prevent infinite loop with strings
                     result_list.append(iterable[i])
                 else:
@@ -133,9 +285,9 @@ class Predicate(object):
 
     @classmethod
     def trace(cls):
-        """Prints a trace if flag is set in interpreter."""
-        if geolog_core.interpreter.Interpreter().trace:
-            print("CALL: " + str(cls.get_module_name()) + ":" + str(cls.get_predicate_name()))
+        """Calls of registered predicates are recorded by the interpreter (see geolog_core.trace).
+           Kept for plugins that still call it."""
+        pass
 
 
 class DeterministicPredicate(Predicate):
@@ -151,8 +303,6 @@ class DeterministicPredicate(Predicate):
     def execute(cls, *args):
         """Executes a given function and handles management of atoms."""
 
-        cls.trace()
-
         function = cls._get_predicate_function()
 
         new_args = cls._dereference(list(args))
@@ -161,6 +311,180 @@ class DeterministicPredicate(Predicate):
 
         return return_value
 
+    @classmethod
+    def get_memoization_size(cls):
+        """The maximum number of calls that are memoized, 0 if the predicate is not memoized (default).
+           Only pure predicates should be memoized: a call with the same arguments as a memoized call is not
+           executed, its outputs are unified with the outputs of the memoized call (see geolog_core.memoization)."""
+        return 0
+
+    @classmethod
+    def get_memoization_ttl(cls):
+        """The number of seconds a memoized call is valid, None if it is valid until it is invalidated or evicted."""
+        return None
+
+    @classmethod
+    def get_workspace(cls):
+        """The directory that relative dataset names of memoized calls are resolved against, None for the working
+           directory."""
+        return None
+
+    @classmethod
+    def get_dispatcher(cls, arity):
+        """The function that is registered for the predicate with arity arguments.
+           Equivalent to execute, but the predicate function is resolved once and only atoms and lists are
+           dereferenced (variables, numbers and strings are passed as they are). If the class declares argument
+           modes, the arguments are converted accordingly (see get_argument_modes). Calls are memoized if
+           get_memoization_size() is greater than 0."""
+        dispatch = cls._get_unmemoized_dispatcher(arity)
+        if cls.get_memoization_size() > 0:
+            return geolog_core.memoization.memoize(cls, dispatch)
+        return dispatch
+
+    @classmethod
+    def _get_unmemoized_dispatcher(cls, arity):
+        if cls._overrides(Predicate.execute.__name__, DeterministicPredicate) or \
+                cls._overrides(Predicate._dereference.__name__, Predicate):
+            return cls.execute
+
+        function = cls._get_predicate_function()
+        dereference = cls._dereference
+        dereferenced_types = (pyswip.Atom, list)
+
+        if arity == 0:
+            return function
+        if cls.get_argument_modes() is not None:
+            converters = cls._get_argument_converters(arity)
+
+            def dispatch(*args):
+                try:
+                    converted_args = [arg if convert is None else convert(arg)
+                                      for convert, arg in zip(converters, args)]
+                except ArgumentMismatch:
+                    return False
+                return function(*converted_args)
+
+            return dispatch
+        if arity == 1:
+            def dispatch(a):
+                return function(dereference(a) if type(a) in dereferenced_types else a)
+        elif arity == 2:
+            def dispatch(a, b):
+                return function(dereference(a) if type(a) in dereferenced_types else a,
+                                dereference(b) if type(b) in dereferenced_types else b)
+        elif arity == 3:
+            def dispatch(a, b, c):
+                return function(dereference(a) if type(a) in dereferenced_types else a,
+                                dereference(b) if type(b) in dereferenced_types else b,
+                                dereference(c) if type(c) in dereferenced_types else c)
+        else:
+            def dispatch(*args):
+                return function(*[dereference(arg) if type(arg) in dereferenced_types else arg for arg in args])
+        return dispatch
+
+
+class BatchPredicate(Predicate):
+    """Used for predicates that handle many calls at once, so that the Python boundary is crossed once per batch
+       instead of once per call. The predicate is registered as Name(+Calls, -Results), where Calls is a list of
+       argument lists. The predicate function receives the dereferenced argument tuples (or one list per argument
+       if use_columns returns True) and returns a list with one result per call. A result of None makes the call
+       fail. Registered as Name(+Calls, -Results, -Succeeded) as well, where Succeeded is true or false per call
+       (false if the result is None or False).
+       Batch predicates are usually called through geolog_batch:batch_map/3 or geolog_batch:batch_include/3."""
+
+    @classmethod
+    def use_columns(cls):
+        """If True, the predicate function receives one list per argument (columns) instead of one tuple per
+           call (rows), e.g. to convert them to NumPy arrays."""
+        return False
+
+    @classmethod
+    def execute(cls, calls, results, succeeded=None):
+        rows = [tuple(cls._dereference(call)) for call in calls]
+        if cls.use_columns():
+            arguments = [list(column) for column in zip(*rows)]
+        else:
+            arguments = rows
+
+        values = cls._get_predicate_function()(arguments)
+
+        # None is returned as the atom none, so that geolog_batch can fail the call
+        cls.unify(results, [pyswip.Atom("none") if value is None else value for value in values])
+        if succeeded is not None:
+            cls.unify(succeeded, [value is not None and value is not False for value in values])
+        return True
+
+    @classmethod
+    def get_minimum_arity(cls):
+        return 2
+
+    @classmethod
+    def get_maximum_arity(cls):
+        return 3
+
+
+class NondeterministicPredicate(Predicate):
+    """Used for nondeterministic predicates. The predicate function is a generator function that receives the
+       dereferenced arguments and yields one value per solution. The value is unified with the unbound argument of
+       the call (or a tuple of values with the unbound arguments, if there are several).
+       The generator is kept under its foreign context address between the solutions and closed as soon as the call
+       is cut, so that cursors and connections of the generator are released."""
+
+    @classmethod
+    def is_deterministic(cls):
+        return False
+
+    @classmethod
+    def execute(cls, *args):
+        handle = args[-1]
+        args = args[:-1]
+        control = cls.get_control(handle)
+
+        if control == cls.get_first_call():
+            generator = cls._get_predicate_function()(*cls._dereference(list(args)))
+        else:
+            generator = _generators.pop(cls.get_address(handle), None)
+            if generator is None:
+                return False
+            if control == cls.get_pruned():
+                generator.close()
+                return True
+
+        try:
+            value = next(generator)
+        except StopIteration:
+            return False
+
+        outputs = [arg for arg in args if isinstance(arg, pyswip.Variable)]
+        if len(outputs) == 1:
+            cls.unify(outputs[0], value)
+        elif outputs:
+            cls.unify(outputs, value)
+
+        address = id(generator)
+        _generators[address] = generator
+        return cls.retry_address(address)
+
+    @classmethod
+    def get_control(cls, handle):
+        return pyswip.core.PL_foreign_control(handle)
+
+    @classmethod
+    def get_first_call(cls):
+        return pyswip.core.PL_FIRST_CALL
+
+    @classmethod
+    def get_pruned(cls):
+        return pyswip.core.PL_PRUNED
+
+    @classmethod
+    def retry_address(cls, address):
+        return pyswip.core.PL_retry_address(address)
+
+    @classmethod
+    def get_address(cls, handle):
+        return pyswip.core.PL_foreign_context_address(handle)
+
 
 class Delete(Predicate):
     """Deletes an object."""
@@ -178,7 +502,6 @@ class Delete(Predicate):
     @classmethod
     def delete(cls, object):
         """Executes a given function and handles management of atoms."""
-        cls.trace()
         geolog_core.reference_manager.ReferenceManager().clear(object)
 
     @classmethod
@@ -188,6 +511,52 @@ class Delete(Predicate):
         return cls.delete
 
 
+class Pin(Predicate):
+    """Keeps an object after the query that created it is closed."""
+
+    @classmethod
+    def get_predicate_name(cls):
+        """The name of the predicate in Prolog."""
+        return "pin"
+
+    @classmethod
+    def get_module_name(cls):
+        """The module of the predicate in Prolog."""
+        return "geolog"
+
+    @classmethod
+    def pin(cls, object):
+        """Fails if object is not the handle of an object."""
+        return geolog_core.reference_manager.ReferenceManager().pin(object)
+
+    @classmethod
+    def _get_predicate_function(cls):
+        return cls.pin
+
+
+class Unpin(Predicate):
+    """Releases a pinned object when the current query is closed."""
+
+    @classmethod
+    def get_predicate_name(cls):
+        """The name of the predicate in Prolog."""
+        return "unpin"
+
+    @classmethod
+    def get_module_name(cls):
+        """The module of the predicate in Prolog."""
+        return "geolog"
+
+    @classmethod
+    def unpin(cls, object):
+        """Fails if object is not the handle of a pinned object."""
+        return geolog_core.reference_manager.ReferenceManager().unpin(object)
+
+    @classmethod
+    def _get_predicate_function(cls):
+        return cls.unpin
+
+
 class GetAttribute(DeterministicPredicate):
     """Returns the attribute of an object."""
 
@@ -205,6 +574,10 @@ class GetAttribute(DeterministicPredicate):
     def _get_predicate_function(cls):
         return cls.get_attribute
 
+    @classmethod
+    def get_argument_modes(cls):
+        return ["+any", "+string", "-any"]
+
     @classmethod
     def get_attribute(cls, obj, attribute_name, attribute):
         if hasattr(obj, attribute_name):
@@ -230,6 +603,10 @@ class SetAttribute(DeterministicPredicate):
     def _get_predicate_function(cls):
         return cls.set_attribute
 
+    @classmethod
+    def get_argument_modes(cls):
+        return ["+any", "+string", "+any"]
+
     @classmethod
     def set_attribute(cls, obj, attribute_name, attribute):
         if hasattr(obj, attribute_name):
@@ -255,6 +632,10 @@ class CallMethod(DeterministicPredicate):
     def _get_predicate_function(cls):
         return cls.call_method
 
+    @classmethod
+    def get_argument_modes(cls):
+        return ["+any", "+string", "+list", "-any"]
+
     @classmethod
     def call_method(cls, obj, method_name, arg_list=None, output=None):
         successful = False
@@ -295,11 +676,13 @@ class IteratorPredicate(Predicate):
     @classmethod
     def execute(cls, iterator_atom, item, handle):
         """Executes one iteration of the iterator.
-           Binds item_variable to a single value or list of values."""
-
-        cls.trace()
+           Binds item_variable to a single value or list of values.
+           If the call is cut, the arguments are not valid anymore and nothing is left to release: the state of the
+           iteration is kept by the iterator, which belongs to its handle (and can still be used, e.g. by next)."""
 
         control = cls.get_control(handle)
+        if control == cls.get_pruned():
+            return True
         return_value = False
 
         iterator = cls.get_reference_manager().get(iterator_atom)
@@ -315,7 +698,7 @@ class IteratorPredicate(Predicate):
 
     @classmethod
     def get_next(cls, iterator):
-        return iterator.next()
+        return next(iterator)
 
     @classmethod
     def get_minimum_arity(cls):
@@ -368,8 +751,6 @@ class NextPredicate(Predicate):
         """Executes one iteration of the iterator.
            Binds item_variable to a single value or list of values."""
 
-        cls.trace()
-
         return_value = False
 
         iterator = cls.get_reference_manager().get(iterator_atom)
@@ -392,6 +773,42 @@ class NextPredicate(Predicate):
         return 2
 
 
+class NextChunk(Predicate):
+    """Returns the next chunk of items from an iterator (used for lazy lists, see geolog_lazy.pl)."""
+
+    @classmethod
+    def get_predicate_name(cls):
+        """The name of the predicate in Prolog."""
+        return "next_chunk"
+
+    @classmethod
+    def get_module_name(cls):
+        """The module of the predicate in Prolog."""
+        return "geolog"
+
+    @classmethod
+    def execute(cls, iterator_atom, chunk_size, chunk, done):
+        """Binds chunk to the next (at most) chunk_size items and done to true if the iterator is exhausted.
+           The reference to an exhausted iterator is cleared."""
+        iterator = cls.get_reference_manager().get(iterator_atom)
+        items = list(itertools.islice(iterator, chunk_size))
+        exhausted = len(items) < chunk_size
+        if exhausted:
+            del iterator
+            cls.get_reference_manager().clear(iterator_atom)
+        cls.unify(chunk, items)
+        cls.unify(done, exhausted)
+        return True
+
+    @classmethod
+    def get_minimum_arity(cls):
+        return 4
+
+    @classmethod
+    def get_maximum_arity(cls):
+        return 4
+
+
 class GetByIndex(DeterministicPredicate):
     """Retrieve an object from a collection by index."""
 
@@ -409,6 +826,10 @@ class GetByIndex(DeterministicPredicate):
     def _get_predicate_function(cls):
         return cls.get_by_index
 
+    @classmethod
+    def get_argument_modes(cls):
+        return ["+any", "+int", "-any"]
+
     @classmethod
     def get_by_index(cls, collection, index, item):
         """returns the object designated by the index."""
@@ -436,6 +857,10 @@ class Iterator(DeterministicPredicate):
     def _get_predicate_function(cls):
         return cls.iterator
 
+    @classmethod
+    def get_argument_modes(cls):
+        return ["+any", "-any"]
+
     @classmethod
     def iterator(cls, collection, iterator):
         """returns the object designated by the index."""
@@ -464,12 +889,89 @@ class Replace(DeterministicPredicate):
     def _get_predicate_function(cls):
         return cls.replace
 
+    @classmethod
+    def get_argument_modes(cls):
+        return ["+string", "+string", "+string", "-string"]
+
     @classmethod
     def replace(cls, find_substring, replace_with_substring, input_string, output_string):
         output_string.value = input_string.replace(find_substring, replace_with_substring)
         return True
 
 
+class Item(NondeterministicPredicate):
+    """Nondeterministic iterator over a collection or iterator."""
+
+    @classmethod
+    def get_predicate_name(cls):
+        """The name of the predicate in Prolog."""
+        return "item"
+
+    @classmethod
+    def get_module_name(cls):
+        """The module of the predicate in Prolog."""
+        return "geolog"
+
+    @classmethod
+    def _get_predicate_function(cls):
+        return cls.item
+
+    @classmethod
+    def item(cls, collection, item):
+        for value in collection:
+            yield value
+
+
+class BatchReplace(BatchPredicate):
+    """Replace for a batch of strings."""
+
+    @classmethod
+    def get_predicate_name(cls):
+        """The name of the predicate in Prolog."""
+        return "batch_replace"
+
+    @classmethod
+    def get_module_name(cls):
+        """The module of the predicate in Prolog."""
+        return "geolog"
+
+    @classmethod
+    def _get_predicate_function(cls):
+        return cls.batch_replace
+
+    @classmethod
+    def batch_replace(cls, calls):
+        return [input_string.replace(find_substring, replace_with_substring)
+                for find_substring, replace_with_substring, input_string in calls]
+
+
+class InvalidateMemoized(DeterministicPredicate):
+    """Invalidates the memoized calls of all predicates, or only those with a dataset as argument."""
+
+    @classmethod
+    def get_predicate_name(cls):
+        """The name of the predicate in Prolog."""
+        return "invalidate_memoized"
+
+    @classmethod
+    def get_module_name(cls):
+        """The module of the predicate in Prolog."""
+        return "geolog"
+
+    @classmethod
+    def _get_predicate_function(cls):
+        return cls.invalidate_memoized
+
+    @classmethod
+    def get_argument_modes(cls):
+        return ["+string"]
+
+    @classmethod
+    def invalidate_memoized(cls, dataset=None):
+        geolog_core.memoization.invalidate(dataset=dataset)
+        return True
+
+
 def get_classes_from_paths(path_package_pairs, classes):
     for (paths, base_package) in path_package_pairs:
         for path in paths:
@@ -0,0 +1,212 @@
+# Prepared Query
+#
+# Author: Tobias Grubenmann
+# Email: grubenmann@cs.uni-bonn.de
+# Copyright: (C) 2020 Tobias Grubenmann
+
+import ctypes
+
+import geolog_core.reference_manager
+import geolog_core.util
+import pyswip
+import pyswip.core
+import pyswip.easy
+import pyswip.prolog
+
+
+class PreparedQuery(object):
+    """A Prolog goal that is parsed once and executed many times with different parameters.
+       Parameters are the named variables of the goal and are bound to Python values on execution."""
+
+    def __init__(self, template):
+        self.template = template
+        self.variable_names = []
+        self._record = None
+        self._module = None
+        self._predicate = None
+        self._arity = 0
+        self._parse()
+
+    def _parse(self):
+        """Parses the template and records the goal together with its variables."""
+        pyswip.Prolog._init_prolog_thread()
+        if pyswip.Prolog._isQueryOpen():
+            raise pyswip.prolog.NestedQueryError("The last query was not closed")
+
+        swipl_fid = pyswip.core.PL_open_foreign_frame()
+        try:
+            swipl_args = pyswip.core.PL_new_term_refs(3)
+            swipl_goal = swipl_args + 1
+            swipl_bindings = swipl_args + 2
+            pyswip.core.PL_put_chars(swipl_args, pyswip.core.PL_ATOM | pyswip.core.REP_UTF8, -1,
+                                     self.template.encode("utf-8"))
+
+            swipl_predicate = pyswip.core.PL_predicate("atom_to_term", 3, None)
+            swipl_qid = pyswip.core.PL_open_query(None, pyswip.core.PL_Q_NODEBUG | pyswip.core.PL_Q_CATCH_EXCEPTION,
+                                                  swipl_predicate, swipl_args)
+            try:
+                if not pyswip.core.PL_next_solution(swipl_qid):
+                    term = pyswip.easy.getTerm(pyswip.core.PL_exception(swipl_qid))
+                    raise pyswip.prolog.PrologError("".join(["Cannot prepare: '", self.template, "'. ",
+                                                             "Returned: '", str(term), "'."]))
+            finally:
+                pyswip.core.PL_cut_query(swipl_qid)
+
+            # strip the module qualification from the goal
+            swipl_goal = self._strip_module(swipl_goal)
+
+            swipl_functor = pyswip.core.functor_t()
+            if not pyswip.core.PL_get_functor(swipl_goal, ctypes.byref(swipl_functor)):
+                raise pyswip.prolog.PrologError("Cannot prepare: '" + self.template + "'. Goal is not callable.")
+            self._arity = pyswip.core.PL_functor_arity(swipl_functor.value)
+            self._predicate = pyswip.core.PL_pred(swipl_functor.value, self._module)
+
+            # record prepared(Goal, Var1, ..., VarN) to get a fresh copy of the goal on every execution
+            bindings = self._get_bindings(swipl_bindings)
+            swipl_record_args = pyswip.core.PL_new_term_refs(len(bindings) + 1)
+            pyswip.core.PL_put_term(swipl_record_args, swipl_goal)
+            for i, (name, swipl_variable) in enumerate(bindings):
+                self.variable_names.append(name)
+                pyswip.core.PL_put_term(swipl_record_args + i + 1, swipl_variable)
+            swipl_record = pyswip.core.PL_new_term_ref()
+            pyswip.core.PL_cons_functor_v(swipl_record,
+                                          pyswip.Functor("prepared", len(self.variable_names) + 1).handle,
+                                          swipl_record_args)
+            self._record = pyswip.core.PL_record(swipl_record)
+        finally:
+            pyswip.core.PL_discard_foreign_frame(swipl_fid)
+
+    def _strip_module(self, swipl_goal):
+        swipl_colon = pyswip.Functor(":", 2).handle
+        while pyswip.core.PL_is_functor(swipl_goal, swipl_colon):
+            swipl_module = pyswip.core.PL_new_term_ref()
+            swipl_inner_goal = pyswip.core.PL_new_term_ref()
+            pyswip.core.PL_get_arg(1, swipl_goal, swipl_module)
+            pyswip.core.PL_get_arg(2, swipl_goal, swipl_inner_goal)
+            swipl_atom = pyswip.core.atom_t()
+            if not pyswip.core.PL_get_atom(swipl_module, ctypes.byref(swipl_atom)):
+                raise pyswip.prolog.PrologError("Cannot prepare: '" + self.template + "'. Module is not an atom.")
+            self._module = pyswip.core.PL_new_module(swipl_atom.value)
+            swipl_goal = swipl_inner_goal
+        return swipl_goal
+
+    @staticmethod
+    def _get_bindings(swipl_bindings):
+        """Returns the (name, variable) pairs of a binding list of the form [Name = Variable, ...]."""
+        bindings = []
+        swipl_list = pyswip.core.PL_copy_term_ref(swipl_bindings)
+        swipl_head = pyswip.core.PL_new_term_ref()
+        while pyswip.core.PL_get_list(swipl_list, swipl_head, swipl_list):
+            swipl_name = pyswip.core.PL_new_term_ref()
+            swipl_variable = pyswip.core.PL_new_term_ref()
+            pyswip.core.PL_get_arg(1, swipl_head, swipl_name)
+            pyswip.core.PL_get_arg(2, swipl_head, swipl_variable)
+            name = pyswip.easy.getAtomChars(swipl_name)
+            if not isinstance(name, str):
+                name = name.decode()
+            bindings.append((name, swipl_variable))
+        return bindings
+
+    @classmethod
+    def _bind_parameter(cls, swipl_variable, value):
+        """Binds a variable to a Python value like the same value written in a textual query, i.e. strings are
+           bound as atoms (also inside lists)."""
+        if isinstance(value, geolog_core.util.string_types):
+            swipl_atom = pyswip.core.PL_new_term_ref()
+            pyswip.core.PL_put_chars(swipl_atom, pyswip.core.PL_ATOM | pyswip.core.REP_UTF8, -1,
+                                     value.encode("utf-8"))
+            pyswip.core.PL_unify(swipl_variable, swipl_atom)
+        elif isinstance(value, list):
+            swipl_list = pyswip.core.PL_copy_term_ref(swipl_variable)
+            for element in value:
+                swipl_element = pyswip.core.PL_new_term_ref()
+                pyswip.core.PL_unify_list(swipl_list, swipl_element, swipl_list)
+                cls._bind_parameter(swipl_element, element)
+            pyswip.core.PL_unify_nil(swipl_list)
+        else:
+            pyswip.Variable(swipl_variable).value = value
+
+    def execute(self, parameters=None, catch_errors=True, debug=False, keep_references=False):
+        """Executes the prepared goal and returns a generator of the solutions.
+           parameters maps variable names to the Python values they are bound to. Strings are bound as atoms,
+           as in a textual query.
+           The Python objects created during the query are released as in Interpreter.iter_query."""
+        parameters = parameters or {}
+        for name in parameters:
+            if name not in self.variable_names:
+                raise KeyError("Unknown query parameter: " + str(name))
+        if self._record is None:
+            raise pyswip.prolog.PrologError("Prepared query was closed: '" + self.template + "'.")
+
+        pyswip.Prolog._init_prolog_thread()
+        if pyswip.Prolog._isQueryOpen():
+            raise pyswip.prolog.NestedQueryError("The last query was not closed")
+
+        # the parameters are checked when execute is called, not when the first solution is requested
+        return self._execute(parameters, catch_errors, debug, keep_references)
+
+    def _execute(self, parameters, catch_errors, debug, keep_references):
+        swipl_fid = pyswip.core.PL_open_foreign_frame()
+
+        swipl_record = pyswip.core.PL_new_term_ref()
+        pyswip.core.PL_recorded(self._record, swipl_record)
+
+        swipl_goal = pyswip.core.PL_new_term_ref()
+        pyswip.core.PL_get_arg(1, swipl_record, swipl_goal)
+        swipl_args = pyswip.core.PL_new_term_refs(self._arity)
+        for i in range(self._arity):
+            pyswip.core.PL_get_arg(i + 1, swipl_goal, swipl_args + i)
+
+        output_variables = []
+        for i, name in enumerate(self.variable_names):
+            swipl_variable = pyswip.core.PL_new_term_ref()
+            pyswip.core.PL_get_arg(i + 2, swipl_record, swipl_variable)
+            if name in parameters:
+                self._bind_parameter(swipl_variable, parameters[name])
+            else:
+                output_variables.append((name, swipl_variable))
+
+        flags = pyswip.core.PL_Q_NORMAL
+        if catch_errors:
+            flags |= pyswip.core.PL_Q_CATCH_EXCEPTION
+        if not debug:
+            flags |= pyswip.core.PL_Q_NODEBUG
+
+        swipl_qid = pyswip.core.PL_open_query(self._module, flags, self._predicate, swipl_args)
+
+        reference_manager = geolog_core.reference_manager.ReferenceManager()
+        scope = reference_manager.open_scope()
+        returned_names = set()
+        open_query = pyswip.Prolog._pushQuery(swipl_qid, swipl_fid)
+        try:
+            while not open_query.closed and pyswip.core.PL_next_solution(swipl_qid):
+                if not keep_references and scope:
+                    for _, swipl_variable in output_variables:
+                        geolog_core.reference_manager.get_term_names(swipl_variable, returned_names)
+                solution = dict((name, pyswip.prolog.normalize_values(pyswip.easy.getTerm(swipl_variable)))
+                                for name, swipl_variable in output_variables)
+                yield solution
+
+            if not open_query.closed and pyswip.core.PL_exception(swipl_qid):
+                term = pyswip.easy.getTerm(pyswip.core.PL_exception(swipl_qid))
+                raise pyswip.prolog.PrologError("".join(["Caused by: '", self.template, "'. ",
+                                                         "Returned: '", str(term), "'."]))
+        finally:
+            pyswip.Prolog._closeQuery(open_query)
+            reference_manager.close_scope(scope, returned_names, release=not keep_references)
+
+    def query(self, parameters=None, catch_errors=True, debug=False, keep_references=False):
+        """Executes the prepared goal. The result has the same form as Interpreter.query."""
+        result = list(self.execute(parameters, catch_errors=catch_errors, debug=debug,
+                                   keep_references=keep_references))
+        if not result:
+            result = False
+        elif result == [{}]:
+            result = True
+        return result
+
+    def close(self):
+        """Releases the recorded goal."""
+        if self._record is not None:
+            pyswip.core.PL_erase(self._record)
+            self._record = None
@@ -0,0 +1,141 @@
+# Profiler
+#
+# Author: Tobias Grubenmann
+# Email: grubenmann@cs.uni-bonn.de
+# Copyright: (C) 2020 Tobias Grubenmann
+
+import json
+import threading
+import timeit
+
+# the profiler that records the foreign predicate calls, None if profiling is off
+active_profiler = None
+
+
+def start(profiler):
+    global active_profiler
+    active_profiler = profiler
+
+
+def stop():
+    global active_profiler
+    active_profiler = None
+
+
+def time_sql(function, *args):
+    """Executes an SQL query through function and adds its time to the calling predicate, if profiling is on."""
+    profiler = active_profiler
+    if profiler is None:
+        return function(*args)
+    start_time = timeit.default_timer()
+    try:
+        return function(*args)
+    finally:
+        profiler.add_sql_time(timeit.default_timer() - start_time)
+
+
+class ProfileEntry(object):
+    """Profile of a single predicate. Times are in seconds."""
+
+    def __init__(self, module, name, arity):
+        self.module = module
+        self.name = name
+        self.arity = arity
+        self.calls = 0
+        self.inclusive_time = 0.0
+        self.exclusive_time = 0.0
+        self.python_time = 0.0
+        self.sql_time = 0.0
+
+    def get_predicate_indicator(self):
+        return "{0}:{1}/{2}".format(self.module, self.name, self.arity)
+
+    def to_dict(self):
+        return {"predicate": self.get_predicate_indicator(),
+                "calls": self.calls,
+                "inclusive_time": self.inclusive_time,
+                "exclusive_time": self.exclusive_time,
+                "python_time": self.python_time,
+                "sql_time": self.sql_time}
+
+
+class Profiler(object):
+    """Records the calls of foreign predicates and their Python and SQL time.
+       The calls are recorded on a stack, so that the time of nested calls is excluded from the exclusive time."""
+
+    def __init__(self):
+        self.entries = {}
+        # number of solutions of the profiled query
+        self.solutions = 0
+        self._local = threading.local()
+
+    def _get_stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def get_entry(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = self.entries[key] = ProfileEntry(*key)
+        return entry
+
+    def call(self, key, function, args):
+        """Calls function with args and records the call for the predicate key (module, name, arity)."""
+        stack = self._get_stack()
+        # frame: predicate, time of nested calls, SQL time
+        frame = [key, 0.0, 0.0]
+        stack.append(frame)
+        start_time = timeit.default_timer()
+        try:
+            return function(*args)
+        finally:
+            elapsed = timeit.default_timer() - start_time
+            stack.pop()
+            entry = self.get_entry(key)
+            entry.calls += 1
+            entry.inclusive_time += elapsed
+            entry.exclusive_time += elapsed - frame[1]
+            entry.python_time += elapsed - frame[1] - frame[2]
+            entry.sql_time += frame[2]
+            if stack:
+                stack[-1][1] += elapsed
+
+    def add_sql_time(self, elapsed):
+        """Adds SQL time to the predicate that is currently executed."""
+        stack = self._get_stack()
+        if stack:
+            stack[-1][2] += elapsed
+
+    def add_prolog_rows(self, rows):
+        """Adds the rows [Module, Name, Arity, Calls, InclusiveTime, ExclusiveTime] of the SWI-Prolog profiler.
+           Predicates that were timed in Python keep their Python times."""
+        for module, name, arity, calls, inclusive_time, exclusive_time in rows:
+            key = (module, name, arity)
+            if key in self.entries:
+                continue
+            entry = self.get_entry(key)
+            entry.calls = calls
+            entry.inclusive_time = inclusive_time
+            entry.exclusive_time = exclusive_time
+
+    def get_table(self):
+        """The profile entries sorted by exclusive time."""
+        return sorted(self.entries.values(), key=lambda entry: entry.exclusive_time, reverse=True)
+
+    def to_json(self, file_name=None):
+        """Exports the table as JSON. Writes it to file_name, if given."""
+        table = json.dumps([entry.to_dict() for entry in self.get_table()], indent=2)
+        if file_name:
+            with open(file_name, "w") as json_file:
+                json_file.write(table)
+        return table
+
+    def __str__(self):
+        lines = ["{0:<50} {1:>10} {2:>12} {3:>12} {4:>12} {5:>12}".format(
+            "Predicate", "Calls", "Inclusive", "Exclusive", "Python", "SQL")]
+        for entry in self.get_table():
+            lines.append("{0:<50} {1:>10} {2:>12.6f} {3:>12.6f} {4:>12.6f} {5:>12.6f}".format(
+                entry.get_predicate_indicator(), entry.calls, entry.inclusive_time, entry.exclusive_time,
+                entry.python_time, entry.sql_time))
+        return "\n".join(lines)
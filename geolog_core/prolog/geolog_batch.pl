@@ -0,0 +1,80 @@
+:- module(geolog_batch, [batch_map/3, batch_map/4, batch_include/3, batch_include/4]).
+
+:- meta_predicate batch_map(2, +, -),
+                  batch_map(2, +, -, +),
+                  batch_include(3, +, -),
+                  batch_include(3, +, -, +).
+
+    %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+    % Geolog Batch Helpers
+    %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+	% Author: Tobias Grubenmann
+	% Email: grubenmann@cs.uni-bonn.de
+	% Copyright: (C) 2020 Tobias Grubenmann
+    %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+
+
+%------------------------------------------------------------------------------
+% batch_map(:BatchPredicate, +Calls, -Results)
+% batch_map(:BatchPredicate, +Calls, -Results, +BatchSize)
+%------------------------------------------------------------------------------
+% Calls BatchPredicate (a BatchPredicate in Python, see
+% geolog_core/predicate.py) for Calls, a list of argument lists, in batches of
+% BatchSize calls (default 1000). Results contains one result per call.
+% Fails if the result of a call is none, like maplist/3 fails if a call fails.
+
+batch_map(BatchPredicate, Calls, Results) :-
+    batch_map(BatchPredicate, Calls, Results, 1000).
+
+batch_map(_, [], [], _) :-
+    !.
+
+batch_map(BatchPredicate, Calls, Results, BatchSize) :-
+    take(BatchSize, Calls, Batch, RemainingCalls),
+    call(BatchPredicate, Batch, BatchResults),
+    \+ memberchk(none, BatchResults),
+    append(BatchResults, RemainingResults, Results),
+    batch_map(BatchPredicate, RemainingCalls, RemainingResults, BatchSize).
+
+
+%------------------------------------------------------------------------------
+% batch_include(:BatchPredicate, +Calls, -Included)
+% batch_include(:BatchPredicate, +Calls, -Included, +BatchSize)
+%------------------------------------------------------------------------------
+% Like include/3 for batch predicates: Included contains the calls that
+% succeed, i.e. whose result is neither none nor false. Unlike batch_map/4,
+% calls that fail do not make batch_include fail. BatchPredicate is called
+% with a third argument, the success flag (true or false) of every call.
+
+batch_include(BatchPredicate, Calls, Included) :-
+    batch_include(BatchPredicate, Calls, Included, 1000).
+
+batch_include(_, [], [], _) :-
+    !.
+
+batch_include(BatchPredicate, Calls, Included, BatchSize) :-
+    take(BatchSize, Calls, Batch, RemainingCalls),
+    call(BatchPredicate, Batch, _, Succeeded),
+    include_succeeded(Batch, Succeeded, Included, RemainingIncluded),
+    batch_include(BatchPredicate, RemainingCalls, RemainingIncluded, BatchSize).
+
+
+include_succeeded([], [], Rest, Rest).
+
+include_succeeded([Call|Calls], [true|Succeeded], [Call|Included], Rest) :-
+    !,
+    include_succeeded(Calls, Succeeded, Included, Rest).
+
+include_succeeded([_|Calls], [_|Succeeded], Included, Rest) :-
+    include_succeeded(Calls, Succeeded, Included, Rest).
+
+
+take(0, Rest, [], Rest) :-
+    !.
+
+take(_, [], [], []) :-
+    !.
+
+take(N, [X|Xs], [X|Ys], Rest) :-
+    N1 is N - 1,
+    take(N1, Xs, Ys, Rest).
@@ -0,0 +1,47 @@
+:- module(geolog_lazy, [iterable_list/2, iterable_list/3, iterator_list/3]).
+
+:- use_module(library(lazy_lists), [lazy_list/2]).
+
+    %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+    % Geolog Lazy Lists
+    %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+	% Author: Tobias Grubenmann
+	% Email: grubenmann@cs.uni-bonn.de
+	% Copyright: (C) 2020 Tobias Grubenmann
+    %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+
+
+%------------------------------------------------------------------------------
+% iterable_list(+Iterable, -List)
+% iterable_list(+Iterable, +ChunkSize, -List)
+%------------------------------------------------------------------------------
+% List is a lazy list (see library(lazy_lists)) of the items of Iterable, a
+% Python iterable or iterator (e.g. from sql_query_iterator/2). The items are
+% fetched from Python in chunks of ChunkSize items (default 100) as List is
+% walked, so e.g. member/2 with an early cut fetches only a prefix.
+
+iterable_list(Iterable, List) :-
+    iterable_list(Iterable, 100, List).
+
+iterable_list(Iterable, ChunkSize, List) :-
+    geolog:iterator(Iterable, Iterator),
+    iterator_list(Iterator, ChunkSize, List).
+
+
+%------------------------------------------------------------------------------
+% iterator_list(+Iterator, +ChunkSize, -List)
+%------------------------------------------------------------------------------
+% Like iterable_list/3 for a Python iterator. Used by Predicate.unify for
+% values wrapped in geolog_core.lazy_list.LazyList.
+
+iterator_list(Iterator, ChunkSize, List) :-
+    lazy_list(next_chunk(Iterator, ChunkSize), List).
+
+
+next_chunk(Iterator, ChunkSize, List, Tail) :-
+    geolog:next_chunk(Iterator, ChunkSize, Chunk, Done),
+    (   Done == true
+    ->  List = Chunk,
+        Tail = []
+    ;   append(Chunk, Tail, List)
+    ).
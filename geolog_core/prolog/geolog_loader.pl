@@ -0,0 +1,24 @@
+:- module(geolog_loader, []).
+
+    %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+    % Geolog Loader
+    %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+	% Author: Tobias Grubenmann
+	% Email: grubenmann@cs.uni-bonn.de
+	% Copyright: (C) 2020 Tobias Grubenmann
+    %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+
+
+:- multifile user:exception/3.
+:- dynamic user:exception/3.
+
+
+%------------------------------------------------------------------------------
+% user:exception(+undefined_predicate, +Module:Name/Arity, -Action)
+%------------------------------------------------------------------------------
+% Registers a foreign predicate of a Geolog plugin when it is called for the
+% first time (lazy registration) and retries the call. If no such predicate
+% exists, the hook fails and the usual existence error is raised.
+
+user:exception(undefined_predicate, Module:Name/Arity, retry) :-
+    geolog:register_predicate(Module, Name, Arity).
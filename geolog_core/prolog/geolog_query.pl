@@ -0,0 +1,228 @@
+:- module(geolog_query, [run_batch/2, run_query/6, limited_call/5, query_statistics/4,
+                         profile_goal/3, cancel_thread/1]).
+
+:- use_module(library(time)).
+
+:- meta_predicate limited_call(0, +, +, +, +),
+                  profile_goal(0, -, -),
+                  with_stack_limit(+, 0),
+                  with_time_limit(+, 0),
+                  with_inference_limit(+, 0).
+
+    %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+    % Geolog Query Helpers
+    %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+	% Author: Tobias Grubenmann
+	% Email: grubenmann@cs.uni-bonn.de
+	% Copyright: (C) 2020 Tobias Grubenmann
+    %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+
+
+%------------------------------------------------------------------------------
+% run_batch(+GoalStrings, -Results)
+%------------------------------------------------------------------------------
+% Runs every goal in GoalStrings and unifies Results with one result per goal.
+% A result is either [ok, Names, Rows], where Names are the variable names of
+% the goal and Rows contains the values of these variables for every solution,
+% or [error, Message] if the goal raised an exception. An exception does not
+% stop the remaining goals.
+
+run_batch([], []).
+
+run_batch([GoalString|GoalStrings], [Result|Results]) :-
+    run_goal(GoalString, Result),
+    run_batch(GoalStrings, Results).
+
+
+run_goal(GoalString, Result) :-
+    catch(
+        ( term_string(Goal, GoalString, [variable_names(Bindings)]),
+          binding_names(Bindings, Names, Variables),
+          findall(Variables, user:Goal, Rows),
+          Result = [ok, Names, Rows]
+        ),
+        Error,
+        ( term_string(Message, Error),
+          Result = [error, Message]
+        )
+    ).
+
+
+binding_names([], [], []).
+
+binding_names([Name=Variable|Bindings], [Name|Names], [Variable|Variables]) :-
+    binding_names(Bindings, Names, Variables).
+
+
+%------------------------------------------------------------------------------
+% run_query(+QueryText, +TimeLimit, +InferenceLimit, +StackLimit, +Key, -Result)
+%------------------------------------------------------------------------------
+% Parses QueryText like a query of pyswip and calls it with limited_call/5.
+% Result is unified with the variable bindings [Name=Value, ...] of every
+% solution. If a limit is exceeded, Result is unified with
+% resource_limit(Error) instead and no further solutions are computed, so
+% that the caller can tell this error apart from all others by its term.
+
+run_query(QueryText, TimeLimit, InferenceLimit, StackLimit, Key, Result) :-
+    atom_to_term(QueryText, Goal, Bindings),
+    catch(
+        ( limited_call(user:Goal, TimeLimit, InferenceLimit, StackLimit, Key),
+          Result = Bindings
+        ),
+        Error,
+        ( resource_limit_error(Error)
+        -> Result = resource_limit(Error)
+        ;  throw(Error)
+        )
+    ).
+
+
+resource_limit_error(time_limit_exceeded).
+
+resource_limit_error(inference_limit_exceeded).
+
+resource_limit_error(error(resource_error(_), _)).
+
+
+%------------------------------------------------------------------------------
+% limited_call(:Goal, +TimeLimit, +InferenceLimit, +StackLimit, +Key)
+%------------------------------------------------------------------------------
+% Calls Goal with a wall time limit (in seconds), an inference limit (per
+% solution) and a stack limit (in bytes). A limit of none is not enforced.
+% The time limit counts from the first call of Goal and includes the time
+% the caller spends between two solutions, since the alarm keeps running
+% while a solution is processed.
+% Exceeding a limit throws time_limit_exceeded, inference_limit_exceeded or
+% a resource_error. Unlike call_with_time_limit/2, Goal can have multiple
+% solutions. The used resources are recorded under Key (an atom that is unique
+% for every call, so that nested calls do not overwrite each other) at every
+% solution and when the call is finished (see query_statistics/4).
+
+limited_call(Goal, TimeLimit, InferenceLimit, StackLimit, Key) :-
+    statistics(inferences, Inferences0),
+    statistics(cputime, CpuTime0),
+    statistics(globalused, GlobalUsed0),
+    nb_setval(Key, statistics(0, 0.0, GlobalUsed0)),
+    setup_call_cleanup(
+        true,
+        ( with_stack_limit(StackLimit,
+              with_time_limit(TimeLimit,
+                  with_inference_limit(InferenceLimit, Goal))),
+          update_statistics(Key, Inferences0, CpuTime0)
+        ),
+        update_statistics(Key, Inferences0, CpuTime0)
+    ).
+
+
+%------------------------------------------------------------------------------
+% query_statistics(+Key, -Inferences, -CpuTime, -PeakGlobalUsed)
+%------------------------------------------------------------------------------
+% The resources used by the call of limited_call/5 with Key: inferences, CPU
+% time in seconds and the peak global stack usage in bytes, sampled at every
+% solution. The statistics are removed, so that they can be read only once.
+
+query_statistics(Key, Inferences, CpuTime, PeakGlobalUsed) :-
+    nb_current(Key, statistics(Inferences, CpuTime, PeakGlobalUsed)),
+    nb_delete(Key).
+
+
+update_statistics(Key, Inferences0, CpuTime0) :-
+    statistics(inferences, Inferences1),
+    statistics(cputime, CpuTime1),
+    statistics(globalused, GlobalUsed),
+    nb_getval(Key, statistics(_, _, PeakGlobalUsed0)),
+    Inferences is Inferences1 - Inferences0,
+    CpuTime is CpuTime1 - CpuTime0,
+    PeakGlobalUsed is max(PeakGlobalUsed0, GlobalUsed),
+    nb_setval(Key, statistics(Inferences, CpuTime, PeakGlobalUsed)).
+
+
+with_stack_limit(none, Goal) :-
+    !,
+    call(Goal).
+
+with_stack_limit(StackLimit, Goal) :-
+    current_prolog_flag(stack_limit, OldStackLimit),
+    setup_call_cleanup(
+        set_prolog_flag(stack_limit, StackLimit),
+        Goal,
+        set_prolog_flag(stack_limit, OldStackLimit)
+    ).
+
+
+with_time_limit(none, Goal) :-
+    !,
+    call(Goal).
+
+with_time_limit(TimeLimit, Goal) :-
+    setup_call_cleanup(
+        alarm(TimeLimit, throw(time_limit_exceeded), Alarm),
+        Goal,
+        remove_alarm(Alarm)
+    ).
+
+
+with_inference_limit(none, Goal) :-
+    !,
+    call(Goal).
+
+with_inference_limit(InferenceLimit, Goal) :-
+    call_with_inference_limit(Goal, InferenceLimit, Result),
+    (  Result == inference_limit_exceeded
+    -> throw(inference_limit_exceeded)
+    ;  true
+    ).
+
+
+%------------------------------------------------------------------------------
+% profile_goal(:Goal, -Solutions, -Rows)
+%------------------------------------------------------------------------------
+% Finds all solutions of Goal with the SWI-Prolog profiler switched on.
+% Solutions is the number of solutions. Rows contains for every called
+% predicate [Module, Name, Arity, Calls, InclusiveTime, ExclusiveTime], with
+% the times in seconds.
+
+profile_goal(Goal, Solutions, Rows) :-
+    reset_profiler,
+    profiler(OldProfiler, cputime),
+    call_cleanup(
+        aggregate_all(count, Goal, Solutions),
+        profiler(_, OldProfiler)
+    ),
+    profile_data(Data),
+    get_dict(summary, Data, Summary),
+    get_dict(ticks, Summary, Ticks),
+    get_dict(time, Summary, Time),
+    get_dict(nodes, Data, Nodes),
+    findall(Row, (member(Node, Nodes), profile_row(Node, Ticks, Time, Row)), Rows).
+
+
+profile_row(Node, Ticks, Time, [Module, Name, Arity, Calls, InclusiveTime, ExclusiveTime]) :-
+    get_dict(predicate, Node, Predicate),
+    (  Predicate = Module:Name/Arity
+    -> true
+    ;  Predicate = Name/Arity,
+       Module = user
+    ),
+    get_dict(call, Node, Calls),
+    get_dict(ticks_self, Node, TicksSelf),
+    get_dict(ticks_siblings, Node, TicksSiblings),
+    ticks_to_seconds(TicksSelf + TicksSiblings, Ticks, Time, InclusiveTime),
+    ticks_to_seconds(TicksSelf, Ticks, Time, ExclusiveTime).
+
+
+ticks_to_seconds(_, 0, _, 0.0) :-
+    !.
+
+ticks_to_seconds(NodeTicks, Ticks, Time, Seconds) :-
+    Seconds is NodeTicks * Time / Ticks.
+
+
+%------------------------------------------------------------------------------
+% cancel_thread(+ThreadId)
+%------------------------------------------------------------------------------
+% Aborts the query that runs in the thread ThreadId by throwing
+% geolog_cancelled. Does nothing if the thread does not exist anymore.
+
+cancel_thread(ThreadId) :-
+    catch(thread_signal(ThreadId, throw(geolog_cancelled)), _, true).
@@ -0,0 +1,84 @@
+# QLF Cache
+#
+# Author: Tobias Grubenmann
+# Email: grubenmann@cs.uni-bonn.de
+# Copyright: (C) 2020 Tobias Grubenmann
+
+import hashlib
+import os.path
+import shutil
+
+import geolog_core.util
+import pyswip.prolog
+
+
+class QlfCache(object):
+    """Keeps quick load files (.qlf) of Prolog files, so that they are not recompiled in every session.
+       The files are compiled in place (the .qlf file is written next to the source), so that the loaded modules keep
+       the identity of their source file. A compiled file is used as long as the content of its source is unchanged
+       and it was compiled by the same SWI-Prolog version. The digests of the sources are kept in the cache
+       directory. If the directory of a source is not writable, the source is consulted."""
+
+    def __init__(self, interpreter, cache_directory=None):
+        self.interpreter = interpreter
+        if cache_directory is None:
+            cache_directory = os.path.join(geolog_core.util.get_cache_directory(), "qlf")
+        self.cache_directory = cache_directory
+        self._prolog_version = None
+
+    def get_prolog_version(self):
+        if self._prolog_version is None:
+            self._prolog_version = self.interpreter.query("current_prolog_flag(version, Version)")[0]["Version"]
+        return self._prolog_version
+
+    @staticmethod
+    def get_qlf_file_name(file_name):
+        return os.path.splitext(file_name)[0] + ".qlf"
+
+    def get_digest_file_name(self, file_name):
+        """The file in the cache directory that keeps the digest of the source the .qlf file was compiled from."""
+        key = hashlib.md5(os.path.abspath(file_name).encode("utf-8")).hexdigest()
+        name = os.path.splitext(os.path.basename(file_name))[0]
+        return os.path.join(self.cache_directory, "{0}_{1}.digest".format(name, key))
+
+    def get_digest(self, file_name):
+        """The digest of the content of a source file and the SWI-Prolog version."""
+        with open(file_name, "rb") as source_file:
+            content = source_file.read()
+        return "{0} {1} {2}".format(self.get_prolog_version(), len(content), hashlib.md5(content).hexdigest())
+
+    def is_fresh(self, file_name, digest=None):
+        """True if the .qlf file of a source was compiled from its current content."""
+        if digest is None:
+            digest = self.get_digest(file_name)
+        try:
+            with open(self.get_digest_file_name(file_name)) as digest_file:
+                cached_digest = digest_file.read()
+        except (IOError, OSError):
+            return False
+        return cached_digest == digest and os.path.exists(self.get_qlf_file_name(file_name))
+
+    def load(self, file_name):
+        """Loads a Prolog file from its .qlf file. If the .qlf file is outdated, the file is compiled (and loaded).
+           Falls back to consulting the source file if the file cannot be compiled or loaded."""
+        qlf_file_name = self.get_qlf_file_name(file_name)
+        try:
+            digest = self.get_digest(file_name)
+            if not self.is_fresh(file_name, digest) and os.path.exists(qlf_file_name):
+                # qcompile(auto) only compares the modification times
+                os.remove(qlf_file_name)
+            # compiles the .qlf file if it is missing and the directory is writable, loads it otherwise
+            self.interpreter.query("load_files('" + geolog_core.util.escape_file_name(file_name) +
+                                   "', [qcompile(auto)])")
+            if os.path.exists(qlf_file_name):
+                if not os.path.isdir(self.cache_directory):
+                    os.makedirs(self.cache_directory)
+                with open(self.get_digest_file_name(file_name), "w") as digest_file:
+                    digest_file.write(digest)
+        except (IOError, OSError, pyswip.prolog.PrologError):
+            self.interpreter.consult(file_name)
+
+    def clear(self):
+        """Forgets the digests, so that all files are compiled again when they are loaded."""
+        if os.path.isdir(self.cache_directory):
+            shutil.rmtree(self.cache_directory)
@@ -0,0 +1,385 @@
+# Query Server
+#
+# Author: Tobias Grubenmann
+# Email: grubenmann@cs.uni-bonn.de
+# Copyright: (C) 2020 Tobias Grubenmann
+
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import struct
+import threading
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+# Wire format: every message is a frame of a 4-byte big-endian length followed by a JSON array.
+# Requests:  ["query", Query, Options], ["consult", FileName]
+# Responses: ["vars", Names] (once, before the first row), ["row", Values] (one per solution),
+#            ["end", Count] or ["error", ErrorType, Message]
+_HEADER = struct.Struct(">I")
+
+# the requests that clients may send, all others are answered with an error
+_REQUEST_TYPES = ("query", "consult")
+
+# seconds between the checks whether a worker process that does not respond is still alive
+_POLL_INTERVAL = 1
+
+
+class QueryServerError(Exception):
+    """An error raised by a query on the server. error_type is the name of the original exception class."""
+
+    def __init__(self, error_type, message):
+        super(QueryServerError, self).__init__(message)
+        self.error_type = error_type
+
+
+def _send_frame(connection, message):
+    payload = json.dumps(message, separators=(",", ":"), default=str).encode("ascii")
+    connection.sendall(_HEADER.pack(len(payload)) + payload)
+
+
+def _receive_exactly(connection, size):
+    data = b""
+    while len(data) < size:
+        chunk = connection.recv(size - len(data))
+        if not chunk:
+            raise EOFError("Connection closed.")
+        data += chunk
+    return data
+
+
+def _receive_frame(connection):
+    size = _HEADER.unpack(_receive_exactly(connection, _HEADER.size))[0]
+    return json.loads(_receive_exactly(connection, size).decode("ascii"))
+
+
+def _is_loopback(host):
+    try:
+        address = socket.gethostbyname(host)
+    except socket.error:
+        return False
+    return address.startswith("127.")
+
+
+def _create_socket(address):
+    """A string address is a Unix socket path, a tuple (host, port) a TCP address."""
+    if isinstance(address, str):
+        return socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    return socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+
+
+def _run_worker(connection, plugins):
+    """Main function of a worker process. Creates an Interpreter and answers the requests of the server."""
+    import geolog_core.interpreter
+
+    interpreter = geolog_core.interpreter.Interpreter()
+    for path, package in plugins:
+        interpreter.add_plugin(path, package)
+    connection.send(("ready",))
+    _serve_worker(connection, interpreter)
+
+
+def _serve_worker(connection, interpreter):
+    """Answers the requests of the server with interpreter until the server sends stop."""
+    while True:
+        request = connection.recv()
+        if request[0] == "stop":
+            break
+        if request[0] == "cancel":
+            # the client disconnected after the query was finished, there is nothing to cancel
+            continue
+        try:
+            if request[0] == "consult":
+                interpreter.consult(request[1], catch_errors=False)
+                connection.send(("end", 0))
+            elif request[0] == "query":
+                _run_worker_query(connection, interpreter, request[1], request[2])
+            else:
+                connection.send(("error", "QueryServerError", "Unknown request: {0}".format(request[0])))
+        except Exception as e:
+            connection.send(("error", type(e).__name__, str(e)))
+
+
+def _run_worker_query(connection, interpreter, query, options):
+    names = None
+    count = 0
+    solutions = interpreter.iter_query(query, catch_errors=False, **options)
+    try:
+        for solution in solutions:
+            if names is None:
+                names = sorted(solution)
+                connection.send(("vars", names))
+            connection.send(("row", [solution[name] for name in names]))
+            count += 1
+            # the server cancels the query if the client disconnected
+            if connection.poll() and connection.recv()[0] == "cancel":
+                break
+    finally:
+        solutions.close()
+    connection.send(("end", count))
+
+
+class QueryServer(object):
+    """Answers Geolog queries of QueryClients with a pool of worker processes, each with its own Interpreter.
+       Every request is forwarded to an idle worker, so that the queries of all clients are spread over the workers.
+       plugins is a list of (path, package) that is added to the Interpreter of every worker.
+       Clients can run arbitrary Prolog goals (including shell/1) with the rights of the server, therefore the server
+       only listens on loopback addresses or Unix sockets, unless allow_remote is True."""
+
+    def __init__(self, address=("localhost", 0), workers=None, plugins=(), allow_remote=False):
+        if not isinstance(address, str) and not allow_remote and not _is_loopback(address[0]):
+            raise ValueError("The query server only listens on loopback addresses, {0} is not one.".format(
+                address[0]))
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+        self.address = address
+        self.workers = workers
+        self.plugins = list(plugins)
+        self._processes = []
+        self._idle = queue.Queue()
+        self._worker_count = 0
+        self._worker_count_lock = threading.Lock()
+        self._broadcast_lock = threading.Lock()
+        self._socket = None
+        self._running = False
+
+    def start(self):
+        """Starts the worker processes and listens for clients in a background thread."""
+        for _ in range(self.workers):
+            connection, worker_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_run_worker, args=(worker_connection, self.plugins))
+            process.daemon = True
+            process.start()
+            # wait until the Interpreter of the worker is loaded
+            connection.recv()
+            self._processes.append((process, connection))
+            self._idle.put(connection)
+        self._worker_count = len(self._processes)
+
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.remove(self.address)
+        self._socket = _create_socket(self.address)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind(self.address)
+        self._socket.listen(16)
+        # the actual address, if the port was chosen by the system
+        self.address = self._socket.getsockname()
+        self._running = True
+
+        thread = threading.Thread(target=self._accept)
+        thread.daemon = True
+        thread.start()
+        return self
+
+    def serve_forever(self):
+        self.start()
+        try:
+            while self._running:
+                threading.Event().wait(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def _accept(self):
+        while self._running:
+            try:
+                client, _ = self._socket.accept()
+            except socket.error:
+                break
+            thread = threading.Thread(target=self._handle, args=(client,))
+            thread.daemon = True
+            thread.start()
+
+    def _handle(self, client):
+        try:
+            while True:
+                request = _receive_frame(client)
+                if not isinstance(request, list) or not request or request[0] not in _REQUEST_TYPES:
+                    _send_frame(client, ("error", "QueryServerError", "Unknown request."))
+                elif request[0] == "consult":
+                    self._broadcast(request, client)
+                elif not self._forward(request, client):
+                    break
+        except (EOFError, socket.error, ValueError):
+            pass
+        finally:
+            client.close()
+
+    def _forward(self, request, client):
+        """Forwards a request to an idle worker and streams the responses to the client.
+           Returns False if the client disconnected."""
+        worker = self._idle.get()
+        client_connected = True
+        try:
+            worker.send(tuple(request))
+            while True:
+                message = self._receive(worker)
+                finished = message[0] in ("end", "error")
+                if client_connected:
+                    try:
+                        _send_frame(client, message)
+                    except socket.error:
+                        client_connected = False
+                        if not finished:
+                            worker.send(("cancel",))
+                if finished:
+                    break
+        except (EOFError, IOError):
+            # the worker process died, it is not returned to the pool
+            self._remove_worker()
+            if client_connected:
+                _send_frame(client, ("error", "QueryServerError", "The worker process terminated."))
+            return client_connected
+        self._idle.put(worker)
+        return client_connected
+
+    def _receive(self, worker):
+        """Receives the next message of a worker. Raises EOFError if the worker process terminated."""
+        while not worker.poll(_POLL_INTERVAL):
+            if not any(process.is_alive() for process, connection in self._processes if connection is worker):
+                raise EOFError("The worker process terminated.")
+        return worker.recv()
+
+    def _remove_worker(self):
+        with self._worker_count_lock:
+            self._worker_count -= 1
+
+    def _broadcast(self, request, client):
+        """Sends a request to all workers (e.g. consult, so that all Interpreters stay equal) and responds with the
+           first error, if any."""
+        with self._broadcast_lock:
+            workers = []
+            # workers that die while the others are collected are not returned to the pool
+            while True:
+                with self._worker_count_lock:
+                    if len(workers) >= self._worker_count:
+                        break
+                try:
+                    workers.append(self._idle.get(timeout=_POLL_INTERVAL))
+                except queue.Empty:
+                    pass
+        response = ("end", 0)
+        for worker in workers:
+            try:
+                worker.send(tuple(request))
+                message = self._receive(worker)
+            except (EOFError, IOError):
+                self._remove_worker()
+                continue
+            if message[0] == "error" and response[0] != "error":
+                response = message
+            self._idle.put(worker)
+        _send_frame(client, response)
+
+    def stop(self):
+        self._running = False
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+            if isinstance(self.address, str) and os.path.exists(self.address):
+                os.remove(self.address)
+        for process, connection in self._processes:
+            try:
+                connection.send(("stop",))
+            except IOError:
+                pass
+            process.join(5)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
+
+
+class QueryClient(object):
+    """Sends queries to a QueryServer. Offers the query and consult methods of the Interpreter, without loading
+       SWI-Prolog in the client process."""
+
+    def __init__(self, address):
+        self.address = address
+        self._socket = None
+
+    def _get_socket(self):
+        if self._socket is None:
+            self._socket = _create_socket(self.address)
+            self._socket.connect(self.address)
+        return self._socket
+
+    def _request(self, request):
+        connection = self._get_socket()
+        _send_frame(connection, request)
+        while True:
+            message = _receive_frame(connection)
+            if message[0] == "error":
+                raise QueryServerError(message[1], message[2])
+            yield message
+            if message[0] == "end":
+                break
+
+    def iter_query(self, query, **options):
+        """Yields the solutions of a query as they arrive from the server.
+           The options (limit, offset, time_limit, inference_limit, stack_limit) are passed to
+           Interpreter.iter_query. Closing the generator early cancels the query on the server."""
+        names = None
+        finished = False
+        try:
+            for message in self._request(("query", query, options)):
+                if message[0] == "vars":
+                    names = message[1]
+                elif message[0] == "row":
+                    yield dict(zip(names, message[1]))
+            finished = True
+        finally:
+            if not finished:
+                # the server cancels the query when the connection is closed
+                self.close()
+
+    def query(self, query, **options):
+        """Executes a query on the server. Returns the same results as Interpreter.query."""
+        result = list(self.iter_query(query, **options))
+        if not result:
+            result = False
+        elif result == [{}]:
+            result = True
+        return result
+
+    def consult(self, file_name):
+        """Consults a file in all worker processes."""
+        for _ in self._request(("consult", file_name)):
+            pass
+
+    def close(self):
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runs a Geolog query server.")
+    # WARNING: clients can run arbitrary Prolog goals, only loopback addresses are accepted
+    parser.add_argument("--host", default="localhost", help="loopback address to listen on")
+    parser.add_argument("--port", type=int, default=7745)
+    parser.add_argument("--socket", help="path of a Unix socket (instead of host and port)")
+    parser.add_argument("--workers", type=int, default=None)
+    arguments = parser.parse_args()
+
+    server = QueryServer(arguments.socket or (arguments.host, arguments.port), arguments.workers)
+    server.serve_forever()
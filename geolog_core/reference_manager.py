@@ -4,14 +4,41 @@
 # Email: grubenmann@cs.uni-bonn.de
 # Copyright: (C) 2020 Tobias Grubenmann
 
+import collections
+import ctypes
+import itertools
+import sys
 import threading
 
 import geolog_core.util
 import pyswip
+import pyswip.core
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    # Python 2
+    from collections import Mapping
 
 
 lock = threading.Lock()
 
+# Objects are referenced in Prolog by text blobs of this type instead of ordinary atoms: the atom garbage collector
+# reclaims a blob as soon as Prolog no longer references it and calls _release_object, which releases the object.
+OBJECT_BLOB_NAME = "python_object"
+
+
+@pyswip.core.PL_blob_release_t
+def _release_object(atom):
+    ReferenceManager()._release(atom)
+    return 1
+
+
+_object_blob = pyswip.core.PL_blob_t(magic=pyswip.core.PL_BLOB_MAGIC,
+                                     flags=pyswip.core.PL_BLOB_UNIQUE | pyswip.core.PL_BLOB_TEXT,
+                                     name=OBJECT_BLOB_NAME.encode("ascii"),
+                                     release=_release_object)
+
 
 class Singleton(type):
     _instances = {}
@@ -24,26 +51,252 @@ class Singleton(type):
         return cls._instances[cls]
 
 
-class ReferenceManager(object):
+# base class of singletons, since the __metaclass__ attribute is ignored by Python 3
+SingletonBase = Singleton("SingletonBase", (object,), {})
+
 
-    __metaclass__ = Singleton
+class ReferenceManager(SingletonBase):
+    """Keeps the Python objects that are referenced in Prolog by atoms.
+       Objects that are put while a scope is open (e.g. during a query, see Interpreter.iter_query) are released
+       as soon as Prolog no longer references their atom (by the atom garbage collector), or when the scope is
+       closed, unless they are pinned or returned by the query. Returned and pinned objects are kept until they
+       are cleared. Handles can also be passed back by name (e.g. in the text of a later query)."""
 
     def __init__(self):
+        # atom handle -> object
         self._object_dict = {}
+        # atom name -> atom handle and atom handle -> atom name
+        self._handles = {}
+        self._names = {}
+        # the handles with a registered reference, i.e. the objects that survive atom garbage collection even if
+        # Prolog no longer references them (pinned, returned or put outside of a scope)
+        self._held = set()
+        self._pinned = set()
+        # handle -> number of references of caches (see keep)
+        self._kept = {}
+        # the stack of open scopes (sets of handles) of every thread
+        self._local = threading.local()
+        self._ids = itertools.count()
+
+    def _get_scopes(self):
+        try:
+            return self._local.scopes
+        except AttributeError:
+            scopes = self._local.scopes = []
+            return scopes
+
+    def _get_handle(self, key):
+        """The handle of the object of key (an Atom that is the handle itself or has its name, or a handle),
+           None if unknown."""
+        if isinstance(key, pyswip.Atom):
+            if key.handle in self._object_dict:
+                return key.handle
+            return self._handles.get(key.value)
+        if key in self._object_dict:
+            return key
+        return None
 
     def create_atom(self):
-        atom_name = geolog_core.util.get_new_uuid()
-        return pyswip.Atom(atom_name)
+        """Creates a new object handle (a blob that is written as python_object_<n>).
+           The handle is only referenced by the returned Atom, which must be put before it is dropped."""
+        atom_name = "{0}_{1}".format(OBJECT_BLOB_NAME, next(self._ids))
+        # the term is discarded, so that it does not keep the handle from being garbage collected
+        frame = pyswip.core.PL_open_foreign_frame()
+        try:
+            term = pyswip.core.PL_new_term_ref()
+            pyswip.core.PL_put_blob(term, atom_name.encode("ascii"), len(atom_name), ctypes.byref(_object_blob))
+            handle = pyswip.core.atom_t()
+            pyswip.core.PL_get_atom(term, ctypes.byref(handle))
+            return pyswip.Atom(handle.value, atom_name)
+        finally:
+            pyswip.core.PL_discard_foreign_frame(frame)
 
     def put(self, key, value):
-        self._object_dict[key] = value
+        self._object_dict[key.handle] = value
+        self._handles[key.value] = key.handle
+        self._names[key.handle] = key.value
+        scopes = self._get_scopes()
+        if scopes:
+            # only the raw handle is kept, the object is released when Prolog no longer references it
+            scopes[-1].add(key.handle)
+        else:
+            # objects put outside of a query are kept until they are cleared
+            self._hold(key.handle)
 
     def get(self, key):
-        return self._object_dict[key]
+        handle = self._get_handle(key)
+        if handle is None:
+            raise KeyError(key.value)
+        return self._object_dict[handle]
+
+    def contains(self, key):
+        return self._get_handle(key) is not None
 
     def clear(self, key):
-        if key in self._object_dict:
-            del self._object_dict[key]
+        handle = self._get_handle(key)
+        if handle is not None:
+            self._release(handle)
+
+    def _release(self, handle):
+        """Releases the object of a handle (also called when the atom garbage collector reclaims the handle)."""
+        self._object_dict.pop(handle, None)
+        self._handles.pop(self._names.pop(handle, None), None)
+        self._unhold(handle)
+        self._pinned.discard(handle)
+
+    def _hold(self, handle):
+        """Registers a reference to a handle, so that the atom garbage collector does not release the object."""
+        if handle not in self._held:
+            pyswip.core.PL_register_atom(handle)
+            self._held.add(handle)
+
+    def _unhold(self, handle):
+        if handle in self._held:
+            self._held.discard(handle)
+            pyswip.core.PL_unregister_atom(handle)
 
     def reset(self):
+        for handle in list(self._held):
+            self._unhold(handle)
+        for handle in self._kept:
+            pyswip.core.PL_unregister_atom(handle)
+        self._kept = {}
         self._object_dict = {}
+        self._handles = {}
+        self._names = {}
+        self._pinned = set()
+        self._local = threading.local()
+
+    def pin(self, key):
+        """Keeps the object of key until it is cleared, even if it was put in a scope that is closed.
+           Returns False if key is not the handle of an object."""
+        handle = self._get_handle(key)
+        if handle is None:
+            return False
+        self._pinned.add(handle)
+        self._hold(handle)
+        return True
+
+    def unpin(self, key):
+        """Undoes pin. The object is released when the current scope is closed, immediately if there is none.
+           Returns False if key is not the handle of a pinned object."""
+        handle = self._get_handle(key)
+        if handle not in self._pinned:
+            return False
+        self._pinned.discard(handle)
+        self._unhold(handle)
+        scopes = self._get_scopes()
+        if scopes:
+            scopes[-1].add(handle)
+        elif handle not in self._kept:
+            self._release(handle)
+        return True
+
+    def keep(self, handle):
+        """Keeps the object of a handle for a cache (see geolog_core.memoization) until drop is called as often.
+           Unlike unpin, drop never releases an object that is pinned or was returned by a query."""
+        count = self._kept.get(handle, 0)
+        if not count:
+            pyswip.core.PL_register_atom(handle)
+        self._kept[handle] = count + 1
+
+    def drop(self, handle):
+        """Undoes keep. The object is released by the atom garbage collector once Prolog no longer references it,
+           unless it is pinned, returned by a query or kept by another cache."""
+        count = self._kept.get(handle, 0)
+        if count > 1:
+            self._kept[handle] = count - 1
+        elif count:
+            del self._kept[handle]
+            pyswip.core.PL_unregister_atom(handle)
+
+    def is_pinned(self, key):
+        return self._get_handle(key) in self._pinned
+
+    def open_scope(self):
+        """Opens a scope on the current thread and returns it. Scopes can be nested."""
+        scope = set()
+        self._get_scopes().append(scope)
+        return scope
+
+    def close_scope(self, scope, kept_names=(), release=True):
+        """Closes a scope and releases its objects, except pinned objects, objects kept by a cache and those whose
+           atom name is in kept_names (e.g. objects returned by a query). If release is False, no object is released.
+           Objects that are not released are passed to the enclosing scope, if there is one, and kept until they
+           are cleared otherwise."""
+        scopes = self._get_scopes()
+        parent = None
+        # usually the last scope, unless generators are closed out of order
+        for i in range(len(scopes) - 1, -1, -1):
+            if scopes[i] is scope:
+                del scopes[i]
+                if i > 0:
+                    parent = scopes[i - 1]
+                break
+        for handle in scope:
+            if handle not in self._object_dict:
+                # released by the atom garbage collector
+                continue
+            if handle in self._pinned:
+                continue
+            if release and self._names[handle] not in kept_names:
+                if handle not in self._kept:
+                    self._release(handle)
+            elif parent is not None:
+                parent.add(handle)
+            else:
+                self._hold(handle)
+
+    def get_statistics(self):
+        """The number of live objects and their (shallow) size in bytes by type name."""
+        statistics = collections.defaultdict(lambda: {"count": 0, "bytes": 0})
+        for value in list(self._object_dict.values()):
+            entry = statistics[type(value).__name__]
+            entry["count"] += 1
+            entry["bytes"] += sys.getsizeof(value, 0)
+        return dict(statistics)
+
+
+def get_names(value, names=None):
+    """The atom names in a (decoded) value, i.e. the strings and atoms in it and its lists, tuples and dicts."""
+    if names is None:
+        names = set()
+    if isinstance(value, geolog_core.util.string_types):
+        names.add(value)
+    elif isinstance(value, pyswip.Atom):
+        names.add(value.value)
+    elif isinstance(value, (list, tuple)):
+        for element in value:
+            get_names(element, names)
+    elif isinstance(value, pyswip.Functor):
+        for element in value.args:
+            get_names(element, names)
+    elif isinstance(value, Mapping):
+        for element in value.values():
+            get_names(element, names)
+    return names
+
+
+def get_term_names(term, names=None):
+    """The names of the object handles in a Prolog term, found without decoding the term."""
+    if names is None:
+        names = set()
+    handle_names = ReferenceManager()._names
+    atom = pyswip.core.atom_t()
+    arity = ctypes.c_int()
+    frame = pyswip.core.PL_open_foreign_frame()
+    try:
+        terms = [term]
+        while terms:
+            current = terms.pop()
+            if pyswip.core.PL_get_atom(current, ctypes.byref(atom)):
+                if atom.value in handle_names:
+                    names.add(handle_names[atom.value])
+            elif pyswip.core.PL_get_name_arity(current, ctypes.byref(atom), ctypes.byref(arity)):
+                for index in range(1, arity.value + 1):
+                    argument = pyswip.core.PL_new_term_ref()
+                    pyswip.core.PL_get_arg(index, current, argument)
+                    terms.append(argument)
+    finally:
+        pyswip.core.PL_discard_foreign_frame(frame)
+    return names
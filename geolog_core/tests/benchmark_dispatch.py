@@ -0,0 +1,58 @@
+import timeit
+
+import geolog_core.plugin_index
+import geolog_core.predicate
+import geolog_core.tests.test_interpreter
+import pyswip
+
+NUMBER = 100000
+
+
+class DistancePredicate(geolog_core.predicate.DeterministicPredicate):
+
+    @classmethod
+    def get_predicate_name(cls):
+        return "distance"
+
+    @classmethod
+    def get_module_name(cls):
+        return "benchmark"
+
+    @classmethod
+    def _get_predicate_function(cls):
+        return cls.distance
+
+    @classmethod
+    def distance(cls, x, y, result):
+        return True
+
+
+def time_prolog_calls(interpreter, goal):
+    """The time of NUMBER calls of goal from Prolog, without the time of the loop."""
+    loop = "between(1, " + str(NUMBER) + ", _), {0}, fail"
+    goal_time = timeit.timeit(lambda: interpreter.query(loop.format(goal)), number=1)
+    loop_time = timeit.timeit(lambda: interpreter.query(loop.format("true")), number=1)
+    return goal_time - loop_time
+
+
+if __name__ == "__main__":
+    interpreter = geolog_core.tests.test_interpreter.create_interpreter(DistancePredicate)
+    variable = pyswip.Variable()
+
+    # the callables that are passed to registerForeign, with tracing and profiling off
+    foreign_function = interpreter._get_foreign_function(DistancePredicate, 3)
+    indexed_function = interpreter._get_foreign_function(
+        geolog_core.plugin_index.IndexedPredicate.from_class(DistancePredicate), 3)
+
+    execute_time = timeit.timeit(lambda: DistancePredicate.execute(1.0, 2.0, variable), number=NUMBER)
+    foreign_time = timeit.timeit(lambda: foreign_function(1.0, 2.0, variable), number=NUMBER)
+    indexed_time = timeit.timeit(lambda: indexed_function(1.0, 2.0, variable), number=NUMBER)
+    prolog_time = time_prolog_calls(interpreter, "benchmark:distance(1.0, 2.0, _)")
+    arity_time = timeit.timeit(DistancePredicate.get_maximum_arity, number=NUMBER)
+
+    print("Per call (execute):                      {0:.3f}us".format(execute_time / NUMBER * 1e6))
+    print("Per call (registered function):          {0:.3f}us".format(foreign_time / NUMBER * 1e6))
+    print("Per call (registered indexed predicate): {0:.3f}us".format(indexed_time / NUMBER * 1e6))
+    print("Speedup: {0:.1f}x".format(execute_time / foreign_time))
+    print("Per call from Prolog (incl. pyswip):     {0:.3f}us".format(prolog_time / NUMBER * 1e6))
+    print("get_maximum_arity (cached): {0:.3f}us".format(arity_time / NUMBER * 1e6))
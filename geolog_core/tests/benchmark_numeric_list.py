@@ -0,0 +1,39 @@
+import array
+import timeit
+
+import geolog_core.numeric_list
+import pyswip
+
+SIZES = (10, 10000, 1000000)
+
+
+def put_elementwise(values):
+    variable = pyswip.Variable()
+    variable.value = values.tolist()
+    return variable
+
+
+def put_bulk(values):
+    variable = pyswip.Variable()
+    geolog_core.numeric_list.unify(variable, values)
+    return variable
+
+
+if __name__ == "__main__":
+    for size in SIZES:
+        values = array.array("d", (i * 0.5 for i in range(size)))
+        number = max(1, 100000 // size)
+
+        put_elementwise_time = timeit.timeit(lambda: put_elementwise(values), number=number) / number
+        put_bulk_time = timeit.timeit(lambda: put_bulk(values), number=number) / number
+
+        variable = put_bulk(values)
+        get_elementwise_time = timeit.timeit(lambda: pyswip.easy.getList(variable.handle), number=number) / number
+        get_bulk_time = timeit.timeit(lambda: geolog_core.numeric_list.get_array(variable.handle), number=number) / \
+            number
+
+        print("{0} values".format(size))
+        print("  Python -> Prolog: {0:.3f}ms element by element, {1:.3f}ms bulk ({2:.1f}x)".format(
+            put_elementwise_time * 1e3, put_bulk_time * 1e3, put_elementwise_time / put_bulk_time))
+        print("  Prolog -> Python: {0:.3f}ms element by element, {1:.3f}ms bulk ({2:.1f}x)".format(
+            get_elementwise_time * 1e3, get_bulk_time * 1e3, get_elementwise_time / get_bulk_time))
@@ -0,0 +1,39 @@
+import timeit
+
+import geolog_core.interpreter
+import geolog_core.plugin_index
+import geolog_plugins
+
+# Creates the interpreter in a fresh process, so that no plugin module is imported yet.
+STARTUP_STATEMENT = "subprocess.check_call([sys.executable, '-c', " \
+                    "'import geolog_core.interpreter; geolog_core.interpreter.Interpreter()'])"
+
+# Imports arcpy in a fresh process, which a warm start avoids.
+ARCPY_IMPORT_STATEMENT = "subprocess.check_call([sys.executable, '-c', 'import arcpy'])"
+
+
+def time_startup():
+    return timeit.timeit(STARTUP_STATEMENT, setup="import subprocess, sys", number=1)
+
+
+if __name__ == "__main__":
+    interpreter = geolog_core.interpreter.Interpreter()
+    plugin_index = geolog_core.plugin_index.PluginIndex(interpreter.plugins)
+
+    plugin_index.clear()
+    cold = time_startup()
+    warm = time_startup()
+
+    print("Startup time (cold, index rebuilt): {0:.3f}s".format(cold))
+    print("Startup time (warm, index read):    {0:.3f}s".format(warm))
+    print("Speedup: {0:.1f}x".format(cold / warm))
+
+    environment = timeit.timeit(plugin_index.get_environment, number=10) / 10
+    print("Index environment check (every warm start): {0:.3f}s".format(environment))
+    if geolog_plugins.get_plugin_version() is not None:
+        arcpy_import = timeit.timeit(ARCPY_IMPORT_STATEMENT, setup="import subprocess, sys", number=1)
+        print("Import of arcpy (avoided by a warm start):   {0:.3f}s".format(arcpy_import))
+
+    fork_server = interpreter.create_fork_server()
+    forked = timeit.timeit(lambda: fork_server.query("true"), number=10) / 10
+    print("Task startup (forked from a loaded interpreter): {0:.3f}s".format(forked))
@@ -0,0 +1,135 @@
+import sys
+import threading
+import unittest
+
+import geolog_core.async_query
+import geolog_core.predicate
+import geolog_core.tests.test_interpreter
+import pyswip.prolog
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
+
+@unittest.skipIf(asyncio is None, "requires asyncio")
+class TestAsyncQuery(unittest.TestCase):
+
+    def setUp(self):
+        self.interpreter = geolog_core.tests.test_interpreter.create_interpreter(Produced)
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        Produced.values = []
+
+    def tearDown(self):
+        self.loop.close()
+        asyncio.set_event_loop(None)
+
+    def next_solution(self, solutions):
+        return self.loop.run_until_complete(solutions.__anext__())
+
+    def collect(self, solutions):
+        result = []
+        while True:
+            try:
+                result.append(self.next_solution(solutions))
+            except StopAsyncIteration:
+                return result
+
+    def wait(self, seconds=0.2):
+        """Runs the event loop, so that the engine thread can pass solutions to it."""
+        self.loop.run_until_complete(asyncio.sleep(seconds))
+
+    def assertStopped(self, query):
+        query._thread.join(5)
+        self.assertFalse(query._thread.is_alive())
+        # the engine can be used by other queries
+        self.assertEqual([{"X": 1}], self.interpreter.query("X = 1"))
+
+    def test_aquery(self):
+        result = self.loop.run_until_complete(self.interpreter.aquery("between(1, 3, X)"))
+
+        self.assertEqual([{"X": 1}, {"X": 2}, {"X": 3}], result)
+
+    def test_aquery_error(self):
+        with self.assertRaises(pyswip.prolog.PrologError):
+            self.loop.run_until_complete(self.interpreter.aquery("X is foo + 1"))
+
+    def test_aiter_in_order(self):
+        solutions = self.interpreter.aiter("between(1, 5, X)", max_buffer=2)
+
+        self.assertEqual([{"X": i} for i in range(1, 6)], self.collect(solutions))
+        self.assertStopped(solutions)
+
+    def test_buffer_bound(self):
+        solutions = self.interpreter.aiter("between(1, inf, X), test_async:produced(X)", max_buffer=2)
+        self.assertEqual({"X": 1}, self.next_solution(solutions))
+        self.wait()
+
+        # two solutions in the buffer and one waiting for space
+        self.assertEqual([1, 2, 3, 4], Produced.values)
+        self.assertEqual({"X": 2}, self.next_solution(solutions))
+        self.wait()
+        self.assertEqual([1, 2, 3, 4, 5], Produced.values)
+
+        self.loop.run_until_complete(solutions.aclose())
+        self.wait()
+        self.assertStopped(solutions)
+
+    def test_cancel_running_query(self):
+        solutions = self.interpreter.aiter("repeat, fail")
+        next_solution = solutions.__anext__()
+        self.wait()
+
+        next_solution.cancel()
+        self.wait()
+
+        self.assertStopped(solutions)
+
+    def test_cancel_aquery(self):
+        threads = set(threading.enumerate())
+        result = self.interpreter.aquery("repeat, fail")
+        self.wait()
+
+        result.cancel()
+        self.wait()
+
+        for thread in set(threading.enumerate()) - threads:
+            thread.join(5)
+            self.assertFalse(thread.is_alive())
+
+
+class TestAsyncQueryPython2(unittest.TestCase):
+
+    @unittest.skipIf(sys.version_info[0] >= 3, "requires Python 2")
+    def test_requires_asyncio(self):
+        with self.assertRaises(NotImplementedError):
+            geolog_core.async_query.AsyncQuery(None, "true")
+
+
+class Produced(geolog_core.predicate.DeterministicPredicate):
+    """Records the solutions that are computed by the engine thread."""
+
+    values = []
+
+    @classmethod
+    def get_predicate_name(cls):
+        return "produced"
+
+    @classmethod
+    def get_module_name(cls):
+        return "test_async"
+
+    @classmethod
+    def _get_predicate_function(cls):
+        return cls.produced
+
+    @classmethod
+    def produced(cls, value):
+        cls.values.append(value)
+        return True
+
+
+if __name__ == '__main__':
+    unittest.main()
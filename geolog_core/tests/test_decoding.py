@@ -0,0 +1,46 @@
+import unittest
+
+import geolog_core.decoding
+import pyswip
+
+
+class TestDecoding(unittest.TestCase):
+
+    def query(self, query, mode):
+        decoder = geolog_core.decoding.get_decoder(mode)
+        return list(pyswip.Prolog.query(query, decoder=decoder))
+
+    def test_typed(self):
+        solution = self.query("X = point(1, 2.5, \"text\", [a, b], _)", geolog_core.decoding.TYPED)[0]
+
+        self.assertEqual(("point", 1, 2.5, "text", ["a", "b"], None), solution["X"])
+        self.assertIsInstance(solution["X"][0], geolog_core.decoding.Symbol)
+        self.assertIsInstance(solution["X"][4][0], geolog_core.decoding.Symbol)
+        self.assertNotIsInstance(solution["X"][3], geolog_core.decoding.Symbol)
+
+    def test_symbols_interned(self):
+        solutions = self.query("member(X, [a, a])", geolog_core.decoding.TYPED)
+
+        self.assertIs(solutions[0]["X"], solutions[1]["X"])
+
+    def test_raw(self):
+        solution = self.query("X = a, Y = f(b)", geolog_core.decoding.RAW)[0]
+
+        self.assertIsInstance(solution["X"], pyswip.Atom)
+        self.assertIsInstance(solution["Y"], pyswip.Functor)
+
+    def test_lazy(self):
+        solutions = self.query("member(X, [f(1), g([2])])", geolog_core.decoding.LAZY)
+
+        self.assertEqual(["X"], list(solutions[0]))
+        self.assertEqual(("f", 1), solutions[0]["X"])
+        self.assertEqual(("g", [2]), solutions[1]["X"])
+        self.assertEqual(("g", [2]), solutions[1]["X"])
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            geolog_core.decoding.get_decoder("unknown")
+
+
+if __name__ == '__main__':
+    unittest.main()
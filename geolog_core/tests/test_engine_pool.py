@@ -0,0 +1,116 @@
+import threading
+import unittest
+
+import geolog_core.engine_pool
+import geolog_core.predicate
+import geolog_core.tests.test_interpreter
+
+
+@unittest.skipIf(geolog_core.engine_pool.concurrent is None, "requires concurrent.futures")
+class TestEnginePool(unittest.TestCase):
+
+    def setUp(self):
+        self.interpreter = geolog_core.tests.test_interpreter.create_interpreter(Rendezvous)
+        self.pool = geolog_core.engine_pool.EnginePool(self.interpreter, workers=2)
+        Rendezvous.arrived = 0
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def count_threads(self):
+        return self.interpreter.query("statistics(threads, N)")[0]["N"]
+
+    def test_map(self):
+        results = self.pool.map(["X = 1", "member(X, [a, b])", "fail", "true"])
+
+        self.assertEqual([[{"X": 1}], [{"X": "a"}, {"X": "b"}], False, True], results)
+
+    def test_concurrent_submit(self):
+        futures = []
+        lock = threading.Lock()
+
+        def submit(start):
+            for i in range(start, start + 10):
+                future = self.pool.submit("X is {0} * 2".format(i))
+                with lock:
+                    futures.append((i, future))
+
+        threads = [threading.Thread(target=submit, args=(start,)) for start in (0, 10, 20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(30, len(futures))
+        for i, future in futures:
+            self.assertEqual([{"X": i * 2}], future.result(10))
+
+    def test_queries_open_in_two_engines(self):
+        # every query waits in the foreign predicate until the other one has called it
+        futures = [self.pool.submit("member(X, [1, 2]), test_pool:rendezvous") for _ in range(2)]
+
+        for future in futures:
+            self.assertEqual([{"X": 1}, {"X": 2}], future.result(30))
+
+    def test_error(self):
+        self.assertIsNotNone(self.pool.submit("X is foo + 1").exception(10))
+        self.assertEqual([{"X": 2}], self.pool.submit("X = 2").result(10))
+
+    def test_submit_prepared(self):
+        prepared_query = self.interpreter.prepare("X is Y * 2")
+        try:
+            futures = [self.pool.submit_prepared(prepared_query, {"Y": i}) for i in range(10)]
+
+            self.assertEqual([[{"X": i * 2}] for i in range(10)], [future.result(10) for future in futures])
+        finally:
+            prepared_query.close()
+
+    def test_shutdown_destroys_engines(self):
+        threads = self.count_threads()
+        self.pool.map(["true", "true"])
+        self.assertGreater(self.count_threads(), threads)
+
+        self.pool.shutdown()
+
+        self.assertEqual(threads, self.count_threads())
+
+
+class TestEnginePoolPython2(unittest.TestCase):
+
+    @unittest.skipIf(geolog_core.engine_pool.concurrent is not None, "requires missing concurrent.futures")
+    def test_requires_futures(self):
+        with self.assertRaises(NotImplementedError):
+            geolog_core.engine_pool.EnginePool(None)
+
+
+class Rendezvous(geolog_core.predicate.DeterministicPredicate):
+    """Waits until a second engine calls it, fails after a timeout."""
+
+    arrived = 0
+
+    condition = threading.Condition()
+
+    @classmethod
+    def get_predicate_name(cls):
+        return "rendezvous"
+
+    @classmethod
+    def get_module_name(cls):
+        return "test_pool"
+
+    @classmethod
+    def _get_predicate_function(cls):
+        return cls.rendezvous
+
+    @classmethod
+    def rendezvous(cls):
+        with cls.condition:
+            cls.arrived += 1
+            cls.condition.notify_all()
+            if cls.arrived < 2:
+                cls.condition.wait(10)
+            return cls.arrived >= 2
+
+
+if __name__ == '__main__':
+    unittest.main()
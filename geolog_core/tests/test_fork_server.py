@@ -0,0 +1,65 @@
+import os
+import unittest
+
+import geolog_core.fork_server
+
+
+class FakeInterpreter(object):
+
+    def __init__(self, threads="[]"):
+        self.threads = threads
+        self.prepare_count = 0
+
+    def query(self, query, **kwargs):
+        if "set_prolog_gc_thread(stop)" in query:
+            self.prepare_count += 1
+            return [{"Threads": self.threads}]
+        return [{"Query": query}]
+
+
+def double(interpreter, value):
+    return 2 * value
+
+
+def fail(interpreter):
+    raise ValueError("test")
+
+
+def get_pid(interpreter):
+    return os.getpid()
+
+
+@unittest.skipUnless(hasattr(os, "fork"), "requires os.fork")
+class TestForkServer(unittest.TestCase):
+
+    def setUp(self):
+        self.fork_server = geolog_core.fork_server.ForkServer(FakeInterpreter(), workers=2)
+
+    def test_submit(self):
+        self.assertEqual(42, self.fork_server.submit(double, 21).result())
+
+    def test_runs_in_child(self):
+        self.assertNotEqual(os.getpid(), self.fork_server.submit(get_pid).result())
+
+    def test_exception(self):
+        with self.assertRaises(ValueError):
+            self.fork_server.submit(fail).result()
+
+    def test_query(self):
+        self.assertEqual([{"Query": "true"}], self.fork_server.query("true"))
+
+    def test_map(self):
+        self.assertEqual([2, 4, 6, 8, 10], self.fork_server.map(double, [1, 2, 3, 4, 5]))
+
+    def test_prepared_before_every_fork(self):
+        self.fork_server.map(double, [1, 2, 3])
+        self.assertEqual(3, self.fork_server.interpreter.prepare_count)
+
+    def test_prolog_threads_running(self):
+        fork_server = geolog_core.fork_server.ForkServer(FakeInterpreter("[gc]"))
+        with self.assertRaises(geolog_core.fork_server.ForkError):
+            fork_server.submit(double, 21)
+
+
+if __name__ == '__main__':
+    unittest.main()
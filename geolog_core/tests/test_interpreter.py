@@ -0,0 +1,332 @@
+import os.path
+import threading
+import unittest
+
+import geolog_core.interpreter
+import geolog_core.predicate
+import geolog_core.reference_manager
+import pyswip
+import pyswip.prolog
+
+
+def create_interpreter(*predicate_classes):
+    """An Interpreter without plugins (the Arcpy plugin needs ArcGIS) with the given predicates registered."""
+    interpreter = geolog_core.interpreter.Interpreter.__new__(geolog_core.interpreter.Interpreter)
+    interpreter.prolog = pyswip.Prolog()
+    interpreter._batch_query = None
+    interpreter.consult(get_prolog_file("geolog_query.pl"))
+    for cls in predicate_classes:
+        interpreter.register_predicate(cls)
+    return interpreter
+
+
+def create_lazy_interpreter(*predicate_classes):
+    """An Interpreter that registers the given predicates when they are called for the first time."""
+    interpreter = create_interpreter()
+    interpreter.lazy_registration = True
+    interpreter._unregistered_classes = {}
+    interpreter._registration_lock = threading.Lock()
+    pyswip.registerForeign(interpreter._register_on_first_call, name="register_predicate", arity=3, module="geolog")
+    interpreter.consult(get_prolog_file("geolog_loader.pl"))
+    for cls in predicate_classes:
+        interpreter._unregistered_classes[(cls.get_module_name(), cls.get_predicate_name())] = cls
+    return interpreter
+
+
+def get_prolog_file(name):
+    """The path of a Prolog file of geolog_core."""
+    return os.path.join(os.path.dirname(geolog_core.interpreter.__file__), "prolog", name)
+
+
+class TestInterpreter(unittest.TestCase):
+
+    def setUp(self):
+        self.interpreter = create_interpreter(CreateObject, ObjectValue, geolog_core.predicate.Pin,
+                                              geolog_core.predicate.Unpin, PositiveBatch, NestedQuery)
+        self.interpreter.consult(get_prolog_file("geolog_batch.pl"))
+        self.reference_manager = geolog_core.reference_manager.ReferenceManager()
+        self.reference_manager.reset()
+
+    def test_iter_query_closed_early(self):
+        for solution in self.interpreter.iter_query("between(1, inf, X)"):
+            self.assertEqual(1, solution["X"])
+            break
+
+        self.assertEqual([{"X": 2}, {"X": 3}], self.interpreter.query("between(2, 3, X)"))
+
+    def test_iter_query_limit_and_offset(self):
+        solutions = list(self.interpreter.iter_query("between(1, inf, X)", limit=2, offset=3))
+
+        self.assertEqual([{"X": 4}, {"X": 5}], solutions)
+
+    def test_query_batch(self):
+        results = self.interpreter.query_batch(["X = 1", "member(X, [a, b])", "fail", "true"])
+
+        self.assertEqual([[{"X": 1}], [{"X": "a"}, {"X": "b"}], False, True], results)
+
+    def test_query_batch_with_error(self):
+        results = self.interpreter.query_batch(["X is foo + 1", "X = 2"])
+
+        self.assertIsInstance(results[0], pyswip.prolog.PrologError)
+        self.assertEqual([{"X": 2}], results[1])
+
+    def test_query_batch_reused(self):
+        self.assertEqual([[{"X": 1}]], self.interpreter.query_batch(["X = 1"]))
+        self.assertEqual([[{"Y": 2}], True], self.interpreter.query_batch(["Y = 2", "true"]))
+        self.assertEqual([], self.interpreter.query_batch([]))
+
+    def test_returned_object_used_in_next_query(self):
+        name = self.interpreter.query("test_objects:create_object(X)")[0]["X"]
+        self.interpreter.query("garbage_collect_atoms")
+
+        result = self.interpreter.query("test_objects:object_value({0}, Value)".format(name))
+
+        self.assertEqual(42, result[0]["Value"])
+
+    def test_returned_object_in_compound_term(self):
+        pair = self.interpreter.query("findall(pair(O, 1), test_objects:create_object(O), [Pair])")[0]["Pair"]
+        self.interpreter.query("garbage_collect_atoms")
+
+        result = self.interpreter.query("{0} = pair(X, _), test_objects:object_value(X, Value)".format(pair))
+
+        self.assertEqual(42, result[0]["Value"])
+
+    def test_returned_object_in_compound_term_of_prepared_query(self):
+        prepared_query = self.interpreter.prepare("findall(O-1, test_objects:create_object(O), [Pair])")
+        try:
+            pair = prepared_query.query()[0]["Pair"]
+        finally:
+            prepared_query.close()
+
+        self.assertEqual(1, len(self.reference_manager.get_statistics()))
+        self.assertIn("python_object_", pair)
+
+    def test_lazy_solution_not_decoded(self):
+        solution = self.interpreter.query("test_objects:create_object(X)", decoding="lazy")[0]
+
+        self.assertEqual({}, solution._values)
+        self.assertEqual(1, self.reference_manager.get_statistics()["DummyObject"]["count"])
+
+    def test_asserted_object_used_in_next_query(self):
+        self.interpreter.query("test_objects:create_object(X), geolog:pin(X), assertz(test_objects:stored(X))")
+        self.interpreter.query("garbage_collect_atoms")
+
+        result = self.interpreter.query("test_objects:stored(X), test_objects:object_value(X, Value)")
+
+        self.assertEqual(42, result[0]["Value"])
+
+    def test_unpin_unknown_handle(self):
+        self.assertFalse(self.interpreter.query("geolog:unpin(dummy_db_connection)"))
+        self.assertFalse(self.interpreter.query("test_objects:create_object(X), geolog:unpin(X)"))
+
+    def test_object_released_with_query(self):
+        self.assertTrue(self.interpreter.query("test_objects:create_object(_)"))
+
+        self.assertEqual({}, self.reference_manager.get_statistics())
+
+    def test_batch_include_with_failing_calls(self):
+        result = self.interpreter.query("geolog_batch:batch_include(test_objects:positive, [[1], [-1], [0], [2]], "
+                                        "Included, 3)")
+
+        self.assertEqual([[1], [2]], result[0]["Included"])
+
+    def test_batch_map_with_failing_calls(self):
+        self.assertFalse(self.interpreter.query("geolog_batch:batch_map(test_objects:positive, [[1], [-1]], _)"))
+
+    def test_statistics_of_query_with_limit(self):
+        self.interpreter.query("numlist(1, 100, L), sum_list(L, _)", inference_limit=10000)
+
+        statistics = self.interpreter.get_last_statistics()
+        self.assertEqual(1, statistics.solutions)
+        self.assertGreater(statistics.inferences, 100)
+
+    def test_limited_query_ending_with_period_or_comment(self):
+        for query in ["X = 1.", "X = 1 % comment", "X = 1. % comment", "X = 1.\n", "X = 1 /* comment */."]:
+            self.assertEqual([{"X": 1}], self.interpreter.query(query, time_limit=10), query)
+
+    def test_limited_query_with_quotes(self):
+        statistics = geolog_core.interpreter.QueryStatistics()
+
+        result = self.interpreter.query("X = 'it''s', Y = 'a\\\\b'", statistics=statistics)
+
+        self.assertEqual([{"X": "it's", "Y": "a\\b"}], result)
+        self.assertEqual(1, statistics.solutions)
+
+    def test_inference_limit_exceeded(self):
+        with self.assertRaises(geolog_core.interpreter.ResourceLimitError) as context:
+            self.interpreter.query("between(1, inf, X), X > 1000000", inference_limit=1000)
+
+        self.assertIn("inference_limit_exceeded", str(context.exception))
+        self.assertEqual([{"X": 1}], self.interpreter.query("X = 1", inference_limit=1000))
+
+    def test_error_of_limited_query(self):
+        # only the errors of the limits are ResourceLimitErrors, not others that mention them
+        for query in ["X is foo + 1", "throw(error(type_error(resource_error, time_limit_exceeded), _))"]:
+            with self.assertRaises(pyswip.prolog.PrologError) as context:
+                self.interpreter.query(query, time_limit=10)
+            self.assertNotIsInstance(context.exception, geolog_core.interpreter.ResourceLimitError)
+
+    def test_statistics_of_nested_query(self):
+        NestedQuery.interpreter = self.interpreter
+        statistics = geolog_core.interpreter.QueryStatistics()
+
+        self.interpreter.query("numlist(1, 1000, L), sum_list(L, _), test_objects:nested_query",
+                               statistics=statistics)
+
+        self.assertGreater(statistics.inferences, 1000)
+        self.assertLess(NestedQuery.statistics.inferences, 1000)
+        self.assertIs(statistics, self.interpreter.get_last_statistics())
+
+
+class TestLazyRegistration(unittest.TestCase):
+
+    def setUp(self):
+        self.interpreter = create_lazy_interpreter(LazyValue, LazyArity)
+
+    def test_registered_on_first_call(self):
+        self.assertIn(("test_lazy", "lazy_value"), self.interpreter._unregistered_classes)
+
+        self.assertEqual([{"X": 42}], self.interpreter.query("test_lazy:lazy_value(X)"))
+        self.assertNotIn(("test_lazy", "lazy_value"), self.interpreter._unregistered_classes)
+        self.assertEqual([{"X": 42}], self.interpreter.query("test_lazy:lazy_value(X)"))
+
+    def test_unknown_predicate(self):
+        with self.assertRaises(pyswip.prolog.PrologError) as context:
+            self.interpreter.query("test_lazy:unknown(X)")
+
+        self.assertIn("existence_error", str(context.exception))
+
+    def test_unknown_arity(self):
+        with self.assertRaises(pyswip.prolog.PrologError) as context:
+            self.interpreter.query("test_lazy:lazy_arity(X, Y, Z)")
+
+        self.assertIn("existence_error", str(context.exception))
+        self.assertIn(("test_lazy", "lazy_arity"), self.interpreter._unregistered_classes)
+        self.assertEqual([{"X": 42}], self.interpreter.query("test_lazy:lazy_arity(X)"))
+
+
+class CreateObject(geolog_core.predicate.DeterministicPredicate):
+
+    @classmethod
+    def get_predicate_name(cls):
+        return "create_object"
+
+    @classmethod
+    def get_module_name(cls):
+        return "test_objects"
+
+    @classmethod
+    def _get_predicate_function(cls):
+        return cls.create_object
+
+    @classmethod
+    def create_object(cls, obj):
+        cls.unify(obj, DummyObject(42))
+        return True
+
+
+class ObjectValue(geolog_core.predicate.DeterministicPredicate):
+
+    @classmethod
+    def get_predicate_name(cls):
+        return "object_value"
+
+    @classmethod
+    def get_module_name(cls):
+        return "test_objects"
+
+    @classmethod
+    def _get_predicate_function(cls):
+        return cls.object_value
+
+    @classmethod
+    def get_argument_modes(cls):
+        return ["+object", "-int"]
+
+    @classmethod
+    def object_value(cls, obj, value):
+        value.value = obj.value
+        return True
+
+
+class PositiveBatch(geolog_core.predicate.BatchPredicate):
+    """Fails for negative numbers, false for 0."""
+
+    @classmethod
+    def get_predicate_name(cls):
+        return "positive"
+
+    @classmethod
+    def get_module_name(cls):
+        return "test_objects"
+
+    @classmethod
+    def _get_predicate_function(cls):
+        return cls.positive
+
+    @classmethod
+    def positive(cls, calls):
+        return [None if number < 0 else number > 0 for (number,) in calls]
+
+
+class NestedQuery(geolog_core.predicate.DeterministicPredicate):
+    """Runs a query while the query that calls it is open."""
+
+    interpreter = None
+
+    statistics = None
+
+    @classmethod
+    def get_predicate_name(cls):
+        return "nested_query"
+
+    @classmethod
+    def get_module_name(cls):
+        return "test_objects"
+
+    @classmethod
+    def _get_predicate_function(cls):
+        return cls.nested_query
+
+    @classmethod
+    def nested_query(cls):
+        cls.interpreter.query("true", statistics=geolog_core.interpreter.QueryStatistics())
+        cls.statistics = cls.interpreter.get_last_statistics()
+        return True
+
+
+class LazyValue(geolog_core.predicate.DeterministicPredicate):
+
+    @classmethod
+    def get_predicate_name(cls):
+        return "lazy_value"
+
+    @classmethod
+    def get_module_name(cls):
+        return "test_lazy"
+
+    @classmethod
+    def _get_predicate_function(cls):
+        return cls.lazy_value
+
+    @classmethod
+    def lazy_value(cls, value):
+        cls.unify(value, 42)
+        return True
+
+
+class LazyArity(LazyValue):
+
+    @classmethod
+    def get_predicate_name(cls):
+        return "lazy_arity"
+
+
+class DummyObject(object):
+
+    def __init__(self, value):
+        self.value = value
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,183 @@
+import os.path
+import unittest
+
+import geolog_core.memoization
+import geolog_core.predicate
+import geolog_core.reference_manager
+import pyswip
+
+
+class TestMemoization(unittest.TestCase):
+
+    def setUp(self):
+        geolog_core.memoization.invalidate()
+        geolog_core.memoization._caches.clear()
+        MemoizedDummyProcess.calls = []
+        MemoizedDummyProcess.workspace = None
+
+    def call(self, *args):
+        return MemoizedDummyProcess.get_dispatcher(len(args))(*args)
+
+    def test_hit(self):
+        first = pyswip.Variable()
+        second = pyswip.Variable()
+
+        self.assertTrue(self.call("roads", first))
+        self.assertTrue(self.call("roads", second))
+
+        self.assertEqual(["roads"], MemoizedDummyProcess.calls)
+        self.assertEqual("ROADS", second.value)
+        self.assertEqual([{"predicate": "test:memoized", "hits": 1, "misses": 1, "entries": 1}],
+                         geolog_core.memoization.get_statistics())
+
+    def test_different_arguments(self):
+        self.call("roads", pyswip.Variable())
+        self.call("rivers", pyswip.Variable())
+
+        self.assertEqual(["roads", "rivers"], MemoizedDummyProcess.calls)
+
+    def test_failure_memoized(self):
+        self.assertFalse(self.call("", pyswip.Variable()))
+        self.assertFalse(self.call("", pyswip.Variable()))
+
+        self.assertEqual([""], MemoizedDummyProcess.calls)
+
+    def test_lru_eviction(self):
+        for dataset in ["a", "b", "a", "c", "a", "b"]:
+            self.call(dataset, pyswip.Variable())
+
+        self.assertEqual(["a", "b", "c", "b"], MemoizedDummyProcess.calls)
+
+    def test_ttl(self):
+        geolog_core.memoization.get_cache(MemoizedDummyProcess).ttl = 0
+        self.call("roads", pyswip.Variable())
+        self.call("roads", pyswip.Variable())
+
+        self.assertEqual(["roads", "roads"], MemoizedDummyProcess.calls)
+
+    def test_invalidate_dataset(self):
+        self.call("roads", pyswip.Variable())
+        self.call("rivers", pyswip.Variable())
+        geolog_core.memoization.invalidate(dataset="roads")
+        self.call("roads", pyswip.Variable())
+        self.call("rivers", pyswip.Variable())
+
+        self.assertEqual(["roads", "rivers", "roads"], MemoizedDummyProcess.calls)
+
+    def test_invalidate_predicate(self):
+        self.call("roads", pyswip.Variable())
+        geolog_core.memoization.invalidate("memoized")
+        self.call("roads", pyswip.Variable())
+
+        self.assertEqual(["roads", "roads"], MemoizedDummyProcess.calls)
+
+    def test_invalidate_in_list(self):
+        self.call(["roads", "rivers"], pyswip.Variable())
+        geolog_core.memoization.invalidate(dataset="rivers")
+        self.call(["roads", "rivers"], pyswip.Variable())
+
+        self.assertEqual(2, len(MemoizedDummyProcess.calls))
+
+    def test_invalidate_normalized_path(self):
+        self.call(os.path.join("data", ".", "roads"), pyswip.Variable())
+        geolog_core.memoization.invalidate(dataset=os.path.abspath(os.path.join("data", "roads")))
+        self.call(os.path.join("data", ".", "roads"), pyswip.Variable())
+
+        self.assertEqual(2, len(MemoizedDummyProcess.calls))
+
+    def test_invalidate_in_workspace(self):
+        self.call("roads", pyswip.Variable())
+        geolog_core.memoization.invalidate(dataset="roads", workspace=os.path.join(os.getcwd(), "other"))
+        self.call("roads", pyswip.Variable())
+        geolog_core.memoization.invalidate(dataset="roads", workspace=os.getcwd())
+        self.call("roads", pyswip.Variable())
+
+        self.assertEqual(["roads", "roads"], MemoizedDummyProcess.calls)
+
+    def test_references_pinned(self):
+        reference_manager = geolog_core.reference_manager.ReferenceManager()
+        reference_manager.reset()
+        scope = reference_manager.open_scope()
+        self.call("roads", pyswip.Variable(), pyswip.Variable())
+        reference_manager.close_scope(scope)
+
+        self.assertEqual(1, len(reference_manager._object_dict))
+        geolog_core.memoization.invalidate()
+        garbage_collect_atoms()
+        self.assertEqual({}, reference_manager._object_dict)
+
+    def test_returned_references_kept(self):
+        reference_manager = geolog_core.reference_manager.ReferenceManager()
+        reference_manager.reset()
+        scope = reference_manager.open_scope()
+        self.call("roads", pyswip.Variable(), pyswip.Variable())
+        reference_manager.close_scope(scope, set(reference_manager._names.values()))
+
+        geolog_core.memoization.invalidate()
+        garbage_collect_atoms()
+        self.assertEqual(1, len(reference_manager._object_dict))
+
+    def test_workspace_in_key(self):
+        MemoizedDummyProcess.workspace = "first"
+        self.call("roads", pyswip.Variable())
+        MemoizedDummyProcess.workspace = "second"
+        self.call("roads", pyswip.Variable())
+        MemoizedDummyProcess.workspace = "first"
+        self.call("roads", pyswip.Variable())
+
+        self.assertEqual(["roads", "roads"], MemoizedDummyProcess.calls)
+
+    def test_not_memoized_by_default(self):
+        dispatch = geolog_core.predicate.Replace.get_dispatcher(4)
+
+        self.assertEqual(0, geolog_core.predicate.Replace.get_memoization_size())
+        self.assertNotEqual("memoized_dispatch", dispatch.__name__)
+
+
+def garbage_collect_atoms():
+    list(pyswip.Prolog.query("garbage_collect_atoms"))
+
+
+class MemoizedDummyProcess(geolog_core.predicate.DeterministicPredicate):
+    calls = []
+    workspace = None
+
+    @classmethod
+    def get_predicate_name(cls):
+        return "memoized"
+
+    @classmethod
+    def get_module_name(cls):
+        return "test"
+
+    @classmethod
+    def _get_predicate_function(cls):
+        return cls.test
+
+    @classmethod
+    def get_memoization_size(cls):
+        return 2
+
+    @classmethod
+    def get_workspace(cls):
+        return cls.workspace
+
+    @classmethod
+    def test(cls, dataset, output, description=None):
+        cls.calls.append(dataset)
+        if not dataset:
+            return False
+        cls.unify(output, str(dataset).upper())
+        if description is not None:
+            cls.unify(description, DummyDescription(dataset))
+        return True
+
+
+class DummyDescription(object):
+
+    def __init__(self, name):
+        self.name = name
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import array
+import unittest
+
+import geolog_core.numeric_list
+import pyswip
+
+
+class TestNumericList(unittest.TestCase):
+
+    def round_trip(self, values, typecode):
+        term = pyswip.core.PL_new_term_ref()
+        geolog_core.numeric_list.put_list(term, values)
+        return geolog_core.numeric_list.get_array(term, typecode)
+
+    def test_is_numeric_buffer(self):
+        self.assertTrue(geolog_core.numeric_list.is_numeric_buffer(array.array("d", [1.0])))
+        self.assertTrue(geolog_core.numeric_list.is_numeric_buffer(bytearray(b"ab")))
+        self.assertFalse(geolog_core.numeric_list.is_numeric_buffer([1.0, 2.0]))
+        self.assertFalse(geolog_core.numeric_list.is_numeric_buffer("ab"))
+
+    def test_character_array(self):
+        self.assertFalse(geolog_core.numeric_list.is_numeric_buffer(array.array("u", u"ab")))
+        if hasattr(memoryview, "cast"):
+            self.assertFalse(geolog_core.numeric_list.is_numeric_buffer(memoryview(b"ab").cast("c")))
+        else:
+            self.assertFalse(geolog_core.numeric_list.is_numeric_buffer(array.array("c", b"ab")))
+
+    def test_bool_array(self):
+        try:
+            import numpy
+        except ImportError:
+            self.skipTest("requires NumPy")
+
+        self.assertFalse(geolog_core.numeric_list.is_numeric_buffer(numpy.array([True, False])))
+        self.assertTrue(geolog_core.numeric_list.is_numeric_buffer(numpy.array([1, 0])))
+
+    def test_floats(self):
+        values = array.array("d", [0.1, -2.5, 1e300, 3.0])
+
+        self.assertEqual(values, self.round_trip(values, "d"))
+
+    def test_special_floats(self):
+        values = array.array("d", [1.0, float("inf")])
+
+        self.assertEqual(values, self.round_trip(values, "d"))
+
+    def test_integers(self):
+        values = array.array("l", [0, -1, 2 ** 31])
+
+        self.assertEqual(values, self.round_trip(values, "l"))
+
+    def test_bytes(self):
+        values = bytearray(b"\x00\x01\xff")
+
+        self.assertEqual(array.array("B", values), self.round_trip(values, "B"))
+
+    def test_empty(self):
+        self.assertEqual(array.array("d"), self.round_trip(array.array("d"), "d"))
+
+    def test_unify(self):
+        variable = pyswip.Variable()
+        geolog_core.numeric_list.unify(variable, array.array("l", [1, 2, 3]))
+
+        self.assertEqual([1, 2, 3], variable.value)
+
+    def test_not_a_list(self):
+        term = pyswip.core.PL_new_term_ref()
+        pyswip.core.PL_put_atom_chars(term, "a")
+
+        with self.assertRaises(TypeError):
+            geolog_core.numeric_list.get_array(term)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import geolog_core.plugin_index
+import geolog_core.tests.test_predicate
+import geolog_plugins
+
+
+class TestPluginIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_directory = tempfile.mkdtemp()
+        self.plugin_directory = tempfile.mkdtemp()
+        with open(os.path.join(self.plugin_directory, "plugin.py"), "w") as plugin_file:
+            plugin_file.write("# plugin\n")
+        self.plugin_index = geolog_core.plugin_index.PluginIndex([([self.plugin_directory], "plugin")],
+                                                                 self.cache_directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_directory)
+        shutil.rmtree(self.plugin_directory)
+
+    def test_load_without_index(self):
+        self.assertIsNone(self.plugin_index.load())
+
+    def test_save_and_load(self):
+        self.plugin_index.save([geolog_core.tests.test_predicate.DeterministicDummyProcess])
+
+        predicates = self.plugin_index.load()
+
+        self.assertEqual(1, len(predicates))
+        self.assertEqual("test_me", predicates[0].get_predicate_name())
+        self.assertEqual(2, predicates[0].get_minimum_arity())
+        self.assertEqual(4, predicates[0].get_maximum_arity())
+        self.assertTrue(predicates[0].is_deterministic())
+        self.assertEqual(geolog_core.tests.test_predicate.DeterministicDummyProcess, predicates[0].get_class())
+
+    def test_changed_file_invalidates_index(self):
+        self.plugin_index.save([geolog_core.tests.test_predicate.DeterministicDummyProcess])
+
+        with open(os.path.join(self.plugin_directory, "plugin.py"), "a") as plugin_file:
+            plugin_file.write("# changed\n")
+
+        self.assertIsNone(self.plugin_index.load())
+
+    def test_new_file_invalidates_index(self):
+        self.plugin_index.save([geolog_core.tests.test_predicate.DeterministicDummyProcess])
+
+        with open(os.path.join(self.plugin_directory, "other_plugin.py"), "w") as plugin_file:
+            plugin_file.write("# other plugin\n")
+
+        self.assertIsNone(self.plugin_index.load())
+
+    def test_changed_environment_invalidates_index(self):
+        self.plugin_index.save([geolog_core.tests.test_predicate.DeterministicDummyProcess])
+
+        environment = self.plugin_index.get_environment()
+        environment["plugins"]["plugin"] = "10.8"
+        self.plugin_index.get_environment = lambda: environment
+
+        self.assertIsNone(self.plugin_index.load())
+
+    def test_environment(self):
+        environment = self.plugin_index.get_environment()
+
+        self.assertEqual(sys.version, environment["python"])
+        self.assertEqual({"plugin": None}, environment["plugins"])
+
+    def test_plugin_version_without_importing_arcpy(self):
+        # an arcpy package that cannot be imported
+        os.mkdir(os.path.join(self.plugin_directory, "arcpy"))
+        file_name = os.path.join(self.plugin_directory, "arcpy", "__init__.py")
+        with open(file_name, "w") as arcpy_file:
+            arcpy_file.write("raise ImportError('arcpy imported')\n")
+        sys.path.insert(0, self.plugin_directory)
+        try:
+            version = geolog_plugins.get_plugin_version()
+        finally:
+            sys.path.remove(self.plugin_directory)
+
+        self.assertEqual([file_name, os.path.getmtime(file_name)], version)
+        self.assertNotIn("arcpy", sys.modules)
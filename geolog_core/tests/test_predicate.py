@@ -43,10 +43,10 @@ class TestPredicate(unittest.TestCase):
 
         ObjectDeterministicDummyProcess.execute(variable)
 
-        atom = geolog_core.reference_manager.ReferenceManager()._object_dict.keys()[0]
+        atom = variable.value
 
-        self.assertEqual(DummyObject(1), geolog_core.reference_manager.ReferenceManager()._object_dict[atom])
-        self.assertEqual(atom, variable.value)
+        self.assertEqual(DummyObject(1), geolog_core.reference_manager.ReferenceManager().get(atom))
+        self.assertEqual(1, len(geolog_core.reference_manager.ReferenceManager()._object_dict))
 
     def test_execute_deterministic_with_list(self):
         geolog_core.reference_manager.ReferenceManager().reset()
@@ -57,12 +57,11 @@ class TestPredicate(unittest.TestCase):
 
         ListDeterministicDummyProcess.execute(variables)
 
-        atom = geolog_core.reference_manager.ReferenceManager()._object_dict.keys()[0]
+        atom = variables[2].value
 
-        self.assertEqual(DummyObject(1), geolog_core.reference_manager.ReferenceManager()._object_dict[atom])
+        self.assertEqual(DummyObject(1), geolog_core.reference_manager.ReferenceManager().get(atom))
         self.assertEqual(123, variables[0].value)
         self.assertEqual("test_me", variables[1].value)
-        self.assertEqual(atom, variables[2].value)
 
     def test_execute_deterministic_with_list_of_lists_one_variable(self):
         geolog_core.reference_manager.ReferenceManager().reset()
@@ -85,7 +84,7 @@ class TestPredicate(unittest.TestCase):
     def test_execute_deterministic_with_atom(self):
         geolog_core.reference_manager.ReferenceManager().reset()
         atom = pyswip.Atom("test_me")
-        geolog_core.reference_manager.ReferenceManager()._object_dict[atom] = DummyObject(2)
+        geolog_core.reference_manager.ReferenceManager().put(atom, DummyObject(2))
 
         AtomDeterministicDummyProcess.execute(atom)
 
@@ -96,7 +95,7 @@ class TestPredicate(unittest.TestCase):
         geolog_core.reference_manager.ReferenceManager().reset()
         DummyIterator.control = 0
         iterator_atom = pyswip.Atom("iterator")
-        geolog_core.reference_manager.ReferenceManager()._object_dict[iterator_atom] = iter([1, 2, 3])
+        geolog_core.reference_manager.ReferenceManager().put(iterator_atom, iter([1, 2, 3]))
 
         variable = pyswip.Variable()
         DummyIterator.execute(iterator_atom, variable, 0)
@@ -118,22 +117,35 @@ class TestPredicate(unittest.TestCase):
         geolog_core.reference_manager.ReferenceManager().reset()
         DummyIterator.control = 0
         iterator_atom = pyswip.Atom("iterator")
-        geolog_core.reference_manager.ReferenceManager()._object_dict[iterator_atom] = iter([1, 2, 3])
+        geolog_core.reference_manager.ReferenceManager().put(iterator_atom, iter([1, 2, 3]))
 
         variable = pyswip.Variable()
         DummyIterator.execute(iterator_atom, variable, 0)
 
         DummyIterator.control = 2
+        geolog_core.reference_manager.ReferenceManager().reset()
 
-        variable = pyswip.Variable()
-        return_value = DummyIterator.execute(iterator_atom, variable, 0)
-        self.assertFalse(return_value)
+        # the arguments of a cut call are not valid anymore (here: the handle is unknown)
+        return_value = DummyIterator.execute(iterator_atom, None, 0)
+        self.assertTrue(return_value)
+
+    def test_iterator_prune_keeps_iterator(self):
+        geolog_core.reference_manager.ReferenceManager().reset()
+        DummyIterator.control = 0
+        iterator_atom = pyswip.Atom("iterator")
+        geolog_core.reference_manager.ReferenceManager().put(iterator_atom, iter([1, 2, 3]))
+        DummyIterator.execute(iterator_atom, pyswip.Variable(), 0)
+
+        DummyIterator.control = 2
+        DummyIterator.execute(iterator_atom, pyswip.Variable(), 0)
+
+        self.assertEqual(2, next(geolog_core.reference_manager.ReferenceManager().get(iterator_atom)))
 
     def test_iterator_list(self):
         geolog_core.reference_manager.ReferenceManager().reset()
         DummyIterator.control = 0
         iterator_atom = pyswip.Atom("iterator")
-        geolog_core.reference_manager.ReferenceManager()._object_dict[iterator_atom] = iter([[1, 2], [2, 3], [3, 4]])
+        geolog_core.reference_manager.ReferenceManager().put(iterator_atom, iter([[1, 2], [2, 3], [3, 4]]))
 
         variable = pyswip.Variable()
         DummyIterator.execute(iterator_atom, variable, 0)
@@ -143,7 +155,7 @@ class TestPredicate(unittest.TestCase):
         geolog_core.reference_manager.ReferenceManager().reset()
         DummyIterator.control = 0
         iterator_atom = pyswip.Atom("iterator")
-        geolog_core.reference_manager.ReferenceManager()._object_dict[iterator_atom] = iter([[1, 2], [2, 3], [3, 4]])
+        geolog_core.reference_manager.ReferenceManager().put(iterator_atom, iter([[1, 2], [2, 3], [3, 4]]))
 
         variable_1 = pyswip.Variable()
         variable_2 = pyswip.Variable()
@@ -155,31 +167,30 @@ class TestPredicate(unittest.TestCase):
         geolog_core.reference_manager.ReferenceManager().reset()
         DummyIterator.control = 0
         iterator_atom = pyswip.Atom("iterator")
-        geolog_core.reference_manager.ReferenceManager()._object_dict[iterator_atom] = iter([[DummyObject(1), 2]])
+        geolog_core.reference_manager.ReferenceManager().put(iterator_atom, iter([[DummyObject(1), 2]]))
 
         variable_1 = pyswip.Variable()
         variable_2 = pyswip.Variable()
         DummyIterator.execute(iterator_atom, [variable_1, variable_2], 0)
 
-        atom = geolog_core.reference_manager.ReferenceManager()._object_dict.keys()[1]
+        atom = variable_1.value
 
-        self.assertEqual(DummyObject(1), geolog_core.reference_manager.ReferenceManager()._object_dict[atom])
-        self.assertEqual(atom, variable_1.value)
+        self.assertEqual(DummyObject(1), geolog_core.reference_manager.ReferenceManager().get(atom))
         self.assertEqual(2, variable_2.value)
 
     def test_iterator_bind_list_of_objects_to_variable(self):
         geolog_core.reference_manager.ReferenceManager().reset()
         DummyIterator.control = 0
         iterator_atom = pyswip.Atom("iterator")
-        geolog_core.reference_manager.ReferenceManager()._object_dict[iterator_atom] = iter([[DummyObject(1), 2]])
+        geolog_core.reference_manager.ReferenceManager().put(iterator_atom, iter([[DummyObject(1), 2]]))
 
         variable = pyswip.Variable()
         DummyIterator.execute(iterator_atom, variable, 0)
 
-        atom = geolog_core.reference_manager.ReferenceManager()._object_dict.keys()[1]
+        atom = variable.value[0]
 
-        self.assertEqual(DummyObject(1), geolog_core.reference_manager.ReferenceManager()._object_dict[atom])
-        self.assertEqual([atom, 2], variable.value)
+        self.assertEqual(DummyObject(1), geolog_core.reference_manager.ReferenceManager().get(atom))
+        self.assertEqual(2, variable.value[1])
 
     def test_replace(self):
         variable = pyswip.Variable()
@@ -188,6 +199,156 @@ class TestPredicate(unittest.TestCase):
 
         self.assertEqual("test_all_please", variable.value)
 
+    def test_nondeterministic(self):
+        DummyNondeterministic.control = 0
+        DummyNondeterministic.closed = False
+
+        variable = pyswip.Variable()
+        DummyNondeterministic.execute([1, 2], variable, 0)
+        self.assertEqual(1, variable.value)
+
+        DummyNondeterministic.control = 2
+        variable = pyswip.Variable()
+        DummyNondeterministic.execute([1, 2], variable, 0)
+        self.assertEqual(2, variable.value)
+
+        variable = pyswip.Variable()
+        return_value = DummyNondeterministic.execute([1, 2], variable, 0)
+        self.assertFalse(return_value)
+        self.assertTrue(DummyNondeterministic.closed)
+        self.assertEqual({}, geolog_core.predicate._generators)
+
+    def test_nondeterministic_prune(self):
+        DummyNondeterministic.control = 0
+        DummyNondeterministic.closed = False
+
+        variable = pyswip.Variable()
+        DummyNondeterministic.execute([1, 2], variable, 0)
+
+        DummyNondeterministic.control = 1
+        DummyNondeterministic.execute([1, 2], pyswip.Variable(), 0)
+
+        self.assertTrue(DummyNondeterministic.closed)
+        self.assertEqual({}, geolog_core.predicate._generators)
+
+    def test_batch_replace(self):
+        variable = pyswip.Variable()
+
+        geolog_core.predicate.BatchReplace.execute([["me", "all", "test_me"], ["a", "b", "aa"]], variable)
+
+        self.assertEqual(["test_all", "bb"], variable.value)
+
+    def test_batch_columns(self):
+        variable = pyswip.Variable()
+
+        ColumnBatchDummyProcess.execute([[1, 2], [3, 4], [5, 6]], variable)
+
+        self.assertEqual([[1, 3, 5], [2, 4, 6]], ColumnBatchDummyProcess.columns)
+        self.assertEqual([True, False, True], variable.value)
+
+    def test_batch_succeeded(self):
+        results = pyswip.Variable()
+        succeeded = pyswip.Variable()
+
+        ColumnBatchDummyProcess.execute([[1, 2], [3, 4]], results, succeeded)
+
+        self.assertEqual([True, False], succeeded.value)
+
+    def test_next_chunk(self):
+        reference_manager = geolog_core.reference_manager.ReferenceManager()
+        reference_manager.reset()
+        iterator_atom = reference_manager.create_atom()
+        reference_manager.put(iterator_atom, (i for i in range(3)))
+
+        chunk = pyswip.Variable()
+        done = pyswip.Variable()
+        geolog_core.predicate.NextChunk.execute(iterator_atom, 2, chunk, done)
+        self.assertEqual([0, 1], chunk.value)
+        self.assertEqual(False, done.value)
+
+        chunk = pyswip.Variable()
+        done = pyswip.Variable()
+        geolog_core.predicate.NextChunk.execute(iterator_atom, 2, chunk, done)
+        self.assertEqual([2], chunk.value)
+        self.assertEqual(True, done.value)
+        self.assertEqual({}, reference_manager._object_dict)
+
+    def test_dispatcher_with_atom(self):
+        geolog_core.reference_manager.ReferenceManager().reset()
+        atom = pyswip.Atom("test_me")
+        geolog_core.reference_manager.ReferenceManager().put(atom, DummyObject(2))
+
+        AtomDeterministicDummyProcess.get_dispatcher(1)(atom)
+
+        self.assertEqual(DummyObject(2), AtomDeterministicDummyProcess.argument)
+
+    def test_dispatcher_with_variable(self):
+        variable = pyswip.Variable()
+
+        StringDeterministicDummyProcess.get_dispatcher(1)(variable)
+
+        self.assertEqual("test_me", variable.value)
+
+    def test_dispatcher_with_many_arguments(self):
+        variable = pyswip.Variable()
+
+        geolog_core.predicate.Replace.get_dispatcher(4)("me", "all", "test_me_please", variable)
+
+        self.assertEqual("test_all_please", variable.value)
+
+    def test_argument_modes_object(self):
+        geolog_core.reference_manager.ReferenceManager().reset()
+        atom = pyswip.Atom("test_me")
+        geolog_core.reference_manager.ReferenceManager().put(atom, DummyObject(2))
+        variable = pyswip.Variable()
+
+        return_value = geolog_core.predicate.GetAttribute.get_dispatcher(3)(atom, "identifier", variable)
+
+        self.assertTrue(return_value)
+        self.assertEqual(2, variable.value)
+
+    def test_argument_modes_unknown_object(self):
+        geolog_core.reference_manager.ReferenceManager().reset()
+        variable = pyswip.Variable()
+
+        return_value = ObjectModesDummyProcess.get_dispatcher(2)(pyswip.Atom("unknown"), variable)
+
+        self.assertFalse(return_value)
+
+    def test_argument_modes_any_receiver(self):
+        variable = pyswip.Variable()
+
+        return_value = geolog_core.predicate.CallMethod.get_dispatcher(4)("test_me", "upper", [], variable)
+
+        self.assertTrue(return_value)
+        self.assertEqual("TEST_ME", variable.value)
+
+    def test_argument_modes_count_mismatch(self):
+        with self.assertRaises(ValueError):
+            MismatchedModesDummyProcess.get_dispatcher(2)
+
+    def test_argument_modes_type_mismatch(self):
+        variable = pyswip.Variable()
+
+        return_value = geolog_core.predicate.GetByIndex.get_dispatcher(3)([1, 2], "1", variable)
+
+        self.assertFalse(return_value)
+
+    def test_argument_modes_unbound_input(self):
+        variable = pyswip.Variable()
+
+        return_value = geolog_core.predicate.GetByIndex.get_dispatcher(3)([1, 2], pyswip.Variable(), variable)
+
+        self.assertFalse(return_value)
+
+    def test_argument_modes_optional(self):
+        self.assertEqual(["test_me", pyswip.Variable],
+                         [type(value) if isinstance(value, pyswip.Variable) else value for value in
+                          ModesDummyProcess.get_dispatcher(2)(pyswip.Atom("test_me"), pyswip.Variable())])
+
+    def test_dispatcher_of_overridden_execute(self):
+        self.assertEqual(DummyIterator.execute, DummyIterator.get_dispatcher(2))
+
 
 class DummyIterator(geolog_core.predicate.IteratorPredicate):
 
@@ -224,6 +385,48 @@ class DummyIterator(geolog_core.predicate.IteratorPredicate):
         return cls.address
 
 
+class DummyNondeterministic(geolog_core.predicate.NondeterministicPredicate):
+
+    control = 0
+
+    address = 0
+
+    closed = False
+
+    @classmethod
+    def _get_predicate_function(cls):
+        return cls.generate
+
+    @classmethod
+    def generate(cls, collection, item):
+        try:
+            for value in collection:
+                yield value
+        finally:
+            cls.closed = True
+
+    @classmethod
+    def get_control(cls, handle):
+        return cls.control
+
+    @classmethod
+    def get_first_call(cls):
+        return 0
+
+    @classmethod
+    def get_pruned(cls):
+        return 1
+
+    @classmethod
+    def retry_address(cls, address):
+        cls.address = address
+        return address
+
+    @classmethod
+    def get_address(cls, handle):
+        return cls.address
+
+
 class DeterministicDummyProcess(geolog_core.predicate.DeterministicPredicate):
 
     argument_1 = None
@@ -322,3 +525,58 @@ class DummyObject(object):
         if isinstance(other, DummyObject):
             return self.identifier == other.identifier
         return False
+
+
+class ModesDummyProcess(geolog_core.predicate.DeterministicPredicate):
+
+    @classmethod
+    def _get_predicate_function(cls):
+        return cls.test
+
+    @classmethod
+    def get_argument_modes(cls):
+        return ["+atom", "?atom"]
+
+    @classmethod
+    def test(cls, argument_1, argument_2):
+        return [argument_1, argument_2]
+
+
+class ObjectModesDummyProcess(geolog_core.predicate.DeterministicPredicate):
+
+    @classmethod
+    def _get_predicate_function(cls):
+        return cls.test
+
+    @classmethod
+    def get_argument_modes(cls):
+        return ["+object", "-any"]
+
+    @classmethod
+    def test(cls, obj, output):
+        return True
+
+
+class MismatchedModesDummyProcess(ModesDummyProcess):
+
+    @classmethod
+    def get_argument_modes(cls):
+        return ["+atom"]
+
+
+class ColumnBatchDummyProcess(geolog_core.predicate.BatchPredicate):
+
+    columns = None
+
+    @classmethod
+    def _get_predicate_function(cls):
+        return cls.test
+
+    @classmethod
+    def use_columns(cls):
+        return True
+
+    @classmethod
+    def test(cls, columns):
+        cls.columns = columns
+        return [x < 2 or y > 5 for x, y in zip(*columns)]
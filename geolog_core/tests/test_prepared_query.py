@@ -0,0 +1,64 @@
+import unittest
+
+import geolog_core.prepared_query
+import pyswip
+import pyswip.prolog
+
+
+class TestPreparedQuery(unittest.TestCase):
+
+    def setUp(self):
+        self.prolog = pyswip.Prolog()
+        self.prepared_query = geolog_core.prepared_query.PreparedQuery("member(X, [1, 2, 3]), X > Min")
+
+    def tearDown(self):
+        self.prepared_query.close()
+
+    def test_variable_names(self):
+        self.assertEqual(["X", "Min"], self.prepared_query.variable_names)
+
+    def test_execute_with_parameters(self):
+        self.assertEqual([{"X": 2}, {"X": 3}], list(self.prepared_query.execute({"Min": 1})))
+
+    def test_reuse(self):
+        self.assertEqual([{"X": 3}], self.prepared_query.query({"Min": 2}))
+        self.assertEqual([{"X": 1}, {"X": 2}, {"X": 3}], self.prepared_query.query({"Min": 0}))
+        self.assertFalse(self.prepared_query.query({"Min": 3}))
+
+    def test_atom_parameter(self):
+        template = "member(Name-Id, [roads-1, rivers-2]), Names == [roads, rivers]"
+        prepared_query = geolog_core.prepared_query.PreparedQuery(template)
+        try:
+            result = prepared_query.query({"Name": "roads", "Names": ["roads", "rivers"]})
+        finally:
+            prepared_query.close()
+
+        textual_result = list(self.prolog.query("Name = roads, Names = [roads, rivers], " + template))
+        self.assertEqual([{"Id": 1}], result)
+        self.assertEqual([dict(result[0], Name="roads", Names=["roads", "rivers"])], textual_result)
+
+    def test_module_qualified(self):
+        prepared_query = geolog_core.prepared_query.PreparedQuery("lists:nth1(I, [a, b], b)")
+        try:
+            self.assertEqual([{"I": 2}], prepared_query.query())
+        finally:
+            prepared_query.close()
+
+    def test_unknown_parameter(self):
+        # raised by execute, before the first solution is requested
+        with self.assertRaises(KeyError):
+            self.prepared_query.execute({"Y": 1})
+
+    def test_closed(self):
+        self.prepared_query.close()
+
+        with self.assertRaises(pyswip.prolog.PrologError):
+            self.prepared_query.execute({"Min": 1})
+
+    def test_syntax_error(self):
+        with self.assertRaises(pyswip.prolog.PrologError):
+            geolog_core.prepared_query.PreparedQuery("member(X, [1, 2")
+
+
+if __name__ == '__main__':
+    unittest.main()
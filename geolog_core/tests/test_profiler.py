@@ -0,0 +1,61 @@
+import json
+import unittest
+
+import geolog_core.profiler
+
+
+class TestProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.profiler = geolog_core.profiler.Profiler()
+        geolog_core.profiler.start(self.profiler)
+
+    def tearDown(self):
+        geolog_core.profiler.stop()
+
+    def test_call(self):
+        result = self.profiler.call(("geolog", "test_me", 1), lambda x: x + 1, [1])
+
+        entry = self.profiler.entries[("geolog", "test_me", 1)]
+        self.assertEqual(2, result)
+        self.assertEqual(1, entry.calls)
+        self.assertEqual(entry.inclusive_time, entry.exclusive_time)
+
+    def test_nested_call(self):
+        def outer():
+            return self.profiler.call(("geolog", "inner", 0), lambda: sum(range(10000)), [])
+
+        self.profiler.call(("geolog", "outer", 0), outer, [])
+
+        outer_entry = self.profiler.entries[("geolog", "outer", 0)]
+        inner_entry = self.profiler.entries[("geolog", "inner", 0)]
+        self.assertGreaterEqual(outer_entry.inclusive_time, inner_entry.inclusive_time)
+        self.assertAlmostEqual(outer_entry.inclusive_time - inner_entry.inclusive_time, outer_entry.exclusive_time)
+
+    def test_sql_time(self):
+        def execute_query():
+            return geolog_core.profiler.time_sql(lambda query: query, "SELECT 1")
+
+        result = self.profiler.call(("arcpy_util", "executeArcSDE", 2), execute_query, [])
+
+        entry = self.profiler.entries[("arcpy_util", "executeArcSDE", 2)]
+        self.assertEqual("SELECT 1", result)
+        self.assertGreater(entry.sql_time, 0.0)
+        self.assertAlmostEqual(entry.exclusive_time, entry.python_time + entry.sql_time)
+
+    def test_prolog_rows_do_not_replace_python_times(self):
+        self.profiler.call(("geolog", "test_me", 0), lambda: None, [])
+
+        self.profiler.add_prolog_rows([["geolog", "test_me", 0, 5, 1.0, 1.0], ["user", "member", 2, 3, 0.5, 0.25]])
+
+        self.assertEqual(1, self.profiler.entries[("geolog", "test_me", 0)].calls)
+        self.assertEqual(3, self.profiler.entries[("user", "member", 2)].calls)
+        self.assertEqual(0.25, self.profiler.entries[("user", "member", 2)].exclusive_time)
+
+    def test_to_json(self):
+        self.profiler.add_prolog_rows([["user", "member", 2, 3, 0.5, 0.25]])
+
+        table = json.loads(self.profiler.to_json())
+
+        self.assertEqual("user:member/2", table[0]["predicate"])
+        self.assertEqual(3, table[0]["calls"])
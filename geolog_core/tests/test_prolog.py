@@ -0,0 +1,128 @@
+import threading
+import unittest
+
+import pyswip
+import pyswip.easy
+import pyswip.prolog
+
+
+class TestProlog(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.prolog = pyswip.Prolog()
+        pyswip.registerForeign(nested_query, name="nested_query", arity=1, module="test_prolog")
+        pyswip.registerForeign(nested_query_left_open, name="nested_query_left_open", arity=1, module="test_prolog")
+
+    def tearDown(self):
+        del open_queries[:]
+
+    def test_decoder(self):
+        decoded = list(self.prolog.query("member(X, [a, b]), Y = X", decoder=decode_names))
+
+        self.assertEqual([["X", "Y"], ["X", "Y"]], decoded)
+
+    def test_decoder_with_limit(self):
+        decoded = list(self.prolog.query("between(1, inf, X)", maxresult=2, decoder=decode_names))
+
+        self.assertEqual([["X"], ["X"]], decoded)
+
+    def test_second_query_at_same_level(self):
+        solutions = self.prolog.query("between(1, inf, X)")
+        next(solutions)
+
+        with self.assertRaises(pyswip.prolog.NestedQueryError):
+            self.prolog.query("true")
+
+        solutions.close()
+        self.assertEqual([{}], list(self.prolog.query("true")))
+
+    def test_enter_and_leave_foreign(self):
+        solutions = self.prolog.query("between(1, inf, X)")
+        next(solutions)
+        self.assertTrue(pyswip.Prolog._isQueryOpen())
+
+        previous_depth = pyswip.Prolog._enterForeign()
+        self.assertEqual(0, previous_depth)
+        self.assertFalse(pyswip.Prolog._isQueryOpen())
+
+        pyswip.Prolog._leaveForeign(previous_depth)
+        self.assertTrue(pyswip.Prolog._isQueryOpen())
+
+        solutions.close()
+        self.assertFalse(pyswip.Prolog._isQueryOpen())
+
+    def test_nested_query(self):
+        result = list(self.prolog.query("member(X, [1, 2]), test_prolog:nested_query(Y)"))
+
+        self.assertEqual([{"X": 1, "Y": 42}, {"X": 2, "Y": 42}], result)
+        self.assertEqual([], pyswip.Prolog._getEngineState().openQueries)
+
+    def test_nested_query_left_open(self):
+        result = list(self.prolog.query("test_prolog:nested_query_left_open(Y)"))
+
+        self.assertEqual([{"Y": 1}], result)
+        self.assertEqual(1, len(open_queries))
+        self.assertEqual([], pyswip.Prolog._getEngineState().openQueries)
+        self.assertEqual(0, pyswip.Prolog._getEngineState().foreignDepth)
+        self.assertEqual([{}], list(self.prolog.query("true")))
+
+    def test_engine_state_per_thread(self):
+        states = []
+        thread = threading.Thread(target=lambda: states.append(pyswip.Prolog._getEngineState()))
+        thread.start()
+        thread.join()
+
+        self.assertIsNot(pyswip.Prolog._getEngineState(), states[0])
+        self.assertEqual([], states[0].openQueries)
+
+    def test_queries_on_two_threads(self):
+        # the thread keeps its query open while the main thread runs queries of its own
+        opened = threading.Event()
+        finished = threading.Event()
+        results = []
+
+        def run():
+            solutions = self.prolog.query("between(1, 3, X)")
+            results.append(next(solutions))
+            opened.set()
+            finished.wait(10)
+            results.extend(solutions)
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        self.assertTrue(opened.wait(10))
+        try:
+            self.assertFalse(pyswip.Prolog._isQueryOpen())
+            self.assertEqual([{"Y": 1}, {"Y": 2}], list(self.prolog.query("between(1, 2, Y)")))
+        finally:
+            finished.set()
+            thread.join()
+
+        self.assertEqual([{"X": 1}, {"X": 2}, {"X": 3}], results)
+
+
+open_queries = []
+
+
+def decode_names(swipl_list):
+    """Decodes the binding list [Name = Value, ...] of a solution to the names of the variables."""
+    return [binding.args[0].value for binding in pyswip.easy.getTerm(swipl_list)]
+
+
+def nested_query(result):
+    solution = list(pyswip.Prolog.query("Y is 2 * 21"))[0]
+    result.unify(solution["Y"])
+    return True
+
+
+def nested_query_left_open(result):
+    solutions = pyswip.Prolog.query("between(1, inf, Y)")
+    result.unify(next(solutions)["Y"])
+    # the query is closed when the foreign predicate returns
+    open_queries.append(solutions)
+    return True
+
+
+if __name__ == '__main__':
+    unittest.main()
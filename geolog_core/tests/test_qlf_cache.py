@@ -0,0 +1,66 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import geolog_core.qlf_cache
+import geolog_core.util
+
+
+class FakeInterpreter(object):
+
+    def __init__(self):
+        self.queries = []
+
+    def query(self, query, **kwargs):
+        self.queries.append(query)
+        if query.startswith("current_prolog_flag"):
+            return [{"Version": 80000}]
+        # qcompile(auto) writes the .qlf file next to the source
+        if query.startswith("load_files"):
+            with open(os.path.join(FakeInterpreter.directory, "test.qlf"), "w") as qlf_file:
+                qlf_file.write("qlf")
+        return True
+
+
+class TestQlfCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = FakeInterpreter.directory = tempfile.mkdtemp()
+        self.source = os.path.join(self.directory, "test.pl")
+        self.write_source("a.")
+        self.qlf_cache = geolog_core.qlf_cache.QlfCache(FakeInterpreter(), os.path.join(self.directory, "cache"))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_source(self, content):
+        with open(self.source, "w") as source_file:
+            source_file.write(content)
+
+    def test_compiled_in_place(self):
+        self.qlf_cache.load(self.source)
+
+        self.assertIn("load_files('{0}', [qcompile(auto)])".format(geolog_core.util.escape_file_name(self.source)),
+                      self.qlf_cache.interpreter.queries)
+        self.assertTrue(self.qlf_cache.is_fresh(self.source))
+
+    def test_changed_content(self):
+        self.qlf_cache.load(self.source)
+        modification_time = os.path.getmtime(self.source)
+
+        # same modification time, but different size and content
+        self.write_source("a. b.")
+        os.utime(self.source, (modification_time, modification_time))
+
+        self.assertFalse(self.qlf_cache.is_fresh(self.source))
+
+    def test_clear(self):
+        self.qlf_cache.load(self.source)
+        self.qlf_cache.clear()
+
+        self.assertFalse(self.qlf_cache.is_fresh(self.source))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+import multiprocessing
+import socket
+import threading
+import unittest
+
+import geolog_core.query_server
+
+
+class TestQueryServer(unittest.TestCase):
+
+    def setUp(self):
+        self.client_socket, self.server_socket = socket.socketpair()
+        self.client = geolog_core.query_server.QueryClient(None)
+        self.client._socket = self.client_socket
+
+    def tearDown(self):
+        self.client.close()
+        self.server_socket.close()
+
+    def respond(self, *messages):
+        """Answers the next request of the client with messages."""
+        def run():
+            geolog_core.query_server._receive_frame(self.server_socket)
+            for message in messages:
+                geolog_core.query_server._send_frame(self.server_socket, message)
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        return thread
+
+    def test_frame(self):
+        geolog_core.query_server._send_frame(self.client_socket, ["row", [1, 2.5, u"R\u00e4ume", [u"a"]]])
+        self.assertEqual(["row", [1, 2.5, u"R\u00e4ume", [u"a"]]],
+                         geolog_core.query_server._receive_frame(self.server_socket))
+
+    def test_query(self):
+        thread = self.respond(["vars", ["X", "Y"]], ["row", [1, "a"]], ["row", [2, "b"]], ["end", 2])
+        self.assertEqual([{"X": 1, "Y": "a"}, {"X": 2, "Y": "b"}], self.client.query("test(X, Y)"))
+        thread.join()
+
+    def test_query_true_and_false(self):
+        thread = self.respond(["vars", []], ["row", []], ["end", 1])
+        self.assertTrue(self.client.query("true"))
+        thread.join()
+
+        thread = self.respond(["end", 0])
+        self.assertFalse(self.client.query("fail"))
+        thread.join()
+
+    def test_error(self):
+        thread = self.respond(["error", "PrologError", "Caused by: 'test'."])
+        with self.assertRaises(geolog_core.query_server.QueryServerError) as context:
+            self.client.query("test")
+        self.assertEqual("PrologError", context.exception.error_type)
+        thread.join()
+
+    def test_close_cancels(self):
+        thread = self.respond(["vars", ["X"]], ["row", [1]], ["row", [2]])
+        solutions = self.client.iter_query("between(1, inf, X)")
+        self.assertEqual({"X": 1}, next(solutions))
+        solutions.close()
+        self.assertIsNone(self.client._socket)
+        thread.join()
+
+    def test_unknown_request(self):
+        server = geolog_core.query_server.QueryServer(workers=0)
+        thread = threading.Thread(target=server._handle, args=(self.server_socket,))
+        thread.start()
+        for request in (["stop"], ["cancel"], [], {"query": "true"}):
+            geolog_core.query_server._send_frame(self.client_socket, request)
+            self.assertEqual("error", geolog_core.query_server._receive_frame(self.client_socket)[0])
+        self.client.close()
+        thread.join()
+
+    def start_worker(self, server):
+        """Adds a worker to server that answers in a thread of this process."""
+        connection, worker_connection = multiprocessing.Pipe()
+        thread = threading.Thread(target=geolog_core.query_server._serve_worker,
+                                  args=(worker_connection, FakeInterpreter()))
+        thread.start()
+        server._processes.append((FakeProcess(thread), connection))
+        server._idle.put(connection)
+        server._worker_count += 1
+
+    def test_client_disconnected_after_query(self):
+        server = geolog_core.query_server.QueryServer(workers=0)
+        self.start_worker(server)
+        disconnected_client, other_end = socket.socketpair()
+        disconnected_client.close()
+        other_end.close()
+
+        # the worker finishes the query before the server cancels it
+        self.assertFalse(server._forward(["query", "test(X)", {}], disconnected_client))
+
+        thread = threading.Thread(target=server._handle, args=(self.server_socket,))
+        thread.start()
+        try:
+            self.assertEqual([{"X": 1}], self.client.query("test(X)"))
+            self.assertEqual([{"X": 1}], self.client.query("test(X)"))
+        finally:
+            self.client.close()
+            thread.join()
+            server.stop()
+
+    def test_broadcast_with_terminated_worker(self):
+        server = geolog_core.query_server.QueryServer(workers=0)
+        self.start_worker(server)
+        # a worker that terminated while it was busy, i.e. that is not in the pool
+        server._worker_count += 1
+        threading.Timer(0.1, server._remove_worker).start()
+
+        server._broadcast(["consult", "test.pl"], self.server_socket)
+
+        self.assertEqual(["end", 0], geolog_core.query_server._receive_frame(self.client_socket))
+        server.stop()
+
+    def test_remote_address(self):
+        with self.assertRaises(ValueError):
+            geolog_core.query_server.QueryServer(("0.0.0.0", 0), workers=0)
+        geolog_core.query_server.QueryServer(("127.0.0.1", 0), workers=0)
+
+
+class FakeInterpreter(object):
+
+    def iter_query(self, query, catch_errors=True, **options):
+        yield {"X": 1}
+
+    def consult(self, file_name, catch_errors=True):
+        pass
+
+
+class FakeProcess(object):
+    """A worker thread in place of a worker process."""
+
+    def __init__(self, thread):
+        self.thread = thread
+
+    def is_alive(self):
+        return self.thread.is_alive()
+
+    def join(self, timeout=None):
+        self.thread.join(timeout)
+
+    def terminate(self):
+        pass
+
+
+if __name__ == '__main__':
+    unittest.main()
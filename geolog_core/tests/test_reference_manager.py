@@ -0,0 +1,133 @@
+import unittest
+
+import geolog_core.reference_manager
+import pyswip
+
+
+class TestReferenceManager(unittest.TestCase):
+
+    def setUp(self):
+        self.reference_manager = geolog_core.reference_manager.ReferenceManager()
+        self.reference_manager.reset()
+
+    def put(self, value):
+        atom = self.reference_manager.create_atom()
+        self.reference_manager.put(atom, value)
+        return atom
+
+    def test_singleton(self):
+        self.assertIs(self.reference_manager, geolog_core.reference_manager.ReferenceManager())
+
+    def test_create_atom(self):
+        first = self.reference_manager.create_atom()
+        second = self.reference_manager.create_atom()
+
+        self.assertNotEqual(first, second)
+        self.assertTrue(first.value.startswith(geolog_core.reference_manager.OBJECT_BLOB_NAME))
+
+    def test_released_by_garbage_collection(self):
+        scope = self.reference_manager.open_scope()
+        handle = self.put("collected").handle
+        garbage_collect_atoms()
+
+        self.assertNotIn(handle, self.reference_manager._object_dict)
+        self.reference_manager.close_scope(scope)
+
+    def test_unscoped_objects_survive_garbage_collection(self):
+        handle = self.put("kept").handle
+        garbage_collect_atoms()
+
+        self.assertEqual("kept", self.reference_manager._object_dict[handle])
+
+    def test_pinned_objects_survive_garbage_collection(self):
+        scope = self.reference_manager.open_scope()
+        handle = self.put("pinned").handle
+        self.reference_manager.pin(handle)
+        garbage_collect_atoms()
+
+        self.assertEqual("pinned", self.reference_manager._object_dict[handle])
+        self.reference_manager.close_scope(scope)
+
+    def test_unscoped_objects_kept(self):
+        atom = self.put([1])
+
+        self.assertEqual([1], self.reference_manager.get(atom))
+
+    def test_scope_released(self):
+        kept = self.put("kept")
+        scope = self.reference_manager.open_scope()
+        atom = self.put("released")
+        self.reference_manager.close_scope(scope)
+
+        self.assertEqual({kept.handle: "kept"}, self.reference_manager._object_dict)
+        with self.assertRaises(KeyError):
+            self.reference_manager.get(atom)
+
+    def test_returned_and_pinned_kept(self):
+        scope = self.reference_manager.open_scope()
+        returned = self.put("returned")
+        pinned = self.put("pinned")
+        self.reference_manager.pin(pinned)
+        self.put("released")
+        self.reference_manager.close_scope(scope, {returned.value})
+
+        self.assertEqual({returned.handle: "returned", pinned.handle: "pinned"}, self.reference_manager._object_dict)
+
+    def test_no_release(self):
+        scope = self.reference_manager.open_scope()
+        atom = self.put("kept")
+        self.reference_manager.close_scope(scope, release=False)
+
+        self.assertEqual("kept", self.reference_manager.get(atom))
+
+    def test_nested_scope(self):
+        outer_scope = self.reference_manager.open_scope()
+        inner_scope = self.reference_manager.open_scope()
+        returned = self.put("returned")
+        self.reference_manager.close_scope(inner_scope, {returned.value})
+        self.assertEqual("returned", self.reference_manager.get(returned))
+
+        self.reference_manager.close_scope(outer_scope)
+        self.assertEqual({}, self.reference_manager._object_dict)
+
+    def test_unpin(self):
+        atom = self.put("pinned")
+        self.reference_manager.pin(atom)
+
+        scope = self.reference_manager.open_scope()
+        self.reference_manager.unpin(atom)
+        self.assertEqual("pinned", self.reference_manager.get(atom))
+        self.reference_manager.close_scope(scope)
+
+        self.assertEqual({}, self.reference_manager._object_dict)
+
+    def test_unpin_without_scope(self):
+        atom = self.put("pinned")
+        self.reference_manager.pin(atom)
+        self.reference_manager.unpin(atom)
+
+        self.assertEqual({}, self.reference_manager._object_dict)
+
+    def test_statistics(self):
+        self.put([1, 2])
+        self.put([3])
+        self.put("text")
+
+        statistics = self.reference_manager.get_statistics()
+
+        self.assertEqual(2, statistics["list"]["count"])
+        self.assertEqual(1, statistics["str"]["count"])
+        self.assertGreater(statistics["list"]["bytes"], 0)
+
+    def test_get_names(self):
+        names = geolog_core.reference_manager.get_names({"X": ["a", ("b", 1)], "Y": pyswip.Atom("c")})
+
+        self.assertEqual({"a", "b", "c"}, names)
+
+
+def garbage_collect_atoms():
+    list(pyswip.Prolog.query("garbage_collect_atoms"))
+
+
+if __name__ == '__main__':
+    unittest.main()
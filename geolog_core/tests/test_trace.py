@@ -0,0 +1,52 @@
+import unittest
+
+import geolog_core.trace
+
+
+class TestTrace(unittest.TestCase):
+
+    def tearDown(self):
+        geolog_core.trace.stop()
+
+    def test_call_without_sink(self):
+        self.assertEqual(2, geolog_core.trace.call(("geolog", "test_me", 1), lambda x: x + 1, [1]))
+
+    def test_call_recorded(self):
+        sink = geolog_core.trace.TraceSink()
+        geolog_core.trace.start(sink)
+
+        geolog_core.trace.call(("geolog", "test_me", 1), lambda x: x + 1, [1])
+
+        events = sink.dump()
+        self.assertEqual(1, len(events))
+        self.assertEqual("geolog:test_me", events[0]["predicate"])
+        self.assertEqual(1, events[0]["arity"])
+        self.assertIsNone(events[0]["sql"])
+
+    def test_sql_recorded(self):
+        sink = geolog_core.trace.TraceSink()
+        geolog_core.trace.start(sink)
+
+        def execute_query():
+            geolog_core.trace.record_sql("SELECT 1")
+
+        geolog_core.trace.call(("arcpy_util", "executeArcSDE", 2), execute_query, [])
+
+        self.assertEqual("SELECT 1", sink.dump()[0]["sql"])
+
+    def test_ring_buffer(self):
+        sink = geolog_core.trace.TraceSink(capacity=2)
+        geolog_core.trace.start(sink)
+
+        for arity in range(3):
+            geolog_core.trace.call(("geolog", "test_me", arity), lambda: None, [])
+
+        self.assertEqual([1, 2], [event["arity"] for event in sink.dump()])
+
+    def test_sampling(self):
+        sink = geolog_core.trace.TraceSink(sample_rate=0.0)
+        geolog_core.trace.start(sink)
+
+        geolog_core.trace.call(("geolog", "test_me", 0), lambda: None, [])
+
+        self.assertEqual([], sink.dump())
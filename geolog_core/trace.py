@@ -0,0 +1,114 @@
+# Trace
+#
+# Author: Tobias Grubenmann
+# Email: grubenmann@cs.uni-bonn.de
+# Copyright: (C) 2020 Tobias Grubenmann
+
+import collections
+import json
+import random
+import threading
+import time
+import timeit
+
+import geolog_core.profiler
+
+# the sink that records the foreign predicate calls, None if tracing is off
+active_sink = None
+
+
+def start(sink):
+    global active_sink
+    active_sink = sink
+
+
+def stop():
+    global active_sink
+    active_sink = None
+
+
+def call(key, function, args):
+    """Calls a foreign predicate function while tracing or profiling is on.
+       key is (module, name, arity) of the predicate."""
+    sink = active_sink
+    profiler = geolog_core.profiler.active_profiler
+    if sink is None or not sink.sample():
+        if profiler is None:
+            return function(*args)
+        return profiler.call(key, function, args)
+    return sink.call(key, function, args, profiler)
+
+
+def record_sql(query):
+    """Adds an SQL query to the trace event of the predicate that is currently executed."""
+    sink = active_sink
+    if sink is not None:
+        sink.add_sql(query)
+
+
+TraceEvent = collections.namedtuple("TraceEvent", ["timestamp", "predicate", "arity", "duration", "sql"])
+
+
+class TraceSink(object):
+    """Keeps the last capacity foreign predicate calls in a ring buffer.
+       Only a fraction sample_rate of the calls is recorded."""
+
+    def __init__(self, capacity=10000, sample_rate=1.0):
+        self.capacity = capacity
+        self.sample_rate = sample_rate
+        self.events = collections.deque(maxlen=capacity)
+        self._local = threading.local()
+
+    def sample(self):
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def _get_stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def call(self, key, function, args, profiler=None):
+        stack = self._get_stack()
+        # SQL queries of the call
+        sql = []
+        stack.append(sql)
+        timestamp = time.time()
+        start_time = timeit.default_timer()
+        try:
+            if profiler is None:
+                return function(*args)
+            return profiler.call(key, function, args)
+        finally:
+            duration = timeit.default_timer() - start_time
+            stack.pop()
+            self.events.append(TraceEvent(timestamp, "{0}:{1}".format(key[0], key[1]), key[2], duration,
+                                          "; ".join(sql) if sql else None))
+
+    def add_sql(self, query):
+        stack = self._get_stack()
+        if stack:
+            stack[-1].append(str(query))
+
+    def dump(self):
+        """Returns the recorded events (oldest first) as dicts."""
+        return [event._asdict() for event in list(self.events)]
+
+    def to_json(self, file_name=None):
+        """Exports the recorded events as JSON. Writes them to file_name, if given."""
+        events = json.dumps(self.dump(), indent=2)
+        if file_name:
+            with open(file_name, "w") as json_file:
+                json_file.write(events)
+        return events
+
+    def clear(self):
+        self.events.clear()
+
+    def __str__(self):
+        lines = []
+        for event in list(self.events):
+            line = "CALL: {0}/{1} ({2:.6f}s)".format(event.predicate, event.arity, event.duration)
+            if event.sql:
+                line += " SQL QUERY: " + event.sql
+            lines.append(line)
+        return "\n".join(lines)
@@ -4,12 +4,52 @@
 # Email: grubenmann@cs.uni-bonn.de
 # Copyright: (C) 2020 Tobias Grubenmann
 
+import os
 import uuid
 
 import pyswip
 
-prolog_types = (pyswip.Variable, pyswip.Atom, pyswip.Functor, str, unicode, int, float, bool, list)
+try:
+    string_types = (str, unicode)
+except NameError:
+    # Python 3
+    string_types = (str,)
+
+prolog_types = (pyswip.Variable, pyswip.Atom, pyswip.Functor) + string_types + (int, float, bool, list)
+
+escape_dict = {"\\": "/", "{": "[{]", "}": "[}]", "[": "[[]", "]": "{]}", "$": "[$]"}
+
+quote_dict = {"\\": "\\\\", "'": "\\'", "\n": "\\n", "\r": "\\r"}
 
 
 def get_new_uuid():
     return str(uuid.uuid4()).replace('-', '_')
+
+
+def get_cache_directory():
+    """The directory for files that are cached between sessions.
+       Can be changed with the environment variable GEOLOG_CACHE."""
+    directory = os.environ.get("GEOLOG_CACHE", os.path.join(os.path.expanduser("~"), ".geolog", "cache"))
+    if not os.path.isdir(directory):
+        try:
+            os.makedirs(directory)
+        except OSError:
+            # created concurrently by another process
+            pass
+    return directory
+
+
+def escape_file_name(file_name):
+    """Escapes \\ and wildcards in a file name passed to Prolog."""
+    cleaned_file_name = ""
+    for char in file_name:
+        if char in escape_dict:
+            cleaned_file_name += escape_dict[char]
+        else:
+            cleaned_file_name += char
+    return cleaned_file_name
+
+
+def quote_atom(text):
+    """Quotes a text as Prolog atom, e.g. to pass a query as argument of another query."""
+    return "'" + "".join(quote_dict.get(char, char) for char in text) + "'"
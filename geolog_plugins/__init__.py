@@ -1 +1,39 @@
-__path__ = __import__('pkgutil').extend_path(__path__, __name__)
\ No newline at end of file
+# Geolog Plugins
+#
+# Author: Tobias Grubenmann
+# Email: grubenmann@cs.uni-bonn.de
+# Copyright: (C) 2020 Tobias Grubenmann
+
+import os.path
+
+
+def get_plugin_version():
+    """The location and modification time of arcpy (None if arcpy is not installed), since the Arcpy predicates are
+       generated from the functions and classes of arcpy. Part of the key of the plugin index, which is checked on
+       every start, so arcpy is only located and not imported (which takes seconds)."""
+    file_name = _find_module("arcpy")
+    if file_name is None:
+        return None
+    return [file_name, os.path.getmtime(file_name)]
+
+
+def _find_module(name):
+    """The file of a top-level module or package (its __init__.py), without importing it. None if not found."""
+    try:
+        import importlib.util
+    except ImportError:
+        # Python 2
+        import imp
+        try:
+            module_file, file_name, _ = imp.find_module(name)
+        except ImportError:
+            return None
+        if module_file is not None:
+            module_file.close()
+        elif os.path.isdir(file_name):
+            file_name = os.path.join(file_name, "__init__.py")
+        return file_name
+    spec = importlib.util.find_spec(name)
+    if spec is None or spec.origin is None:
+        return None
+    return spec.origin
@@ -12,11 +12,17 @@ import sys
 
 import arcpy
 
+import geolog_core.memoization
 import geolog_core.predicate
 
 MAX_ARITY = 10
 MODULE_NAME = "arcpy_core"
 
+# pure functions that are memoized (metadata probes), all other functions invalidate the datasets they are called with
+MEMOIZED_FUNCTIONS = {"Exists", "Describe", "GetCount", "GetCount_management"}
+MEMOIZATION_SIZE = 1000
+MEMOIZATION_TTL = 60
+
 
 def get_classes_and_functions(path, functions, classes, base_package):
 
@@ -52,6 +58,11 @@ def predicate_function_wrapper(function, _, arg_list, return_value=None):
         geolog_core.predicate.Predicate.unify(return_value.value, function(*arg_list))
     else:
         function(*arg_list)
+    if function.func_name not in MEMOIZED_FUNCTIONS:
+        # the function may have created, changed or deleted its datasets
+        for arg in arg_list:
+            if isinstance(arg, (str, unicode)):
+                geolog_core.memoization.invalidate(dataset=arg, workspace=arcpy.env.workspace)
     return True
 
 
@@ -88,7 +99,14 @@ for (f, location) in function_set:
                                "get_minimum_arity": classmethod(functools.partial(
                                    (lambda value, cls: value), min_arity)),
                                "get_maximum_arity": classmethod(functools.partial(
-                                   (lambda value, cls: value), max_arity))
+                                   (lambda value, cls: value), max_arity)),
+                               "get_memoization_size": classmethod(functools.partial(
+                                   (lambda value, cls: value),
+                                   MEMOIZATION_SIZE if f.func_name in MEMOIZED_FUNCTIONS else 0)),
+                               "get_memoization_ttl": classmethod(
+                                   lambda cls: MEMOIZATION_TTL),
+                               "get_workspace": classmethod(
+                                   lambda cls: arcpy.env.workspace)
                            })
 
 for (c, location) in class_set:
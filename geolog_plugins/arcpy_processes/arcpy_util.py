@@ -7,8 +7,9 @@
 
 import uuid
 
-import geolog_core.interpreter
 import geolog_core.predicate
+import geolog_core.profiler
+import geolog_core.trace
 import geolog_core.util
 
 
@@ -57,18 +58,17 @@ class ArcSDEExecutePredicate(geolog_core.predicate.DeterministicPredicate):
         cls.print_query(query)
         try:
             if result:
-                result_list = connection.execute(query)
+                result_list = geolog_core.profiler.time_sql(connection.execute, query)
                 cls.unify(result.value, result_list)
             else:
-                connection.execute(query)
+                geolog_core.profiler.time_sql(connection.execute, query)
             return True
         except AttributeError:
             return False
 
     @classmethod
     def print_query(cls, query):
-        if geolog_core.interpreter.Interpreter().trace:
-            print("SQL QUERY: " + str(query))
+        geolog_core.trace.record_sql(query)
 
 
 class ArcSDEExecuteIteratorPredicate(geolog_core.predicate.DeterministicPredicate):
@@ -92,7 +92,7 @@ class ArcSDEExecuteIteratorPredicate(geolog_core.predicate.DeterministicPredicat
     def execute_query(cls, connection, query, result):
         cls.print_query(query)
         try:
-            query_result = connection.execute(query)
+            query_result = geolog_core.profiler.time_sql(connection.execute, query)
             # return value true means valid query but no result
             if query_result is True:
                 query_result = []
@@ -110,5 +110,38 @@ class ArcSDEExecuteIteratorPredicate(geolog_core.predicate.DeterministicPredicat
 
     @classmethod
     def print_query(cls, query):
-        if geolog_core.interpreter.Interpreter().trace:
-            print("SQL QUERY: " + str(query))
+        geolog_core.trace.record_sql(query)
+
+
+class ArcSDEExecuteRowPredicate(geolog_core.predicate.NondeterministicPredicate):
+    """Returns the rows of the result of an ArcSDE SQL query on backtracking."""
+
+    @classmethod
+    def get_predicate_name(cls):
+        """The name of the predicate in Prolog."""
+        return "executeArcSDERow"
+
+    @classmethod
+    def get_module_name(cls):
+        """The module of the predicate in Prolog."""
+        return "arcpy_util"
+
+    @classmethod
+    def _get_predicate_function(cls):
+        return cls.execute_query
+
+    @classmethod
+    def execute_query(cls, connection, query, row):
+        geolog_core.trace.record_sql(query)
+        try:
+            query_result = geolog_core.profiler.time_sql(connection.execute, query)
+        except AttributeError:
+            return
+        # return value true means valid query but no result
+        if query_result is True:
+            return
+        # Single values must be formatted correctly
+        if not isinstance(query_result, list):
+            query_result = [[query_result]]
+        for result_row in query_result:
+            yield result_row
@@ -19,9 +19,13 @@
 % unify Mode with 'run', else store dummy connection ID and 
 % unify Mode with 'dummy_db_connection'. 
 initialize_db_connection(ConnectionFile, Mode) :-
+    forall((db_connection(OldConnection), OldConnection \== 'dummy_db_connection'),
+	   geolog:unpin(OldConnection)),
     retractall(db_connection(_)),
     ( exists_file(ConnectionFile)
 	-> ( arcpy_core:'arcpy.ArcSDESQLExecute'([ConnectionFile], Connection),
+	     % the connection object must outlive the query
+	     geolog:pin(Connection),
 	     asserta(db_connection(Connection)),
 	     Mode = run
 	   )
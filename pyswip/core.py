@@ -750,6 +750,14 @@ PL_Q_DETERMINISTIC = 0x20  # call was deterministic
 #define PL_BLOB_TEXT    0x02        /* blob contains text */
 #define PL_BLOB_NOCOPY  0x04        /* do not copy the data */
 #define PL_BLOB_WCHAR   0x08        /* wide character string */
+PL_BLOB_MAGIC_B = 0x75293a00
+PL_BLOB_VERSION = 1
+PL_BLOB_MAGIC = PL_BLOB_MAGIC_B | PL_BLOB_VERSION
+
+PL_BLOB_UNIQUE = 0x01
+PL_BLOB_TEXT = 0x02
+PL_BLOB_NOCOPY = 0x04
+PL_BLOB_WCHAR = 0x08
 
 #        /*******************************
 #        *      CHAR BUFFERS    *
@@ -947,6 +955,14 @@ PL_get_chars = check_strings(None, 1)(PL_get_chars)
 #PL_EXPORT(int)         PL_get_nchars(term_t t,
 #                                     size_t *len, char **s,
 #                                     unsigned int flags);
+PL_get_list_nchars = _lib.PL_get_list_nchars
+PL_get_list_nchars.argtypes = [term_t, POINTER(c_size_t), POINTER(c_char_p), c_uint]
+PL_get_list_nchars.restype = c_int
+
+PL_get_nchars = _lib.PL_get_nchars
+PL_get_nchars.argtypes = [term_t, POINTER(c_size_t), POINTER(c_char_p), c_uint]
+PL_get_nchars.restype = c_int
+
 #PL_EXPORT(int)         PL_get_integer(term_t t, int *i);
 PL_get_integer = _lib.PL_get_integer
 PL_get_integer.argtypes = [term_t, POINTER(c_int)]
@@ -1004,6 +1020,55 @@ PL_put_atom_chars.restype = c_int
 
 PL_put_atom_chars = check_strings(1, None)(PL_put_atom_chars)
 
+#PL_EXPORT(int)         PL_put_atom(term_t t, atom_t a);
+PL_put_atom = _lib.PL_put_atom
+PL_put_atom.argtypes = [term_t, atom_t]
+PL_put_atom.restype = c_int
+
+#typedef struct PL_blob_t
+#{ uintptr_t            magic;          /* PL_BLOB_MAGIC */
+#  uintptr_t            flags;          /* PL_BLOB_* */
+#  char *               name;           /* name of the type */
+#  int                  (*release)(atom_t a);
+#  int                  (*compare)(atom_t a, atom_t b);
+#  int                  (*write)(IOSTREAM *s, atom_t a, int flags);
+#  void                 (*acquire)(atom_t a);
+#  int                  (*save)(atom_t a, IOSTREAM *s);
+#  atom_t               (*load)(IOSTREAM *s);
+#  size_t               padding;        /* Required 0-padding */
+#  void *               reserved[9];    /* for future extension */
+#  int                  registered;     /* Already registered? */
+#  int                  rank;           /* Rank for ordering atoms */
+#  struct PL_blob_t *   next;           /* next in registered type-chain */
+#  atom_t               atom_name;      /* Name as atom */
+#} PL_blob_t;
+PL_blob_release_t = CFUNCTYPE(c_int, atom_t)
+
+
+class PL_blob_t(Structure):
+    pass
+
+PL_blob_t._fields_ = [("magic", c_size_t),
+                      ("flags", c_size_t),
+                      ("name", c_char_p),
+                      ("release", PL_blob_release_t),
+                      ("compare", c_void_p),
+                      ("write", c_void_p),
+                      ("acquire", c_void_p),
+                      ("save", c_void_p),
+                      ("load", c_void_p),
+                      ("padding", c_size_t),
+                      ("reserved", c_void_p * 9),
+                      ("registered", c_int),
+                      ("rank", c_int),
+                      ("next", POINTER(PL_blob_t)),
+                      ("atom_name", atom_t)]
+
+#PL_EXPORT(int)         PL_put_blob(term_t t, void *blob, size_t len, PL_blob_t *type);
+PL_put_blob = _lib.PL_put_blob
+PL_put_blob.argtypes = [term_t, c_char_p, c_size_t, POINTER(PL_blob_t)]
+PL_put_blob.restype = c_int
+
 PL_atom_chars = _lib.PL_atom_chars
 PL_atom_chars.argtypes = [atom_t]
 PL_atom_chars.restype = c_char_p
@@ -1090,15 +1155,15 @@ PL_unify_string_chars.restype = c_void_p
 
 PL_foreign_control = _lib.PL_foreign_control
 PL_foreign_control.argtypes = [control_t]
-PL_foreign_control.restypes = c_int
+PL_foreign_control.restype = c_int
 
 PL_foreign_context_address = _lib.PL_foreign_context_address
 PL_foreign_context_address.argtypes = [control_t]
-PL_foreign_context_address.restypes = c_void_p
+PL_foreign_context_address.restype = c_void_p
 
 PL_retry_address = _lib._PL_retry_address
 PL_retry_address.argtypes = [c_void_p]
-PL_retry_address.restypes = foreign_t
+PL_retry_address.restype = foreign_t
 
 PL_unify = _lib.PL_unify
 PL_unify.restype = c_int
@@ -1180,6 +1245,10 @@ PL_put_variable.restype = None
 #PL_EXPORT(void)                PL_put_string_nchars(term_t t, size_t len, const char *chars);
 #PL_EXPORT(void)                PL_put_list_nchars(term_t t, size_t l, const char *chars);
 #PL_EXPORT(void)                PL_put_list_ncodes(term_t t, size_t l, const char *chars);
+PL_put_list_ncodes = _lib.PL_put_list_ncodes
+PL_put_list_ncodes.argtypes = [term_t, c_size_t, c_char_p]
+PL_put_list_ncodes.restype = c_int
+
 #PL_EXPORT(void)                PL_put_integer(term_t t, long i);
 PL_put_integer = _lib.PL_put_integer
 PL_put_integer.argtypes = [term_t, c_long]
@@ -1315,6 +1384,51 @@ PL_thread_attach_engine = _lib.PL_thread_attach_engine
 PL_thread_attach_engine.argtypes = [c_void_p]
 PL_thread_attach_engine.restype = c_int
 
+PL_thread_destroy_engine = _lib.PL_thread_destroy_engine
+PL_thread_destroy_engine.restype = c_int
+
+#PL_EXPORT(int)         PL_thread_raise(int tid, int sig);
+PL_thread_raise = _lib.PL_thread_raise
+PL_thread_raise.argtypes = [c_int, c_int]
+PL_thread_raise.restype = c_int
+
+#                /*******************************
+#                *           SIGNALS            *
+#                *******************************/
+
+SIG_PROLOG_OFFSET = 32
+PL_SIGSYNC = 0x00010000
+
+#typedef struct pl_sigaction
+#{ void        (*sa_cfunction)(int);   /* traditional C function */
+#  predicate_t sa_predicate;           /* call a predicate */
+#  int         sa_flags;               /* additional flags */
+#  void       *reserved[2];
+#} pl_sigaction_t;
+PL_signal_handler_t = CFUNCTYPE(None, c_int)
+
+
+class pl_sigaction_t(Structure):
+    _fields_ = [("sa_cfunction", PL_signal_handler_t),
+                ("sa_predicate", predicate_t),
+                ("sa_flags", c_int),
+                ("reserved", c_void_p * 2)]
+
+
+#PL_EXPORT(int)         PL_sigaction(int sig, pl_sigaction_t *act, pl_sigaction_t *old);
+# available since SWI-Prolog 7.3, None in older versions
+try:
+    PL_sigaction = _lib.PL_sigaction
+    PL_sigaction.argtypes = [c_int, POINTER(pl_sigaction_t), POINTER(pl_sigaction_t)]
+    PL_sigaction.restype = c_int
+except AttributeError:
+    PL_sigaction = None
+
+#PL_EXPORT(int)         PL_raise_exception(term_t exception);
+PL_raise_exception = _lib.PL_raise_exception
+PL_raise_exception.argtypes = [term_t]
+PL_raise_exception.restype = c_int
+
 
 class _mbstate_t_value(Union):
     _fields_ = [("__wch", wint_t),
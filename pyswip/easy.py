@@ -505,15 +505,22 @@ funwraps = {}
 def _foreignWrapper(fun, nondeterministic=False):
     global funwraps
 
+    # pyswip.prolog imports this module, so it is only imported when wrapping
+    from pyswip.prolog import Prolog
+
     res = funwraps.get(fun)
     if res is None:
         def wrapper(*args):
-            if nondeterministic:
-                args = [getTerm(arg) for arg in args[:-1]] + [args[-1]]
-            else:
-                args = [getTerm(arg) for arg in args]
-            r = fun(*args)
-            return (r is None) and True or r
+            previousDepth = Prolog._enterForeign()
+            try:
+                if nondeterministic:
+                    args = [getTerm(arg) for arg in args[:-1]] + [args[-1]]
+                else:
+                    args = [getTerm(arg) for arg in args]
+                r = fun(*args)
+                return (r is None) and True or r
+            finally:
+                Prolog._leaveForeign(previousDepth)
 
         res = wrapper
         funwraps[fun] = res
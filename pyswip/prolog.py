@@ -24,6 +24,7 @@
 
 
 import sys
+import threading
 
 from pyswip.core import *
 
@@ -35,7 +36,8 @@ class PrologError(Exception):
 class NestedQueryError(PrologError):
     """
     SWI-Prolog does not accept nested queries, that is, opening a query while
-    the previous one was not closed.
+    the previous one was not closed. The only exception are queries opened by
+    a foreign predicate that is called from the innermost open query.
 
     As this error may be somewhat difficult to debug in foreign code, it is
     automatically treated inside pySWIP
@@ -78,16 +80,27 @@ class Prolog:
     This is a singleton class
     """
 
-    # We keep track of open queries to avoid nested queries.
-    _queryIsOpen = False
+    # We keep track of open queries to avoid nested queries. Every thread is
+    # attached to its own Prolog engine, so the open queries are kept per
+    # thread. A query may only be opened inside an open query from a foreign
+    # predicate that is called by the innermost open query (reentrant query).
+    _engineState = threading.local()
+
+    class _OpenQuery(object):
+        __slots__ = "qid", "fid", "closed"
+
+        def __init__(self, qid, fid):
+            self.qid = qid
+            self.fid = fid
+            self.closed = False
 
     class _QueryWrapper(object):
 
         def __init__(self):
-            if Prolog._queryIsOpen:
+            if Prolog._isQueryOpen():
                 raise NestedQueryError("The last query was not closed")
 
-        def __call__(self, query, maxresult, catcherrors, normalize, debug):
+        def __call__(self, query, maxresult, catcherrors, normalize, debug, decoder=None):
             Prolog._init_prolog_thread()
             swipl_fid = PL_open_foreign_frame()
 
@@ -109,12 +122,16 @@ class Prolog:
 
             swipl_qid = PL_open_query(None, plq, swipl_predicate, swipl_args)
 
-            Prolog._queryIsOpen = True # From now on, the query will be considered open
+            # From now on, the query will be considered open
+            openQuery = Prolog._pushQuery(swipl_qid, swipl_fid)
             try:
-                while maxresult and PL_next_solution(swipl_qid):
+                while maxresult and not openQuery.closed and PL_next_solution(swipl_qid):
                     maxresult -= 1
                     bindings = []
                     swipl_list = PL_copy_term_ref(swipl_bindingList)
+                    if decoder is not None:
+                        yield decoder(swipl_list)
+                        continue
                     t = getTerm(swipl_list)
                     if normalize:
                         try:
@@ -128,16 +145,64 @@ class Prolog:
                     else:
                         yield t
 
-                if PL_exception(swipl_qid):
+                if not openQuery.closed and PL_exception(swipl_qid):
                     term = getTerm(PL_exception(swipl_qid))
 
                     raise PrologError("".join(["Caused by: '", query, "'. ",
                                                "Returned: '", str(term), "'."]))
 
             finally: # This ensures that, whatever happens, we close the query
-                PL_cut_query(swipl_qid)
-                PL_discard_foreign_frame(swipl_fid)
-                Prolog._queryIsOpen = False
+                Prolog._closeQuery(openQuery)
+
+    @classmethod
+    def _getEngineState(cls):
+        state = cls._engineState
+        if not hasattr(state, "openQueries"):
+            state.openQueries = []
+            state.foreignDepth = 0
+        return state
+
+    @classmethod
+    def _isQueryOpen(cls):
+        """True if a query is open that is not currently calling a foreign
+        predicate, i.e. a new query cannot be nested."""
+        state = cls._getEngineState()
+        return len(state.openQueries) > state.foreignDepth
+
+    @classmethod
+    def _pushQuery(cls, qid, fid):
+        openQuery = cls._OpenQuery(qid, fid)
+        cls._getEngineState().openQueries.append(openQuery)
+        return openQuery
+
+    @classmethod
+    def _closeQuery(cls, openQuery):
+        """Cuts the query and discards its foreign frame. Queries that were
+        opened inside of it are closed first."""
+        openQueries = cls._getEngineState().openQueries
+        while openQuery in openQueries:
+            innermost = openQueries.pop()
+            PL_cut_query(innermost.qid)
+            PL_discard_foreign_frame(innermost.fid)
+            innermost.closed = True
+
+    @classmethod
+    def _enterForeign(cls):
+        """Called when a foreign predicate is entered. Queries opened from now
+        on are nested in the innermost open query."""
+        state = cls._getEngineState()
+        previousDepth = state.foreignDepth
+        state.foreignDepth = len(state.openQueries)
+        return previousDepth
+
+    @classmethod
+    def _leaveForeign(cls, previousDepth):
+        """Called when a foreign predicate returns. Nested queries that were
+        left open by the foreign predicate are closed."""
+        state = cls._getEngineState()
+        if len(state.openQueries) > state.foreignDepth:
+            cls._closeQuery(state.openQueries[state.foreignDepth])
+        state.foreignDepth = previousDepth
 
     @classmethod
     def _init_prolog_thread(cls):
@@ -174,10 +239,13 @@ class Prolog:
         next(cls.query(filename.join(["consult('", "')"]), catcherrors=catcherrors, debug=debug))
 
     @classmethod
-    def query(cls, query, maxresult=-1, catcherrors=True, normalize=True, debug=False):
+    def query(cls, query, maxresult=-1, catcherrors=True, normalize=True, debug=False, decoder=None):
         """Run a prolog query and return a generator.
         If the query is a yes/no question, returns {} for yes, and nothing for no.
         Otherwise returns a generator of dicts with variables as keys.
+        If a decoder is given, it is called with the term reference of the
+        binding list [Name=Value, ...] of every solution and its result is
+        yielded instead (normalize is ignored).
 
         >>> prolog = Prolog()
         >>> prolog.assertz("father(michael,john)")
@@ -189,7 +257,7 @@ class Prolog:
         >>> print sorted(prolog.query("father(michael,X)"))
         [{'X': 'gina'}, {'X': 'john'}]
         """
-        return cls._QueryWrapper()(query, maxresult, catcherrors, normalize, debug)
+        return cls._QueryWrapper()(query, maxresult, catcherrors, normalize, debug, decoder)
 
 
 def normalize_values(values):